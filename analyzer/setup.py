@@ -9,5 +9,8 @@ setup(
     install_requires=[
     ],
     entry_points={
+        "console_scripts": [
+            "analyzer-backfill=scripts.backfill:main",
+        ],
     },
 ) 
\ No newline at end of file
@@ -1,4 +1,6 @@
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, stream_with_context, g, send_file
+import hmac
+import json
 from flask_cors import CORS
 import os, sys
 from .cors_config import cors_config
@@ -9,11 +11,25 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # Cambiar al directorio raíz del analyzer para que las importaciones relativas funcionen
 os.chdir(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from init_analyzer import initiate_analyzer
+# Sólo lo liviano al importar: el análisis (tiktoken, langdetect, numpy,
+# Mongo) se importa en el primer request que lo usa, así `/` responde sin
+# cargarlo y el master de gunicorn puede precargar la app sin abrir
+# conexiones antes del fork (ver gunicorn.conf.py y services/warmup.py).
+from services.job_queue import JobQueue, QueueFullError
+from services.instrumentation import render_metrics
+from services.request_profiler import get_request_profiler
+from services.warmup import get_warmup_report
+from config import settings
 
 app = Flask(__name__)
 CORS(app, **cors_config)
 
+def _run_batch(items):
+    from init_analyzer import analyze_batch
+    return analyze_batch(items)
+
+job_queue = JobQueue(_run_batch)
+
 @app.route('/')
 def ping():
     """
@@ -21,19 +37,177 @@ def ping():
     """
     return jsonify({"status": "OK"}), 200
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    """
+    Estado de los caches en memoria de este worker (tamaño, hits, misses, hit
+    rate), uso de su pool de conexiones a Mongo y tiempos del warmup de arranque.
+    """
+    from db.agent_cache import get_agent_cache
+    from db.mongo_client import pool_stats
+    from services.token_cache import get_token_cache
+    return jsonify({
+        "pid": os.getpid(),
+        "agentCache": get_agent_cache().stats(),
+        "tokenCache": get_token_cache().stats(),
+        "mongoPool": pool_stats(),
+        "warmup": get_warmup_report()
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Duración por etapa del análisis y sesiones escritas por sink, en formato
+    de texto de Prometheus, sumadas entre todos los workers de gunicorn.
+    """
+    data, content_type = render_metrics()
+    return Response(data, content_type=content_type)
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
     """
     Endpoint interno para procesar una conversación.
     Recibe JSON en el body y devuelve el resultado de initiate_analyzer.
+    Si el body es una lista se procesa en modo batch: responde 207 con el
+    detalle por ítem cuando alguna conversación no se pudo guardar.
+
+    Con `?async=true` o el header `Prefer: respond-async` el payload se
+    encola y se responde 202 con el id del job; el estado se consulta en
+    /jobs/<id>.
     """
     raw = request.get_json()
+    if _wants_async():
+        return _enqueue(raw)
     try:
-        initiate_analyzer(raw)
+        from init_analyzer import initiate_analyzer
+        profiler = get_request_profiler()
+        if profiler.should_profile(request.headers):
+            result, g.profile_id = profiler.run(initiate_analyzer, raw)
+        else:
+            result = initiate_analyzer(raw)
+        if isinstance(raw, list):
+            return _batch_response(result)
         return jsonify({"status": "ok"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_ndjson_stream():
+    """
+    Ingesta en streaming: el body es NDJSON (una conversación por línea) y
+    la respuesta también, con una línea de resultado por conversación a
+    medida que se van analizando. El body nunca se materializa completo.
+    """
+    from init_analyzer import analyze_stream
+    lines = iter(request.stream.readline, b"")
+
+    def generate():
+        for result in analyze_stream(lines):
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route('/analyze/messages', methods=['POST'])
+def analyze_messages():
+    """
+    Análisis incremental: recibe los mensajes nuevos de una conversación
+    abierta ({"conversation", "messages"}) y actualiza su estado acumulado.
+    """
+    try:
+        from init_analyzer import ingest_messages
+        return jsonify({"status": "ok", **ingest_messages(request.get_json())}), 200
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/analyze/finalize', methods=['POST'])
+def analyze_finalize():
+    """
+    Cierra una conversación analizada con /analyze/messages: arma la sesión
+    con el estado acumulado y la guarda. Si se envían todos los mensajes y el
+    estado no alcanza, hace el análisis completo.
+    """
+    from services.incremental_analyzer import MissingStateError
+    try:
+        from init_analyzer import finalize_conversation
+        return jsonify({"status": "ok", **finalize_conversation(request.get_json())}), 200
+    except MissingStateError as e:
+        return jsonify({"error": str(e)}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    Perfiles guardados de los requests más lentos (ver services/request_profiler.py).
+    """
+    if not _is_admin():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"profiles": get_request_profiler().list()}), 200
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    Descarga un perfil en formato pstats (python -m pstats, snakeviz, tuna).
+    """
+    if not _is_admin():
+        return jsonify({"error": "Not found"}), 404
+    path = get_request_profiler().path_for(profile_id)
+    if path is None:
+        return jsonify({"error": f"Perfil {profile_id} no encontrado"}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=f"{profile_id}.prof")
+
+@app.after_request
+def add_profile_header(response):
+    profile_id = g.get("profile_id")
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Estado de un job asíncrono y de cada una de sus conversaciones.
+    """
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} no encontrado"}), 404
+    return jsonify(job), 200
+
+def _is_admin():
+    # Sin PROFILE_ADMIN_TOKEN los endpoints de admin no existen
+    token = settings.PROFILE_ADMIN_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), token.encode())
+
+def _wants_async():
+    if request.args.get("async", "").lower() in ("1", "true", "yes"):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
+def _enqueue(raw):
+    if not isinstance(raw, (dict, list)):
+        return jsonify({"error": "Expected JSON as dict or list of dicts."}), 400
+    try:
+        job = job_queue.submit(raw)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    status_url = f"/jobs/{job['id']}"
+    body = {"status": job["status"], "jobId": job["id"], "total": job["total"], "statusUrl": status_url}
+    return jsonify(body), 202, {"Location": status_url}
+
+def _batch_response(report):
+    errors = report["errors"]
+    body = {
+        "status": "partial" if errors else "ok",
+        "saved": len(report["sessions"]),
+        "failed": len({e["index"] for e in errors}),
+        "errors": errors
+    }
+    return jsonify(body), 207 if errors else 200
+
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 5000))
     app.run(host="0.0.0.0", port=port) 
\ No newline at end of file
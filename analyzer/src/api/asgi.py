@@ -0,0 +1,176 @@
+# analyzer/api/asgi.py
+
+import json
+import os, sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cors_config import cors_config
+
+# Añadir el directorio raíz del analyzer al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Cambiar al directorio raíz del analyzer para que las importaciones relativas funcionen
+os.chdir(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Igual que api/app.py: el análisis se importa en el primer request
+from services.instrumentation import render_metrics
+from services.warmup import get_warmup_report
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Headers = List[Tuple[bytes, bytes]]
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    """
+    Variante ASGI de la API de análisis (/, /stats, /metrics, /analyze).
+
+    Cada request es una corrutina: mientras una conversación espera a Mongo
+    (cliente async) el worker sigue con otras, y el análisis de CPU corre
+    fuera del event loop (ver process_conversation_async). Se sirve con
+    uvicorn, solo o como worker de gunicorn (gunicorn.conf.py aplica igual):
+
+        gunicorn api.asgi:app -k uvicorn.workers.UvicornWorker
+
+    El análisis incremental, /analyze/stream, los jobs y los perfiles
+    siguen en la app Flask (api/app.py).
+    """
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    route = _ROUTES.get(scope["path"])
+    cors = _cors_headers(scope)
+    if scope["method"] == "OPTIONS" and cors:
+        await _send(send, 204, b"", "text/plain", cors + [(b"access-control-max-age", str(cors_config["max_age"]).encode())])
+        return
+    if route is None:
+        await _send_json(send, 404, {"error": "Not found"}, cors)
+        return
+    method, handler = route
+    if scope["method"] != method:
+        await _send_json(send, 405, {"error": "Method not allowed"}, cors)
+        return
+    await handler(scope, receive, send, cors)
+
+
+async def ping(scope: Scope, receive: Receive, send: Send, cors: Headers) -> None:
+    """
+    Endpoint simple para testear si la API está funcionando.
+    """
+    await _send_json(send, 200, {"status": "OK"}, cors)
+
+
+async def stats(scope: Scope, receive: Receive, send: Send, cors: Headers) -> None:
+    """
+    Caches en memoria de este worker, su pool async de Mongo y el warmup.
+    """
+    from db.agent_cache import get_agent_cache
+    from db.mongo_client import async_pool_stats
+    from services.token_cache import get_token_cache
+    await _send_json(send, 200, {
+        "pid": os.getpid(),
+        "agentCache": get_agent_cache().stats(),
+        "tokenCache": get_token_cache().stats(),
+        "mongoPool": async_pool_stats(),
+        "warmup": get_warmup_report()
+    }, cors)
+
+
+async def metrics(scope: Scope, receive: Receive, send: Send, cors: Headers) -> None:
+    data, content_type = render_metrics()
+    await _send(send, 200, data, content_type, cors)
+
+
+async def analyze(scope: Scope, receive: Receive, send: Send, cors: Headers) -> None:
+    """
+    Igual que POST /analyze de api/app.py (sin el modo async con jobs):
+    una conversación responde 200; una lista, el reporte del lote con 207
+    si alguna conversación no se pudo guardar.
+    """
+    try:
+        raw = json.loads(await _read_body(receive) or b"null")
+    except ValueError:
+        await _send_json(send, 400, {"error": "Invalid JSON body."}, cors)
+        return
+    try:
+        from init_analyzer import initiate_analyzer_async
+        result = await initiate_analyzer_async(raw)
+        if isinstance(raw, list):
+            errors = result["errors"]
+            await _send_json(send, 207 if errors else 200, {
+                "status": "partial" if errors else "ok",
+                "saved": len(result["sessions"]),
+                "failed": len({e["index"] for e in errors}),
+                "errors": errors
+            }, cors)
+            return
+        await _send_json(send, 200, {"status": "ok"}, cors)
+    except Exception as e:
+        await _send_json(send, 500, {"error": str(e)}, cors)
+
+
+_ROUTES = {
+    "/": ("GET", ping),
+    "/stats": ("GET", stats),
+    "/metrics": ("GET", metrics),
+    "/analyze": ("POST", analyze)
+}
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            from db.mongo_client import close_async_client
+            await close_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def _cors_headers(scope: Scope) -> Headers:
+    # Mismo whitelist que flask_cors en api/app.py
+    origin = dict(scope.get("headers") or []).get(b"origin", b"").decode("latin-1")
+    if not origin or origin not in cors_config["origins"]:
+        return []
+    headers = [
+        (b"access-control-allow-origin", origin.encode("latin-1")),
+        (b"access-control-allow-methods", ", ".join(cors_config["methods"]).encode()),
+        (b"access-control-allow-headers", ", ".join(cors_config["allow_headers"]).encode()),
+        (b"vary", b"Origin")
+    ]
+    if cors_config["supports_credentials"]:
+        headers.append((b"access-control-allow-credentials", b"true"))
+    return headers
+
+
+async def _send_json(send: Send, status: int, body: Any, headers: Optional[Headers] = None) -> None:
+    data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+    await _send(send, status, data, "application/json", headers)
+
+
+async def _send(send: Send, status: int, data: bytes, content_type: str, headers: Optional[Headers] = None) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(data)).encode())]
+                   + list(headers or [])
+    })
+    await send({"type": "http.response.body", "body": data})
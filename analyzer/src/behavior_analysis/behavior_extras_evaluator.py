@@ -2,6 +2,8 @@
 import re
 from typing import List, Dict, Any
 from behavior_analysis.success_context import SuccessEvaluationContext
+from behavior_analysis.near_duplicates import MinHashLSH
+from config import settings
 from datetime import datetime
 from difflib import SequenceMatcher
 
@@ -12,7 +14,10 @@ class BehaviorExtrasEvaluator:
             if "long_user_interaction" not in context.tags:
                 context.tags.append("long_user_interaction")
 
-            if self._detect_repeated_messages(context.messages):
+            repeated = context.repeated_messages
+            if repeated is None:
+                repeated = self._detect_repeated_messages(context.frame.user_lowered)
+            if repeated:
                 context.score -= 1
                 if "soft.repetition" in context.tags:
                     tag_to_add = "hard.repetition"
@@ -29,19 +34,35 @@ class BehaviorExtrasEvaluator:
 
         return context
 
-    def _detect_repeated_messages(self, messages: list) -> bool:
-        user_texts = [msg["text"].lower() for msg in messages if msg["direction"] == "user"]
-        for i in range(len(user_texts)):
-            for j in range(i + 1, len(user_texts)):
-                if self._is_similar(user_texts[i], user_texts[j]):
-                    return True
-        return False
+    def _detect_repeated_messages(self, user_texts: List[str]) -> bool:
+        """
+        `user_texts` son los textos del usuario ya en minúsculas (frame.user_lowered).
+        """
+        # Los mensajes cortos nunca cuentan como repetidos (ver _is_similar)
+        candidates = [t for t in user_texts if len(t.split()) >= settings.REPETITION_MIN_WORDS]
 
-    def _is_similar(self, msg1: str, msg2: str, min_words=20, threshold=0.6) -> bool:
-        if len(msg1.split()) < min_words or len(msg2.split()) < min_words:
+        # Con pocos mensajes la comparación exacta de todos los pares es barata
+        if len(candidates) <= settings.REPETITION_EXACT_MAX_MESSAGES:
+            for i in range(len(candidates)):
+                for j in range(i + 1, len(candidates)):
+                    if self._is_similar(candidates[i], candidates[j]):
+                        return True
             return False
-        ratio = SequenceMatcher(None, msg1, msg2).ratio()
-        return ratio >= threshold
+
+        # Conversaciones largas: MinHash/LSH propone pares y sólo esos se verifican
+        lsh = MinHashLSH(
+            num_perm=settings.REPETITION_MINHASH_PERM,
+            bands=settings.REPETITION_LSH_BANDS,
+            jaccard_floor=settings.REPETITION_JACCARD_FLOOR,
+            shingle_size=settings.REPETITION_SHINGLE_SIZE
+        )
+        for i, j, _ in lsh.candidate_pairs(candidates):
+            if self._is_similar(candidates[i], candidates[j]):
+                return True
+        return False
+
+    def _is_similar(self, msg1: str, msg2: str, min_words=None, threshold=None) -> bool:
+        return is_similar_message(msg1, msg2, min_words, threshold)
 
     def _is_long_duration(self, conversation: dict) -> bool:
         try:
@@ -51,3 +72,16 @@ class BehaviorExtrasEvaluator:
             return duration_minutes > 20
         except Exception:
             return False
+
+
+def is_similar_message(msg1: str, msg2: str, min_words=None, threshold=None) -> bool:
+    """
+    Dos mensajes del usuario cuentan como repetidos si ambos tienen al menos
+    `min_words` palabras y su similitud (difflib) alcanza `threshold`.
+    """
+    min_words = settings.REPETITION_MIN_WORDS if min_words is None else min_words
+    threshold = settings.REPETITION_SIMILARITY if threshold is None else threshold
+    if len(msg1.split()) < min_words or len(msg2.split()) < min_words:
+        return False
+    ratio = SequenceMatcher(None, msg1, msg2).ratio()
+    return ratio >= threshold
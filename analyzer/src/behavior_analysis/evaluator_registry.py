@@ -0,0 +1,113 @@
+# analyzer/behavior_analysis/evaluator_registry.py
+
+import hashlib
+import importlib
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from config import settings
+
+# Orden de ejecución: primero lo barato
+COST_CLASSES = ("cheap", "moderate", "expensive")
+
+
+class EvaluatorSpec:
+    """
+    Un evaluador declarado en evaluators.yaml, ya instanciado.
+
+    - score_min / score_max: lo mínimo y lo máximo que puede sumar al
+      score (None = sin límite); con eso el motor sabe cuándo el resultado
+      ya no puede cambiar.
+    - after: evaluadores que tienen que correr antes (p. ej. porque leen
+      sus tags).
+    - expected_ms: tiempo esperado por conversación. Sólo se observa (queda
+      overExpected en la traza); nunca saltea evaluadores, para que el
+      resultado no dependa de la carga de la máquina.
+    """
+    def __init__(self, name: str, evaluator: Any, cost: str, expected_ms: Optional[float],
+                 after: List[str], score_min: Optional[float], score_max: Optional[float]):
+        self.name = name
+        self.evaluator = evaluator
+        self.cost = cost
+        self.expected_ms = expected_ms
+        self.after = after
+        self.score_min = score_min
+        self.score_max = score_max
+
+
+class EvaluatorRegistry:
+    """
+    Evaluadores de éxito declarados en evaluators.yaml, en el orden en que se
+    corren: respetando `after` y, entre los que están listos, de menor a
+    mayor costo (a igual costo, en el orden del archivo).
+
+    Se carga una vez por proceso; las instancias se reutilizan en todas las
+    conversaciones, así que cada evaluador tiene que ser sin estado (o
+    inmutable) entre llamadas a run(context).
+    """
+    def __init__(self, filepath: Optional[str] = None, short_circuit: Optional[bool] = None):
+        self.filepath = filepath or settings.EVALUATORS_FILE or os.path.join(os.path.dirname(__file__), "evaluators.yaml")
+        self.short_circuit = settings.EVALUATOR_SHORT_CIRCUIT if short_circuit is None else short_circuit
+        with open(self.filepath, "rb") as f:
+            content = f.read()
+        # Cambia si cambia el archivo o el short-circuit (cambian los tags): entra en el fingerprint
+        self.version = hashlib.sha256(content + (b"|short-circuit" if self.short_circuit else b"")).hexdigest()[:16]
+        self.evaluators = _order(_load_specs(yaml.safe_load(content) or {}))
+
+
+def _load_specs(config: Dict[str, Any]) -> List[EvaluatorSpec]:
+    specs = []
+    for entry in config.get("evaluators") or []:
+        name = entry["name"]
+        cost = entry.get("cost", "moderate")
+        if cost not in COST_CLASSES:
+            raise ValueError(f"Evaluador '{name}': cost debe ser uno de {', '.join(COST_CLASSES)}")
+        module_name, _, class_name = entry["class"].rpartition(".")
+        evaluator = getattr(importlib.import_module(module_name), class_name)()
+        score_min, score_max = entry.get("score_delta") or (None, None)
+        # budget_ms es el nombre viejo de expected_ms: se sigue aceptando
+        expected_ms = entry.get("expected_ms", entry.get("budget_ms"))
+        specs.append(EvaluatorSpec(name, evaluator, cost, expected_ms, list(entry.get("after") or []),
+                                   score_min, score_max))
+    return specs
+
+
+def _order(specs: List[EvaluatorSpec]) -> List[EvaluatorSpec]:
+    names = {spec.name for spec in specs}
+    for spec in specs:
+        missing = [dep for dep in spec.after if dep not in names]
+        if missing:
+            raise ValueError(f"Evaluador '{spec.name}': after desconocido {', '.join(missing)}")
+
+    rank = {spec.name: (COST_CLASSES.index(spec.cost), i) for i, spec in enumerate(specs)}
+    ordered: List[EvaluatorSpec] = []
+    done = set()
+    pending = list(specs)
+    while pending:
+        ready = [spec for spec in pending if all(dep in done for dep in spec.after)]
+        if not ready:
+            raise ValueError(f"Dependencias circulares entre evaluadores: {', '.join(s.name for s in pending)}")
+        spec = min(ready, key=lambda s: rank[s.name])
+        ordered.append(spec)
+        done.add(spec.name)
+        pending.remove(spec)
+    return ordered
+
+
+_registry: Optional[EvaluatorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_evaluator_registry() -> EvaluatorRegistry:
+    """
+    Devuelve el registro de evaluadores del proceso (se crea en el primer uso).
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = EvaluatorRegistry()
+    return _registry
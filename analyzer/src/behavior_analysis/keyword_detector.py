@@ -1,22 +1,36 @@
 # analyzer/behavior_analysis/keyword_detector.py
 
+from typing import Dict, Optional
 from behavior_analysis.success_context import SuccessEvaluationContext
-from behavior_analysis.keyword_loader import load_keywords
-from utils.util_get_messages_by_direction import get_messages_by_direction
-import os
+from behavior_analysis.keyword_registry import KeywordRegistry, get_keyword_registry
 
-class KeywordDetector:
-    def __init__(self):
-        self.keywords = load_keywords()
+NEGATIVE_CATEGORIES = ["frustration", "repetition", "escalation", "confusion"]
+POSITIVE_CATEGORY = "positive_closing"
 
-    def run(self, context: SuccessEvaluationContext) -> SuccessEvaluationContext:
-        negative_categories = ["frustration", "repetition", "escalation", "confusion"]
-        positive_category = "positive_closing"
 
-        user_messages = get_messages_by_direction(context.messages, "user")
+class KeywordDetector:
+    def __init__(self, registry: Optional[KeywordRegistry] = None):
+        # Las keywords ya vienen compiladas del registro del proceso: crear
+        # un detector por conversación no vuelve a leer keywords.yaml.
+        self.registry = registry or get_keyword_registry()
 
-        for category in negative_categories:
-            hits = sum(1 for kw in self.keywords.get(category, []) if any(kw in msg["text"].lower() for msg in user_messages))
+    def run(self, context: SuccessEvaluationContext) -> SuccessEvaluationContext:
+        hits_by_category = context.keyword_hits
+        if hits_by_category is None:
+            hits_by_category = self.count_hits(context)
+        return self.score(context, hits_by_category)
+
+    def count_hits(self, context: SuccessEvaluationContext) -> Dict[str, int]:
+        matcher = self.registry.get().matcher_for(context.language)
+        # Un solo recorrido por mensaje para todas las keywords de todas las categorías
+        return matcher.count_hits(context.frame.user_lowered)
+
+    def score(self, context: SuccessEvaluationContext, hits_by_category: Dict[str, int]) -> SuccessEvaluationContext:
+        """
+        Aplica al contexto el puntaje y los tags de los hits por categoría.
+        """
+        for category in NEGATIVE_CATEGORIES:
+            hits = hits_by_category.get(category, 0)
             if hits >= 2:
                 context.score -= min(2, hits)
                 if category not in context.tags:
@@ -24,9 +38,9 @@ class KeywordDetector:
                     context.tags.append(tag_to_add)
 
 
-        hits = sum(1 for kw in self.keywords.get(positive_category, []) if any(kw in msg["text"].lower() for msg in user_messages))
+        hits = hits_by_category.get(POSITIVE_CATEGORY, 0)
         context.score += hits
-        if hits >= 2 and positive_category not in context.tags:
-            context.tags.append(positive_category)
+        if hits >= 2 and POSITIVE_CATEGORY not in context.tags:
+            context.tags.append(POSITIVE_CATEGORY)
 
         return context
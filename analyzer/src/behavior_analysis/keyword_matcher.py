@@ -0,0 +1,136 @@
+# analyzer/behavior_analysis/keyword_matcher.py
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Salida de un estado del autómata: (categoría, keyword, largo de la keyword)
+_Output = Tuple[str, str, int]
+
+
+class KeywordMatcher:
+    """
+    Autómata Aho-Corasick con todas las keywords de todas las categorías.
+
+    Se compila una sola vez y cada texto se recorre una única vez sin importar
+    cuántas keywords haya; cada match indica a qué categoría pertenece.
+
+    Opciones:
+      - word_boundary: la keyword sólo cuenta si no está pegada a otra letra
+        o número (evita que "mal" matchee dentro de "normal").
+      - accent_insensitive: ignora tildes en keywords y textos ("resolvio"
+        matchea "resolvió").
+    """
+
+    def __init__(self, keywords_by_category: Dict[str, Iterable[str]],
+                 word_boundary: bool = False, accent_insensitive: bool = False):
+        self.word_boundary = word_boundary
+        self.accent_insensitive = accent_insensitive
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[_Output, ...]] = [()]
+        # Cantidad de veces que cada keyword figura en su categoría; el detector
+        # original contaba cada entrada de la lista, duplicados incluidos.
+        self._weights: Dict[Tuple[str, str], int] = {}
+
+        for category, keywords in keywords_by_category.items():
+            for kw in keywords or []:
+                pattern = self.normalize(str(kw))
+                if not pattern:
+                    continue
+                key = (category, pattern)
+                if key not in self._weights:
+                    self._add(pattern, (category, pattern, len(pattern)))
+                self._weights[key] = self._weights.get(key, 0) + 1
+
+        self._build_failure_links()
+
+    def normalize(self, text: str) -> str:
+        text = text.lower()
+        if self.accent_insensitive:
+            text = "".join(
+                ch for ch in unicodedata.normalize("NFKD", text)
+                if not unicodedata.combining(ch)
+            )
+        return text
+
+    def find(self, text: str) -> Dict[str, Set[str]]:
+        """
+        Devuelve {categoría: {keywords encontradas}} para un texto.
+        """
+        found: Dict[str, Set[str]] = {}
+        text = self.normalize(text)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for category, kw, length in outputs[state]:
+                if self.word_boundary and not self._at_word_boundary(text, i - length + 1, i + 1, kw):
+                    continue
+                found.setdefault(category, set()).add(kw)
+        return found
+
+    def count_hits(self, texts: Iterable[str]) -> Dict[str, int]:
+        """
+        Para cada categoría cuenta cuántas keywords aparecen en al menos uno
+        de los textos (la misma semántica que KeywordDetector tenía antes).
+        """
+        return self.weigh(self.collect(texts))
+
+    def collect(self, texts: Iterable[str], seen: Optional[Dict[str, Set[str]]] = None) -> Dict[str, Set[str]]:
+        """
+        Junta en `seen` las keywords encontradas en los textos, por categoría.
+        Permite acumular de a un mensaje (ver services/incremental_analyzer.py).
+        """
+        seen = {} if seen is None else seen
+        for text in texts:
+            for category, kws in self.find(text or "").items():
+                seen.setdefault(category, set()).update(kws)
+        return seen
+
+    def weigh(self, seen: Dict[str, Iterable[str]]) -> Dict[str, int]:
+        """
+        Convierte keywords encontradas en hits por categoría, contando las
+        repetidas en la lista tantas veces como figuren. Las keywords que ya
+        no están en este matcher no suman.
+        """
+        return {
+            category: sum(self._weights.get((category, kw), 0) for kw in kws)
+            for category, kws in seen.items()
+        }
+
+    def _add(self, pattern: str, output: _Output) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(())
+            state = nxt
+        self._outputs[state] += (output,)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._outputs[nxt] += self._outputs[self._fail[nxt]]
+
+    @staticmethod
+    def _at_word_boundary(text: str, start: int, end: int, kw: str) -> bool:
+        if kw[0].isalnum() and start > 0 and text[start - 1].isalnum():
+            return False
+        if kw[-1].isalnum() and end < len(text) and text[end].isalnum():
+            return False
+        return True
@@ -0,0 +1,128 @@
+# analyzer/behavior_analysis/keyword_registry.py
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import yaml
+
+from behavior_analysis.keyword_matcher import KeywordMatcher
+from config import settings
+
+# Claves de keywords.yaml que no son categorías de keywords
+_RESERVED_KEYS = {"matching", "languages"}
+
+
+class KeywordSnapshot:
+    """
+    Versión inmutable de la configuración de keywords ya compilada.
+
+    - version: hash del contenido de keywords.yaml (cambia si cambia el archivo).
+    - default: matcher con las categorías de primer nivel del YAML.
+    - packs: matchers por idioma definidos bajo `languages:`.
+    """
+    def __init__(self, version: str, default: KeywordMatcher, packs: Dict[str, KeywordMatcher]):
+        self.version = version
+        self.default = default
+        self.packs = packs
+
+    def matcher_for(self, language: Optional[str]) -> KeywordMatcher:
+        """
+        Devuelve el pack del idioma detectado; si no hay uno específico,
+        el pack por defecto.
+        """
+        return self.packs.get(language, self.default) if language else self.default
+
+
+class KeywordRegistry:
+    """
+    Registro de keywords compartido por todo el proceso.
+
+    Parsea y compila keywords.yaml una sola vez y, cada `check_interval`
+    segundos como máximo, mira el mtime del archivo: si cambió y el hash del
+    contenido también, arma un snapshot nuevo y lo reemplaza de una sola vez.
+    Quien ya tenía el snapshot anterior lo sigue usando hasta terminar.
+    """
+    def __init__(self, filepath: Optional[str] = None, check_interval: Optional[float] = None):
+        self.filepath = filepath or settings.KEYWORDS_FILE or os.path.join(os.path.dirname(__file__), "keywords.yaml")
+        self.check_interval = settings.KEYWORDS_RELOAD_INTERVAL if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[KeywordSnapshot] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+
+    def get(self) -> KeywordSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._last_check >= self.check_interval:
+            self.reload()
+            snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def version(self) -> str:
+        return self.get().version
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recarga el YAML si cambió. Retorna True si se instaló un snapshot nuevo.
+        Si el archivo nuevo es inválido se conserva el snapshot anterior.
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            mtime = os.path.getmtime(self.filepath)
+            if not force and self._snapshot is not None and mtime == self._mtime:
+                return False
+
+            with open(self.filepath, "rb") as f:
+                content = f.read()
+            version = hashlib.sha256(content).hexdigest()[:16]
+            self._mtime = mtime
+            if not force and self._snapshot is not None and version == self._snapshot.version:
+                return False
+
+            try:
+                snapshot = _compile(yaml.safe_load(content) or {}, version)
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                print(f"⚠️ keywords.yaml inválido, se mantiene la versión {self._snapshot.version}: {e}")
+                return False
+
+            self._snapshot = snapshot
+            return True
+
+
+def _compile(config: dict, version: str) -> KeywordSnapshot:
+    matching = config.get("matching") or {}
+    default = _build_matcher(config, matching)
+    packs = {
+        lang: _build_matcher(pack or {}, {**matching, **((pack or {}).get("matching") or {})})
+        for lang, pack in (config.get("languages") or {}).items()
+    }
+    return KeywordSnapshot(version, default, packs)
+
+
+def _build_matcher(categories: dict, matching: dict) -> KeywordMatcher:
+    return KeywordMatcher(
+        {k: v for k, v in categories.items() if k not in _RESERVED_KEYS},
+        word_boundary=matching.get("word_boundary", False),
+        accent_insensitive=matching.get("accent_insensitive", False),
+    )
+
+
+_registry: Optional[KeywordRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_keyword_registry() -> KeywordRegistry:
+    """
+    Devuelve el registro de keywords del proceso (se crea en el primer uso).
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = KeywordRegistry()
+    return _registry
@@ -1,16 +1,34 @@
 # analyzer/behavior_analysis/success_context.py
 
+from utils.conversation_frame import ConversationFrame
+
 class SuccessEvaluationContext:
     """
     Contiene el estado de una conversación que será evaluada para determinar si fue exitosa.
     """
-    def __init__(self, conversation: dict, messages: list, message_stats: dict):
+    def __init__(self, conversation: dict, messages: list, message_stats: dict, language: str = None,
+                 frame: ConversationFrame = None, keyword_hits: dict = None, repeated_messages: bool = None):
         self.conversation = conversation
         self.messages = messages
         self.message_stats = message_stats
+        self.language = language #Idioma detectado; elige el pack de keywords
+        # Resultados ya calculados de forma incremental; None = calcularlos del frame
+        self.keyword_hits = keyword_hits
+        self.repeated_messages = repeated_messages
+        self._frame = frame
         self.score = 0
         self.tags = []
 
+    @property
+    def frame(self) -> ConversationFrame:
+        """
+        Mensajes ya ordenados y separados por dirección; se arma sólo si algún
+        evaluador lo necesita.
+        """
+        if self._frame is None:
+            self._frame = ConversationFrame.from_messages(self.messages)
+        return self._frame
+
     def get_score(self) -> int:
         return self.score
 
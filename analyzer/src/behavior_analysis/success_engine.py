@@ -1,21 +1,47 @@
 # analyzer/behavior_analysis/success_engine.py
 
+import math
+import time
+from typing import Any, Dict, List, Optional
+
 from behavior_analysis.success_context import SuccessEvaluationContext
-from behavior_analysis.keyword_detector import KeywordDetector
-from behavior_analysis.behavior_extras_evaluator import BehaviorExtrasEvaluator
+from behavior_analysis.evaluator_registry import EvaluatorRegistry, EvaluatorSpec, get_evaluator_registry
+from services.instrumentation import timed
 
 class SuccessEvaluatorEngine:
     """
-    Ejecuta los módulos de análisis sobre un contexto dado,
-    y define si la conversación fue exitosa.
+    Ejecuta los evaluadores del registro (evaluators.yaml) sobre un contexto
+    dado, del más barato al más caro, y define si la conversación fue
+    exitosa (score > 0).
+
+    Con short-circuit, antes de cada evaluador se mira si lo que queda por
+    correr todavía puede cambiar el resultado; si no, se saltean todos.
+    get_trace() dice cuáles corrieron y cuánto tardó cada uno (overExpected
+    si pasó su expected_ms; es sólo informativo).
     """
-    def __init__(self, context: SuccessEvaluationContext):
+    def __init__(self, context: SuccessEvaluationContext, registry: Optional[EvaluatorRegistry] = None):
         self.context = context
+        self.registry = registry or get_evaluator_registry()
+        self.trace: List[Dict[str, Any]] = []
 
     def run(self) -> bool:
-        KeywordDetector().run(self.context)
-        BehaviorExtrasEvaluator().run(self.context)
-        #TODO: HERE WE WILL CALLL TO SENTIMENT ANALYSIS IN THE FUTURE
+        specs = self.registry.evaluators
+        for i, spec in enumerate(specs):
+            if self.registry.short_circuit and _outcome_decided(self.context.score, specs[i:]):
+                self.trace.extend({"name": s.name, "cost": s.cost, "ran": False, "skipped": "outcome_decided"}
+                                  for s in specs[i:])
+                break
+            start = time.perf_counter()
+            with timed(f"evaluator.{spec.name}"):
+                spec.evaluator.run(self.context)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.trace.append({
+                "name": spec.name,
+                "cost": spec.cost,
+                "ran": True,
+                "ms": round(elapsed_ms, 3),
+                "overExpected": spec.expected_ms is not None and elapsed_ms > spec.expected_ms
+            })
         return self._define_score_result()
 
     def _define_score_result(self) -> bool:
@@ -30,4 +56,16 @@ class SuccessEvaluatorEngine:
         return self.context.get_score()
 
     def get_tags (self) -> int:
-        return self.context.get_tags()
\ No newline at end of file
+        return self.context.get_tags()
+
+    def get_trace(self) -> List[Dict[str, Any]]:
+        return self.trace
+
+
+def _outcome_decided(score: float, remaining: List[EvaluatorSpec]) -> bool:
+    # Peor y mejor score posibles con lo que falta: si los dos caen del mismo lado de 0 ya está decidido
+    low = high = score
+    for spec in remaining:
+        low = -math.inf if spec.score_min is None else low + spec.score_min
+        high = math.inf if spec.score_max is None else high + spec.score_max
+    return low > 0 or high <= 0
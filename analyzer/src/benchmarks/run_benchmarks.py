@@ -0,0 +1,359 @@
+# analyzer/benchmarks/run_benchmarks.py
+"""
+Micro-benchmarks de cada etapa del análisis sobre conversaciones
+sintéticas (scripts/synthetic_conversations.py), comparados contra los
+tiempos guardados en benchmarks/baselines.json.
+
+    python -m benchmarks.run_benchmarks                      # medir y comparar
+    python -m benchmarks.run_benchmarks --stage keyword_detector
+    python -m benchmarks.run_benchmarks --update-baselines   # guardar los tiempos actuales
+
+Cada etapa corre `--repeats` veces sobre todo el lote y se toma la mejor
+vuelta, con los caches de tokens e idioma vaciados antes de cada una.
+Los tiempos se normalizan con una vuelta de calibración (Python puro) para
+que las baselines sirvan en otra máquina; una etapa más lenta que su
+baseline por más de `--tolerance` veces cuenta como regresión y el comando
+sale con código 1, igual que si una etapa falla. process_conversation corre
+sin Mongo: el agente es fijo y la sesión no se guarda. Los tokens se cuentan
+sin red con un encoding byte-level de tiktoken armado en el momento (ver
+_offline_encoding): mismo camino de código, tiempos comparables entre máquinas.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from scripts.synthetic_conversations import ConversationGenerator
+from utils.conversation_frame import ConversationFrame
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 1.5
+
+BENCH_AGENT = {"_id": "agent-bench", "modelName": "gpt-4o", "name": "Bench", "userId": "usr-bench"}
+
+
+class Workload:
+    """
+    Lote de conversaciones sintéticas con sus frames e idiomas ya calculados,
+    para que cada etapa mida sólo su propio trabajo.
+    """
+    def __init__(self, conversations: int, seed: int):
+        self.conversations = conversations
+        self.seed = seed
+        generator = ConversationGenerator(
+            seed=seed, messages=(6, 40), languages={"es": 0.7, "en": 0.2, "pt": 0.1},
+            repetition_rate=0.1, keyword_density=0.2
+        )
+        self.raws = list(generator.generate(conversations))
+        self.frames = [ConversationFrame.from_messages(raw["messages"]) for raw in self.raws]
+        self._languages: Optional[List[str]] = None
+
+    @property
+    def languages(self) -> List[str]:
+        if self._languages is None:
+            from services.language_detector import ConversationLanguageDetector
+            self._languages = [
+                ConversationLanguageDetector.from_frame(f).get_predominant_language() or "unknown" for f in self.frames
+            ]
+        return self._languages
+
+    def contexts(self) -> list:
+        from behavior_analysis.success_context import SuccessEvaluationContext
+        return [
+            SuccessEvaluationContext(raw["conversation"], raw["messages"], {
+                "user_count": frame.user_count, "agent_count": frame.agent_count, "total_count": len(frame)
+            }, language, frame)
+            for raw, frame, language in zip(self.raws, self.frames, self.languages)
+        ]
+
+
+# Cada etapa devuelve (setup, run): setup() prepara el estado fuera de la
+# medición y run(estado) es lo que se cronometra.
+Stage = Tuple[Callable[[], Any], Callable[[Any], None]]
+
+
+def _clear_caches() -> None:
+    from services import language_detector
+    from services.token_cache import get_token_cache
+    get_token_cache().clear()
+    with language_detector._cache_lock:
+        language_detector._cache.clear()
+
+
+def _stage_conversation_frame(w: Workload) -> Stage:
+    # Reemplaza a _normalize_messages: parseo, orden y separación por dirección
+    def run(_):
+        for raw in w.raws:
+            ConversationFrame.from_messages(raw["messages"])
+    return (lambda: None), run
+
+
+def _stage_tokenize_texts(w: Workload) -> Stage:
+    from services.token_utils import tokenize_texts
+
+    def run(_):
+        with _offline_encoding():
+            for frame in w.frames:
+                tokenize_texts(frame.agent_texts, BENCH_AGENT["modelName"])
+    return _clear_caches, run
+
+
+def _stage_language_detector(w: Workload) -> Stage:
+    from services.language_detector import ConversationLanguageDetector
+
+    def run(_):
+        for frame in w.frames:
+            ConversationLanguageDetector.from_frame(frame).get_predominant_language()
+    return _clear_caches, run
+
+
+def _stage_keyword_detector(w: Workload) -> Stage:
+    from behavior_analysis.keyword_detector import KeywordDetector
+    detector = KeywordDetector()
+
+    def run(contexts):
+        for context in contexts:
+            detector.run(context)
+    return w.contexts, run
+
+
+def _stage_behavior_extras(w: Workload) -> Stage:
+    from behavior_analysis.behavior_extras_evaluator import BehaviorExtrasEvaluator
+    evaluator = BehaviorExtrasEvaluator()
+
+    def run(contexts):
+        for context in contexts:
+            evaluator.run(context)
+    return w.contexts, run
+
+
+def _stage_latency_calculator(w: Workload) -> Stage:
+    from services.latency_calculator import LatencyCalculator
+
+    def run(_):
+        for frame in w.frames:
+            LatencyCalculator(frame).calculate_average_latency()
+    return (lambda: None), run
+
+
+def _stage_batch_metrics(w: Workload) -> Stage:
+    from services.batch_metrics import compute_batch_metrics
+    return (lambda: None), (lambda _: compute_batch_metrics(w.frames))
+
+
+def _stage_process_conversation(w: Workload) -> Stage:
+    from services.conversation_handler import process_conversation
+
+    def run(_):
+        with _offline_storage(), _offline_encoding():
+            for raw in w.raws:
+                process_conversation(raw)
+    return _clear_caches, run
+
+
+@contextmanager
+def _offline_storage():
+    """
+    process_conversation sin Mongo: agente fijo, sin buscar la sesión
+    guardada y sin persistirla.
+    """
+    import services.conversation_handler as handler
+    saved = handler.get_agent_for_conversation, handler.persist_session, settings.SESSION_DEDUP
+    handler.get_agent_for_conversation = lambda conversation: BENCH_AGENT
+    handler.persist_session = lambda session_doc: None
+    settings.SESSION_DEDUP = False
+    try:
+        yield
+    finally:
+        handler.get_agent_for_conversation, handler.persist_session, settings.SESSION_DEDUP = saved
+
+
+@lru_cache(maxsize=None)
+def _bench_encoding():
+    import tiktoken
+    from tiktoken_ext.openai_public import r50k_pat_str
+    # Sin merges: cada byte es un token. Pasa por el mismo split por regex,
+    # BPE nativo y encode_batch en hilos que un encoding real
+    return tiktoken.Encoding("bench_bytes", pat_str=r50k_pat_str,
+                             mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={})
+
+
+@contextmanager
+def _offline_encoding():
+    """
+    Conteo de tokens sin descargar las tablas BPE de tiktoken.
+    """
+    from services import token_utils
+    saved = token_utils.get_encoding
+    token_utils.get_encoding = lambda encoding_name: _bench_encoding()
+    try:
+        yield
+    finally:
+        token_utils.get_encoding = saved
+
+
+STAGES: Dict[str, Callable[[Workload], Stage]] = {
+    "conversation_frame": _stage_conversation_frame,
+    "tokenize_texts": _stage_tokenize_texts,
+    "language_detector": _stage_language_detector,
+    "keyword_detector": _stage_keyword_detector,
+    "behavior_extras": _stage_behavior_extras,
+    "latency_calculator": _stage_latency_calculator,
+    "batch_metrics": _stage_batch_metrics,
+    "process_conversation": _stage_process_conversation,
+}
+
+
+def calibrate(repeats: int = 20) -> float:
+    """
+    Segundos de una carga fija de Python puro (dicts, strings, sort):
+    la unidad con la que se comparan máquinas distintas.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        counts: Dict[str, int] = {}
+        for i in range(100_000):
+            key = str(i % 997)
+            counts[key] = counts.get(key, 0) + 1
+        sorted(counts.items(), key=lambda kv: (kv[1], kv[0]))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(stage: Stage, repeats: int) -> float:
+    setup, run = stage
+    best = float("inf")
+    for _ in range(max(1, repeats)):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(names: List[str], conversations: int, repeats: int, seed: int = 0) -> Dict[str, Any]:
+    workload = Workload(conversations, seed)
+    results: Dict[str, Any] = {
+        "conversations": conversations,
+        "seed": seed,
+        "calibrationSeconds": calibrate(),
+        "python": platform.python_version(),
+        "stages": {},
+    }
+    for name in names:
+        try:
+            stage = STAGES[name](workload)
+            measure(stage, 1)  # calentamiento: imports y snapshots perezosos
+            seconds = measure(stage, repeats)
+        except Exception as e:
+            results["stages"][name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        results["stages"][name] = {"seconds": seconds, "perConversationMicros": seconds / conversations * 1e6}
+        # La calibración también se queda con la mejor vuelta de toda la
+        # corrida: una sola ventana al principio varía x2 en máquinas compartidas
+        results["calibrationSeconds"] = min(results["calibrationSeconds"], calibrate())
+    return results
+
+
+def compare(results: Dict[str, Any], baselines: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Etapas cuyo tiempo normalizado por la calibración supera
+    `tolerance` veces el de la baseline.
+    """
+    if not baselines:
+        print("⚠️ No hay baselines guardadas (--update-baselines): no se compara")
+        return []
+    if baselines.get("conversations") != results["conversations"] or baselines.get("seed") != results["seed"]:
+        print("⚠️ La baseline se midió con otro lote (--conversations/--seed): no se compara")
+        return []
+
+    regressions = []
+    scale = results["calibrationSeconds"] / baselines["calibrationSeconds"]
+    for name, result in results["stages"].items():
+        baseline = baselines.get("stages", {}).get(name)
+        if "seconds" not in result:
+            continue
+        if not baseline:
+            print(f"⚠️ {name} no tiene baseline (--update-baselines --stage {name}): no se compara")
+            continue
+        ratio = result["seconds"] / (baseline["seconds"] * scale)
+        result["ratio"] = ratio
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def load_baselines(path: str = BASELINES_FILE) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, Any], path: str = BASELINES_FILE) -> None:
+    # Se conservan las etapas que no se midieron (o fallaron) en esta corrida
+    baselines = load_baselines(path)
+    same_workload = baselines.get("conversations") == results["conversations"] and baselines.get("seed") == results["seed"]
+    stages = dict(baselines.get("stages", {})) if same_workload else {}
+    if stages and baselines.get("calibrationSeconds"):
+        # Las que se conservan se llevan a la calibración nueva
+        scale = results["calibrationSeconds"] / baselines["calibrationSeconds"]
+        stages = {name: {"seconds": s["seconds"] * scale} for name, s in stages.items()}
+    stages.update({name: {"seconds": r["seconds"]} for name, r in results["stages"].items() if "seconds" in r})
+
+    data = {k: results[k] for k in ("conversations", "seed", "calibrationSeconds", "python")}
+    data["stages"] = dict(sorted(stages.items()))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def _print_report(results: Dict[str, Any]) -> None:
+    print(f"{'etapa':<22}{'total (s)':>12}{'µs/conv':>12}{'vs baseline':>14}")
+    for name, result in results["stages"].items():
+        if "error" in result:
+            print(f"{name:<22}{'error':>12}  {result['error']}")
+            continue
+        ratio = f"x{result['ratio']:.2f}" if "ratio" in result else "-"
+        print(f"{name:<22}{result['seconds']:>12.4f}{result['perConversationMicros']:>12.1f}{ratio:>14}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de las etapas del análisis.")
+    parser.add_argument("--stage", action="append", choices=list(STAGES), help="Etapa a medir (repetible); todas por defecto")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baselines", default=BASELINES_FILE)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.stage or list(STAGES), args.conversations, args.repeats, args.seed)
+    failed = [name for name, result in results["stages"].items() if "error" in result]
+    if args.update_baselines:
+        save_baselines(results, args.baselines)
+        _print_report(results)
+        print(f"✅ Baselines guardadas en {args.baselines}")
+    else:
+        regressions = compare(results, load_baselines(args.baselines), args.tolerance)
+        _print_report(results)
+        if regressions:
+            print(f"❌ Regresiones (> x{args.tolerance}): {', '.join(regressions)}")
+            return 1
+    if failed:
+        print(f"❌ Etapas con error: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
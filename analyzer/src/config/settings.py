@@ -0,0 +1,165 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Workers de gunicorn (gunicorn.conf.py)
+GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", 2))
+
+# Ejecución en paralelo de lotes de conversaciones (init_analyzer.analyze_batch)
+# ANALYZER_WORKERS <= 1 procesa el lote en serie dentro del mismo proceso.
+# Cada worker de gunicorn tiene su propio pool: por defecto se reparten los
+# CPUs entre ellos. Los procesos del pool salen de un forkserver y no de un
+# fork del worker, que ya tiene hilos corriendo (precios, writer, jobs).
+ANALYZER_WORKERS = int(os.getenv("ANALYZER_WORKERS", max(1, (os.cpu_count() or 1) // max(1, GUNICORN_WORKERS))))
+ANALYZER_CHUNK_SIZE = int(os.getenv("ANALYZER_CHUNK_SIZE", 25))
+ANALYZER_PARALLEL_MIN_BATCH = int(os.getenv("ANALYZER_PARALLEL_MIN_BATCH", 50))
+ANALYZER_MP_START_METHOD = os.getenv("ANALYZER_MP_START_METHOD", "forkserver")
+
+# Registro de keywords (behavior_analysis/keyword_registry.py)
+# KEYWORDS_FILE permite apuntar a otro keywords.yaml; el archivo se revisa
+# cada KEYWORDS_RELOAD_INTERVAL segundos y se recarga si cambió.
+KEYWORDS_FILE = os.getenv("KEYWORDS_FILE") or None
+KEYWORDS_RELOAD_INTERVAL = float(os.getenv("KEYWORDS_RELOAD_INTERVAL", 5))
+
+# Cache de agentes por userId (db/agent_cache.py)
+AGENT_CACHE_MAX_SIZE = int(os.getenv("AGENT_CACHE_MAX_SIZE", 1000))
+AGENT_CACHE_TTL_SECONDS = float(os.getenv("AGENT_CACHE_TTL_SECONDS", 300))
+
+# Catálogo de precios local (services/pricing_catalog.py)
+# PRICING_SNAPSHOT_FILE es donde se guardan los precios refrescados (se
+# lee encima de services/pricing_snapshot.json, que nunca se reescribe).
+# PRICING_REFRESH_SECONDS <= 0 desactiva el refresco en segundo plano.
+PRICING_SNAPSHOT_FILE = os.getenv("PRICING_SNAPSHOT_FILE", "/tmp/analyzer-pricing.json")
+PRICING_REFRESH_SECONDS = float(os.getenv("PRICING_REFRESH_SECONDS", 6 * 3600))
+
+# Conteo de tokens (services/token_utils.py)
+TOKENIZER_THREADS = int(os.getenv("TOKENIZER_THREADS", min(8, os.cpu_count() or 1)))
+
+# Memo de conteos de tokens por texto (services/token_cache.py)
+TOKEN_CACHE_MAX_BYTES = int(float(os.getenv("TOKEN_CACHE_MAX_MB", 32)) * 1024 * 1024)
+
+# Detección de idioma (services/language_detector.py)
+# Con LANG_EARLY_STOP se deja de detectar cuando un idioma lleva una ventaja
+# de LANG_LEAD_Z * sqrt(votos) con al menos LANG_MIN_SAMPLES votos.
+LANG_DETECT_SEED = int(os.getenv("LANG_DETECT_SEED", 0))
+LANG_EARLY_STOP = os.getenv("LANG_EARLY_STOP", "true").lower() in ("1", "true", "yes")
+LANG_MIN_SAMPLES = int(os.getenv("LANG_MIN_SAMPLES", 3))
+LANG_MAX_SAMPLES = int(os.getenv("LANG_MAX_SAMPLES", 25))
+LANG_LEAD_Z = float(os.getenv("LANG_LEAD_Z", 1.5))
+LANG_CHUNK_CHARS = int(os.getenv("LANG_CHUNK_CHARS", 60))
+LANG_MIN_LETTERS = int(os.getenv("LANG_MIN_LETTERS", 3))
+LANG_CACHE_SIZE = int(os.getenv("LANG_CACHE_SIZE", 50000))
+
+# Detección de mensajes repetidos (behavior_analysis/behavior_extras_evaluator.py)
+# Hasta REPETITION_EXACT_MAX_MESSAGES mensajes largos se comparan todos los
+# pares; con más, MinHash/LSH propone candidatos y sólo esos se verifican.
+# MinHash usa shingles de REPETITION_SHINGLE_SIZE caracteres; el piso de
+# Jaccard está calibrado contra REPETITION_SIMILARITY=0.6 (si se baja la
+# similitud, bajar también el piso).
+REPETITION_MIN_WORDS = int(os.getenv("REPETITION_MIN_WORDS", 20))
+REPETITION_SIMILARITY = float(os.getenv("REPETITION_SIMILARITY", 0.6))
+REPETITION_EXACT_MAX_MESSAGES = int(os.getenv("REPETITION_EXACT_MAX_MESSAGES", 12))
+REPETITION_MINHASH_PERM = int(os.getenv("REPETITION_MINHASH_PERM", 80))
+REPETITION_LSH_BANDS = int(os.getenv("REPETITION_LSH_BANDS", 40))
+REPETITION_SHINGLE_SIZE = int(os.getenv("REPETITION_SHINGLE_SIZE", 3))
+REPETITION_JACCARD_FLOOR = float(os.getenv("REPETITION_JACCARD_FLOOR", 0.3))
+
+# Modo asíncrono de /analyze (services/job_queue.py)
+# JOBS_DIR debe ser compartido por todos los workers de gunicorn del host.
+JOBS_DIR = os.getenv("JOBS_DIR", "/tmp/analyzer-jobs")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", 1))
+JOBS_MAX_PENDING = int(os.getenv("JOBS_MAX_PENDING", 100))
+JOBS_TTL_SECONDS = float(os.getenv("JOBS_TTL_SECONDS", 24 * 3600))
+
+# Ingesta NDJSON en /analyze/stream: conversaciones analizadas por ventana
+STREAM_WINDOW_SIZE = int(os.getenv("STREAM_WINDOW_SIZE", 25))
+
+# Persistencia de sesiones (storage/sinks.py, storage/session_pipeline.py)
+# SESSION_SINKS: destinos separados por comas ("mongo:<colección>").
+# SESSION_DEBUG_FILE / SESSION_NDJSON_LOG: rutas opcionales, vacías = apagado.
+# Con SESSION_WRITE_BEHIND (apagado por defecto: el request responde recién
+# con la sesión guardada) las conversaciones sueltas se encolan y se
+# escriben en lotes de hasta SESSION_BUFFER_MAX_DOCS o cada
+# SESSION_BUFFER_MAX_DELAY segundos; con SESSION_BUFFER_CAPACITY pendientes
+# el request espera hasta SESSION_BUFFER_BLOCK_SECONDS antes de fallar. Lo
+# que un sink no pudo escribir se reintenta SESSION_BUFFER_RETRIES veces
+# (esperando SESSION_BUFFER_RETRY_DELAY segundos por intento) antes de
+# descartarse y contarse en analyzer_session_writer_dropped_total.
+SESSION_SINKS = os.getenv("SESSION_SINKS", "mongo:sessions,mongo:metrics")
+SESSION_DEBUG_FILE = os.getenv("SESSION_DEBUG_FILE", "")
+SESSION_NDJSON_LOG = os.getenv("SESSION_NDJSON_LOG", "")
+SESSION_WRITE_BEHIND = os.getenv("SESSION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+SESSION_BUFFER_MAX_DOCS = int(os.getenv("SESSION_BUFFER_MAX_DOCS", 100))
+SESSION_BUFFER_MAX_DELAY = float(os.getenv("SESSION_BUFFER_MAX_DELAY", 1.0))
+SESSION_BUFFER_CAPACITY = int(os.getenv("SESSION_BUFFER_CAPACITY", 1000))
+SESSION_BUFFER_BLOCK_SECONDS = float(os.getenv("SESSION_BUFFER_BLOCK_SECONDS", 5.0))
+SESSION_BUFFER_RETRIES = int(os.getenv("SESSION_BUFFER_RETRIES", 3))
+SESSION_BUFFER_RETRY_DELAY = float(os.getenv("SESSION_BUFFER_RETRY_DELAY", 0.5))
+
+# Análisis incremental por mensaje (services/incremental_analyzer.py)
+# Un documento de estado por conversación abierta en esta colección.
+ANALYSIS_STATE_COLLECTION = os.getenv("ANALYSIS_STATE_COLLECTION", "analysis_state")
+INCREMENTAL_MAX_RETRIES = int(os.getenv("INCREMENTAL_MAX_RETRIES", 5))
+
+# Reenvíos (services/fingerprint.py): si la sesión guardada tiene el mismo
+# fingerprint que la conversación recibida se devuelve sin volver a analizar.
+SESSION_DEDUP = os.getenv("SESSION_DEDUP", "true").lower() in ("1", "true", "yes")
+
+# Re-análisis del histórico (scripts/backfill.py, comando analyzer-backfill)
+# Lee las conversaciones cerradas que guarda el backend y las vuelve a
+# puntuar de a BACKFILL_BATCH_SIZE; el avance queda en BACKFILL_CHECKPOINT.
+CONVERSATIONS_COLLECTION = os.getenv("CONVERSATIONS_COLLECTION", "conversations")
+MESSAGES_COLLECTION = os.getenv("MESSAGES_COLLECTION", "messages")
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", 500))
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", "backfill_checkpoint.json")
+
+# Métricas de Prometheus en /metrics (services/instrumentation.py)
+# Con gunicorn, cada proceso escribe en PROMETHEUS_MULTIPROC_DIR y /metrics
+# suma todos; gunicorn.conf.py lo define si no viene en el entorno.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Perfilado de /analyze a pedido (services/request_profiler.py)
+# Con PROFILE_ENABLED se perfila el request que trae PROFILE_HEADER: 1 o,
+# al azar, una fracción PROFILE_SAMPLE_RATE. Se guardan los PROFILE_KEEP más
+# lentos en PROFILE_DIR; /admin/profiles exige PROFILE_ADMIN_TOKEN (sin token
+# el endpoint no existe).
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Analyzer-Profile")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/analyzer-profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 20))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+
+# Arranque (services/warmup.py, gunicorn.conf.py)
+# Con WARMUP_ON_START el master de gunicorn carga antes del fork las
+# dependencias pesadas y los encodings de WARMUP_ENCODINGS; los workers
+# los heredan ya cargados.
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() in ("1", "true", "yes")
+WARMUP_ENCODINGS = os.getenv("WARMUP_ENCODINGS", "cl100k_base,o200k_base")
+
+# Conexión a Mongo (db/mongo_client.py)
+# El cliente se crea en el primer uso dentro de cada proceso (después del
+# fork de gunicorn o del pool de análisis). Los *_MS en 0 usan el default de
+# pymongo (sin límite). MONGO_WRITE_CONCERN_W vacío usa el del servidor;
+# acepta un número o "majority".
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB = os.getenv("MONGO_DB")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 0))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 0))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 20000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 0))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000))
+MONGO_WRITE_CONCERN_W = os.getenv("MONGO_WRITE_CONCERN_W", "")
+MONGO_WRITE_CONCERN_J = os.getenv("MONGO_WRITE_CONCERN_J", "")
+MONGO_WRITE_CONCERN_WTIMEOUT_MS = int(os.getenv("MONGO_WRITE_CONCERN_WTIMEOUT_MS", 0))
+
+# Evaluadores de éxito (behavior_analysis/evaluator_registry.py)
+# EVALUATORS_FILE permite apuntar a otro evaluators.yaml. Con
+# EVALUATOR_SHORT_CIRCUIT los evaluadores restantes se saltean cuando ya no
+# pueden cambiar si la conversación fue exitosa; los tags que habrían
+# agregado no aparecen en la sesión.
+EVALUATORS_FILE = os.getenv("EVALUATORS_FILE") or None
+EVALUATOR_SHORT_CIRCUIT = os.getenv("EVALUATOR_SHORT_CIRCUIT", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,143 @@
+# analyzer/db/agent_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from config import settings
+from .agent_repo import get_agent_repo, get_async_agent_repo
+
+
+class AgentCache:
+    """
+    Cache LRU con vencimiento (TTL) de agentes por userId, delante de AgentRepo.
+
+    - get(user_id): devuelve el agente cacheado o lo busca en Mongo.
+    - prefetch(user_ids): resuelve todos los userId de un lote con una sola
+      consulta $in para los que no estén en cache.
+    - get_async / prefetch_async: lo mismo con el cliente async de Mongo
+      (api/asgi.py); el cache en memoria es el mismo.
+    - stats(): contadores de hits/misses/evictions para monitoreo.
+
+    Los userId sin agente no se cachean: un agente recién creado se ve
+    en la próxima consulta.
+    """
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 repo_factory: Callable[[], Any] = get_agent_repo,
+                 async_repo_factory: Callable[[], Any] = get_async_agent_repo):
+        self.max_size = settings.AGENT_CACHE_MAX_SIZE if max_size is None else max_size
+        self.ttl_seconds = settings.AGENT_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._repo_factory = repo_factory
+        self._async_repo_factory = async_repo_factory
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        agent = self._lookup(user_id)
+        if agent is not None:
+            return agent
+        agent = self._repo_factory().get_agent_by_user_id(user_id)
+        if agent:
+            self._store(user_id, agent)
+        return agent
+
+    def prefetch(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Devuelve {userId: agente} para los userId pedidos que tengan agente.
+        """
+        agents, missing = self._split_cached(user_ids)
+        if missing:
+            agents.update(self._store_all(self._repo_factory().get_agents_by_user_ids(missing)))
+        return agents
+
+    async def get_async(self, user_id: str) -> Optional[Dict]:
+        agent = self._lookup(user_id)
+        if agent is not None:
+            return agent
+        agent = await self._async_repo_factory().get_agent_by_user_id(user_id)
+        if agent:
+            self._store(user_id, agent)
+        return agent
+
+    async def prefetch_async(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        agents, missing = self._split_cached(user_ids)
+        if missing:
+            agents.update(self._store_all(await self._async_repo_factory().get_agents_by_user_ids(missing)))
+        return agents
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": (self.hits / total) if total else None
+        }
+
+    def _split_cached(self, user_ids: Iterable[str]) -> Tuple[Dict[str, Dict], list]:
+        agents: Dict[str, Dict] = {}
+        missing = []
+        for user_id in dict.fromkeys(u for u in user_ids if u):
+            agent = self._lookup(user_id)
+            if agent is not None:
+                agents[user_id] = agent
+            else:
+                missing.append(user_id)
+        return agents, missing
+
+    def _store_all(self, fetched: Dict[str, Dict]) -> Dict[str, Dict]:
+        for user_id, agent in fetched.items():
+            self._store(user_id, agent)
+        return fetched
+
+    def _lookup(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires_at, agent = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return agent
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def _store(self, user_id: str, agent: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, agent)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+_agent_cache: Optional[AgentCache] = None
+_agent_cache_lock = threading.Lock()
+
+
+def get_agent_cache() -> AgentCache:
+    """
+    Cache de agentes del proceso (se crea en el primer uso).
+    """
+    global _agent_cache
+    if _agent_cache is None:
+        with _agent_cache_lock:
+            if _agent_cache is None:
+                _agent_cache = AgentCache()
+    return _agent_cache
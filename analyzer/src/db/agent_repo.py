@@ -1,13 +1,15 @@
 # analyzer/db/agent_repo.py
 
+import threading
 from typing import Optional, Dict
-from .mongo_client import client, db
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.collection import Collection
+from .mongo_client import AsyncMongoRepo, MongoRepo
 
-class AgentRepo:
-    def __init__(self):
-        self.client = client
-        self.db = db
-        self.agents_col = self.db["agents"]
+class AgentRepo(MongoRepo):
+    @property
+    def agents_col(self) -> Collection:
+        return self.db["agents"]
 
     def get_all_agents(self) -> list[Dict]:
         return list(self.agents_col.find({}))
@@ -15,3 +17,51 @@ class AgentRepo:
     def get_agent_by_user_id(self, user_id: str) -> Optional[Dict]:
         return self.agents_col.find_one({"userId": user_id})
 
+    def get_agents_by_user_ids(self, user_ids: list[str]) -> Dict[str, Dict]:
+        """
+        Trae los agentes de varios userId en una sola consulta ($in).
+        Igual que find_one, si un userId tuviera más de un agente se queda con el primero.
+        """
+        agents: Dict[str, Dict] = {}
+        for agent in self.agents_col.find({"userId": {"$in": list(user_ids)}}):
+            agents.setdefault(agent["userId"], agent)
+        return agents
+
+
+class AsyncAgentRepo(AsyncMongoRepo):
+    """
+    Las mismas consultas que AgentRepo con el cliente async (api/asgi.py).
+    """
+    @property
+    def agents_col(self) -> AsyncCollection:
+        return self.db["agents"]
+
+    async def get_agent_by_user_id(self, user_id: str) -> Optional[Dict]:
+        return await self.agents_col.find_one({"userId": user_id})
+
+    async def get_agents_by_user_ids(self, user_ids: list[str]) -> Dict[str, Dict]:
+        agents: Dict[str, Dict] = {}
+        async for agent in self.agents_col.find({"userId": {"$in": list(user_ids)}}):
+            agents.setdefault(agent["userId"], agent)
+        return agents
+
+
+_agent_repo: Optional[AgentRepo] = None
+_agent_repo_lock = threading.Lock()
+
+
+def get_agent_repo() -> AgentRepo:
+    global _agent_repo
+    if _agent_repo is None:
+        with _agent_repo_lock:
+            if _agent_repo is None:
+                _agent_repo = AgentRepo()
+    return _agent_repo
+
+
+_async_agent_repo = AsyncAgentRepo()
+
+
+def get_async_agent_repo() -> AsyncAgentRepo:
+    # No guarda estado: el cliente se resuelve en cada consulta
+    return _async_agent_repo
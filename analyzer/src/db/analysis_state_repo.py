@@ -0,0 +1,65 @@
+# analyzer/db/analysis_state_repo.py
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from config import settings
+from .mongo_client import MongoRepo
+
+class AnalysisStateRepo(MongoRepo):
+    """
+    Estado del análisis incremental, un documento por conversación
+    (_id = conversationId). Cada escritura incrementa `rev` y sólo se aplica
+    si nadie más lo cambió desde la lectura (control optimista), para que
+    dos workers que reciben mensajes de la misma conversación no se pisen.
+    """
+    @property
+    def states_col(self) -> Collection:
+        return self.db[settings.ANALYSIS_STATE_COLLECTION]
+
+    def get_state(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        return self.states_col.find_one({"_id": conversation_id})
+
+    def save_state(self, state: Dict[str, Any]) -> bool:
+        """
+        Guarda el estado si su `rev` sigue siendo el leído. Retorna False si
+        hubo una escritura concurrente (hay que releer y reintentar).
+        """
+        expected_rev = state.get("rev")
+        doc = {**state, "rev": (expected_rev or 0) + 1, "updatedAt": datetime.now(timezone.utc)}
+        if expected_rev is None:
+            try:
+                self.states_col.insert_one(doc)
+            except DuplicateKeyError:
+                return False
+        else:
+            result = self.states_col.replace_one({"_id": state["_id"], "rev": expected_rev}, doc)
+            if result.matched_count != 1:
+                return False
+        state["rev"] = doc["rev"]
+        return True
+
+    def delete_state(self, conversation_id: str, rev: Optional[int] = None) -> bool:
+        """
+        Borra el estado; con `rev`, sólo si sigue siendo el leído. Retorna
+        False si no se borró (hubo una escritura concurrente o ya no estaba).
+        """
+        query: Dict[str, Any] = {"_id": conversation_id}
+        if rev is not None:
+            query["rev"] = rev
+        return self.states_col.delete_one(query).deleted_count == 1
+
+
+_analysis_state_repo: Optional[AnalysisStateRepo] = None
+_analysis_state_repo_lock = threading.Lock()
+
+
+def get_analysis_state_repo() -> AnalysisStateRepo:
+    global _analysis_state_repo
+    if _analysis_state_repo is None:
+        with _analysis_state_repo_lock:
+            if _analysis_state_repo is None:
+                _analysis_state_repo = AnalysisStateRepo()
+    return _analysis_state_repo
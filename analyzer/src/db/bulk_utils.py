@@ -0,0 +1,66 @@
+# analyzer/db/bulk_utils.py
+
+from typing import Any, Dict, List, Tuple
+from pymongo import ReplaceOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+
+def upsert_many_unordered(collection: Collection, docs: List[Dict[str, Any]]) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Guarda una lista de documentos por _id con un único bulk_write de
+    ReplaceOne(upsert=True), ordered=False.
+
+    Es idempotente: si el backend reenvía una conversación ya guardada se
+    reemplaza el documento en lugar de fallar por _id duplicado. Con
+    ordered=False un error no tumba el resto del lote.
+
+    Retorna:
+      - saved_ids: ids de los documentos que quedaron guardados.
+      - errors: lista de {"index", "_id", "code", "error"} con el índice
+        del documento dentro de `docs`.
+    """
+    if not docs:
+        return [], []
+
+    try:
+        collection.bulk_write(_replace_requests(docs), ordered=False)
+        return [d.get("_id") for d in docs], []
+    except BulkWriteError as e:
+        return _bulk_write_result(e, docs)
+
+
+async def upsert_many_unordered_async(collection: AsyncCollection,
+                                      docs: List[Dict[str, Any]]) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    upsert_many_unordered con el cliente async (api/asgi.py); mismo retorno.
+    """
+    if not docs:
+        return [], []
+
+    try:
+        await collection.bulk_write(_replace_requests(docs), ordered=False)
+        return [d.get("_id") for d in docs], []
+    except BulkWriteError as e:
+        return _bulk_write_result(e, docs)
+
+
+def _replace_requests(docs: List[Dict[str, Any]]) -> List[ReplaceOne]:
+    return [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs]
+
+
+def _bulk_write_result(e: BulkWriteError, docs: List[Dict[str, Any]]) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    write_errors = e.details.get("writeErrors", [])
+    failed = {err["index"] for err in write_errors}
+    errors = [
+        {
+            "index": err["index"],
+            "_id": docs[err["index"]].get("_id"),
+            "code": err.get("code"),
+            "error": err.get("errmsg", "")
+        }
+        for err in write_errors
+    ]
+    saved_ids = [d.get("_id") for i, d in enumerate(docs) if i not in failed]
+    return saved_ids, errors
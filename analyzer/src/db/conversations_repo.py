@@ -0,0 +1,73 @@
+# analyzer/db/conversations_repo.py
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from pymongo.collection import Collection
+from config import settings
+from .mongo_client import MongoRepo
+
+class ConversationRepo(MongoRepo):
+    """
+    Lectura de las conversaciones y mensajes que guarda el backend. Los
+    documentos se devuelven con el mismo formato que el payload de /analyze
+    (fechas como ISO 8601 en UTC), así el análisis y el fingerprint dan lo
+    mismo que si la conversación llegara por HTTP.
+    """
+    @property
+    def conversations_col(self) -> Collection:
+        return self.db[settings.CONVERSATIONS_COLLECTION]
+
+    @property
+    def messages_col(self) -> Collection:
+        return self.db[settings.MESSAGES_COLLECTION]
+
+    def iter_conversation_batches(self, after_id: Optional[str], batch_size: int,
+                                  status: Optional[str] = "closed") -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre las conversaciones por _id ascendente (desde `after_id`,
+        excluido) con un único cursor del servidor que trae `batch_size`
+        documentos por vuelta, y las entrega en listas de ese tamaño.
+        """
+        query: Dict[str, Any] = {}
+        if status:
+            query["status"] = status
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+
+        batch: List[Dict[str, Any]] = []
+        cursor = self.conversations_col.find(query).sort("_id", 1).batch_size(batch_size)
+        try:
+            for conversation in cursor:
+                batch.append(_to_payload(conversation))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+
+    def get_messages_by_conversation(self, conversation_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Mensajes de varias conversaciones con una sola consulta ($in),
+        ordenados por timestamp como los exporta el backend.
+        """
+        messages: Dict[str, List[Dict[str, Any]]] = {cid: [] for cid in conversation_ids}
+        cursor = self.messages_col.find({"conversationId": {"$in": list(conversation_ids)}}).sort(
+            [("conversationId", 1), ("timestamp", 1)]
+        )
+        for message in cursor:
+            messages.setdefault(message["conversationId"], []).append(_to_payload(message))
+        return messages
+
+
+def _to_payload(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: _iso_utc(value) if isinstance(value, datetime) else value for key, value in doc.items()}
+
+
+def _iso_utc(value: datetime) -> str:
+    # Mismo formato que JSON.stringify de una fecha en el backend: milisegundos y Z.
+    # pymongo devuelve las fechas sin zona, ya en UTC.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
@@ -1,11 +1,301 @@
+# analyzer/db/mongo_client.py
+
+import asyncio
 import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
+import threading
+from typing import Any, Dict, Optional
+
+from pymongo import AsyncMongoClient, MongoClient, monitoring
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+
+from config import settings
+from services import instrumentation
+
+MONGO_URI = settings.MONGO_URI
+MONGO_DB = settings.MONGO_DB
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Cuenta el uso del pool de conexiones del cliente del proceso (todas las
+    direcciones sumadas): conexiones abiertas, en uso, operaciones esperando
+    una libre y cuánto esperan. Sirve para ajustar MONGO_MAX_POOL_SIZE: un
+    pool siempre lleno con `waiting` > 0 es el cuello de botella.
+    """
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds = 0.0
+        self.pools_cleared = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "maxPoolSize": self.max_pool_size,
+                "open": self.open,
+                "checkedOut": self.checked_out,
+                "waiting": self.waiting,
+                "peakCheckedOut": self.peak_checked_out,
+                "utilization": (self.checked_out / self.max_pool_size) if self.max_pool_size else None,
+                "checkouts": self.checkouts,
+                "checkoutFailures": self.checkout_failures,
+                "avgWaitMs": (self.wait_seconds * 1000 / self.checkouts) if self.checkouts else None,
+                "poolsCleared": self.pools_cleared
+            }
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open += 1
+        if settings.METRICS_ENABLED:
+            instrumentation.MONGO_POOL_OPEN.inc()
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open -= 1
+        if settings.METRICS_ENABLED:
+            instrumentation.MONGO_POOL_OPEN.dec()
+
+    def connection_check_out_started(self, event) -> None:
+        with self._lock:
+            self.waiting += 1
+        if settings.METRICS_ENABLED:
+            instrumentation.MONGO_POOL_WAITING.inc()
+
+    def connection_checked_out(self, event) -> None:
+        duration = getattr(event, "duration", None) or 0.0
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_seconds += duration
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+        if settings.METRICS_ENABLED:
+            instrumentation.MONGO_POOL_WAITING.dec()
+            instrumentation.MONGO_POOL_IN_USE.inc()
+            instrumentation.MONGO_POOL_WAIT_SECONDS.observe(duration)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+        if settings.METRICS_ENABLED:
+            instrumentation.MONGO_POOL_WAITING.dec()
+            instrumentation.MONGO_POOL_CHECKOUT_FAILED.inc()
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checked_out -= 1
+        if settings.METRICS_ENABLED:
+            instrumentation.MONGO_POOL_IN_USE.dec()
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_monitor: Optional[PoolMonitor] = None
+_client_lock = threading.Lock()
+
+_async_client: Optional[AsyncMongoClient] = None
+_async_client_key: Optional[tuple] = None
+_async_monitor: Optional[PoolMonitor] = None
+# Cierres pendientes de clientes reemplazados (referencia para que no se pierdan las tareas)
+_closing: set = set()
+
+
+def get_client() -> MongoClient:
+    """
+    Cliente de Mongo de este proceso, creado en el primer uso.
+
+    Un MongoClient no sobrevive al fork (sus sockets e hilos de monitoreo
+    son del padre): si el proceso cambió de pid se crea uno nuevo. El
+    heredado no se cierra desde el hijo, sólo se deja de usar.
+    """
+    global _client, _client_pid, _monitor
+    pid = os.getpid()
+    if _client_pid != pid:
+        with _client_lock:
+            if _client_pid != pid:
+                _monitor = PoolMonitor(settings.MONGO_MAX_POOL_SIZE)
+                _client = MongoClient(MONGO_URI, event_listeners=[_monitor], **client_options())
+                _client_pid = pid
+    return _client
+
+
+def get_db() -> Database:
+    return get_client()[MONGO_DB]
+
+
+def get_async_client() -> AsyncMongoClient:
+    """
+    Cliente async de Mongo (api/asgi.py) del proceso y del event loop en
+    curso. Un AsyncMongoClient queda atado al loop en el que se usa: si
+    cambia el loop o el pid se crea otro y el anterior se cierra (ver
+    _close_replaced_async_client). Se llama desde el loop, así que no hace
+    falta lock.
+    """
+    global _async_client, _async_client_key, _async_monitor
+    key = (os.getpid(), asyncio.get_running_loop())
+    if _async_client_key != key:
+        if _async_client is not None:
+            _close_replaced_async_client(_async_client, _async_client_key)
+        _async_monitor = PoolMonitor(settings.MONGO_MAX_POOL_SIZE)
+        _async_client = AsyncMongoClient(MONGO_URI, event_listeners=[_async_monitor], **client_options())
+        _async_client_key = key
+    return _async_client
+
+
+def _close_replaced_async_client(client: AsyncMongoClient, key: tuple) -> None:
+    # El heredado de otro pid no se cierra desde el hijo, como en get_client()
+    pid, loop = key
+    if pid != os.getpid():
+        return
+    if loop.is_running():
+        # Su loop sigue vivo en otro hilo: que se cierre ahí
+        future = asyncio.run_coroutine_threadsafe(_close_quietly(client), loop)
+    else:
+        # Su loop ya terminó (p. ej. un asyncio.run anterior): se cierra desde el actual
+        future = asyncio.get_running_loop().create_task(_close_quietly(client))
+    _closing.add(future)
+    future.add_done_callback(_closing.discard)
+
+
+async def _close_quietly(client: AsyncMongoClient) -> None:
+    try:
+        await client.close()
+    except Exception as e:
+        print(f"⚠️ No se pudo cerrar el cliente async de Mongo reemplazado: {e}")
+
+
+def get_async_db() -> AsyncDatabase:
+    return get_async_client()[MONGO_DB]
+
+
+def client_options() -> Dict[str, Any]:
+    """
+    Opciones de pool, timeouts y write concern según la configuración.
+    """
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+    }
+    # 0 = default de pymongo (sin límite)
+    for option, value in (("maxIdleTimeMS", settings.MONGO_MAX_IDLE_TIME_MS),
+                          ("waitQueueTimeoutMS", settings.MONGO_WAIT_QUEUE_TIMEOUT_MS),
+                          ("socketTimeoutMS", settings.MONGO_SOCKET_TIMEOUT_MS),
+                          ("wTimeoutMS", settings.MONGO_WRITE_CONCERN_WTIMEOUT_MS)):
+        if value > 0:
+            options[option] = value
+
+    w = settings.MONGO_WRITE_CONCERN_W.strip()
+    if w:
+        options["w"] = int(w) if w.isdigit() else w
+    journal = settings.MONGO_WRITE_CONCERN_J.strip().lower()
+    if journal:
+        options["journal"] = journal in ("1", "true", "yes")
+    return options
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Uso del pool del cliente de este proceso; vacío si todavía no se creó.
+    """
+    if _client_pid != os.getpid() or _monitor is None:
+        return {}
+    return _monitor.stats()
+
+
+def async_pool_stats() -> Dict[str, Any]:
+    """
+    Como pool_stats(), para el cliente async de este proceso.
+    """
+    if _async_client_key is None or _async_client_key[0] != os.getpid() or _async_monitor is None:
+        return {}
+    return _async_monitor.stats()
+
+
+def close_client() -> None:
+    """
+    Cierra el cliente si lo creó este proceso (hook worker_exit de gunicorn).
+    """
+    global _client, _client_pid, _monitor
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client, _client_pid, _monitor = None, None, None
+
+
+async def close_async_client() -> None:
+    """
+    Cierra el cliente async si es de este proceso y de este loop (shutdown de api/asgi.py).
+    """
+    global _async_client, _async_client_key, _async_monitor
+    if _async_client is not None and _async_client_key == (os.getpid(), asyncio.get_running_loop()):
+        await _async_client.close()
+    _async_client, _async_client_key, _async_monitor = None, None, None
+
+
+class MongoRepo:
+    """
+    Base de los repositorios: `client` y `db` se resuelven en cada uso, así
+    una misma instancia (compartida por todo el proceso) sigue sirviendo
+    después del fork.
+    """
+    @property
+    def client(self) -> MongoClient:
+        return get_client()
+
+    @property
+    def db(self) -> Database:
+        return get_db()
+
+
+class AsyncMongoRepo:
+    """
+    Base de los repositorios async: `db` es la del cliente async del loop en curso.
+    """
+    @property
+    def db(self) -> AsyncDatabase:
+        return get_async_db()
+
+
+def _reset_lock_after_fork() -> None:
+    # Si otro hilo tenía el lock en el momento del fork, en el hijo quedaría tomado para siempre
+    global _client_lock
+    _client_lock = threading.Lock()
+
 
-load_dotenv()
+os.register_at_fork(after_in_child=_reset_lock_after_fork)
 
-MONGO_URI = os.getenv("MONGO_URI")
-MONGO_DB = os.getenv("MONGO_DB")
 
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB]
+def __getattr__(name: str) -> Any:
+    # Compatibilidad con `from db.mongo_client import client, db`: se resuelve
+    # al importar el nombre, así que conviene usar get_client()/get_db()
+    if name == "client":
+        return get_client()
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,16 @@
 # analyzer/db/sessions_repo.py
 
 from typing import Dict, Any
-from .mongo_client import client, db
+from pymongo.collection import Collection
+from .mongo_client import MongoRepo
 
-class SessionRepo:
+class SessionRepo(MongoRepo):
 
-    def __init__(self):
-        self.client = client
-        self.db = db
-        self.metrics_col = self.db["metrics"]
+    @property
+    def metrics_col(self) -> Collection:
+        return self.db["metrics"]
 
     def save_session(self, session_doc: Dict[str, Any]) -> Any:
-        result = self.metrics_col.insert_one(session_doc)
-        return result.inserted_id
+        # Upsert por _id: reenviar la misma conversación no falla por duplicado
+        self.metrics_col.replace_one({"_id": session_doc["_id"]}, session_doc, upsert=True)
+        return session_doc["_id"]
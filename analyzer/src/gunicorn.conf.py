@@ -0,0 +1,59 @@
+# analyzer/gunicorn.conf.py
+# gunicorn lo carga solo desde el directorio de trabajo (/app en la imagen).
+
+import gc
+import os
+
+# Se define antes del fork para que todos los workers (y sus pools de
+# análisis) escriban las métricas en el mismo directorio
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/analyzer-metrics")
+# Tiene que existir antes de precargar la app: las métricas sin labels
+# (pool de Mongo) abren su archivo apenas se importa services/instrumentation
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+
+# La app se importa una vez en el master y los workers la heredan por fork;
+# api.app no abre conexiones al importarse (ver el comentario en api/app.py)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+
+def on_starting(server):
+    # Los archivos de una corrida anterior sumarían valores viejos a /metrics;
+    # se conservan los que el master ya abrió al precargar la app
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    own = f"_{os.getpid()}.db"
+    for name in os.listdir(path):
+        if not name.endswith(own):
+            try:
+                os.remove(os.path.join(path, name))
+            except FileNotFoundError:
+                pass
+
+    from config import settings
+    if settings.WARMUP_ON_START:
+        # Tablas BPE, perfiles de idioma, keywords y precios cargados una vez
+        # en el master: cada worker (y cada reciclado) arranca ya caliente
+        from services.warmup import warmup
+        warmup()
+
+
+def when_ready(server):
+    # Lo cargado hasta acá queda fuera del GC: sus páginas no se ensucian y
+    # siguen compartidas copy-on-write entre los workers
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Antes de que el worker termine (incluido el reciclado por --max-requests)
+    # se escriben las sesiones que quedaron en el buffer y se cierra el pool de Mongo
+    from storage.session_pipeline import close_session_writer
+    from db.mongo_client import close_client
+    close_session_writer()
+    close_client()
+
+
+def child_exit(server, worker):
+    # Los contadores del worker muerto se siguen sumando; sólo se descartan sus gauges en vivo
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
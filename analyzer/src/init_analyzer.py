@@ -1,24 +1,31 @@
+import asyncio
 import json
-from typing import Any, Dict, List, Union
-from services.conversation_handler import process_conversation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from services.conversation_handler import (
+    process_conversation, process_conversation_async, get_agents_for_conversations, get_agents_for_conversations_async
+)
+from services.batch_executor import analyze_items
+from services.incremental_analyzer import get_incremental_analyzer
+from services.fingerprint import (
+    conversation_fingerprint, find_stored_sessions_async, find_unchanged_sessions, match_stored_sessions
+)
+from behavior_analysis.keyword_registry import get_keyword_registry
+from storage.session_pipeline import get_session_pipeline
+from services.instrumentation import timed
+from config import settings
 
 
-def initiate_analyzer(raw_json: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+def initiate_analyzer(raw_json: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
     """
     Procesa conversaciones.
-    - Si es lista, procesa cada conversación recursivamente.
+    - Si es lista, la procesa en modo batch (ver analyze_batch) y devuelve el reporte.
     - Verifica que existan las claves 'conversation' y 'messages'.
     - Lanza excepciones específicas si faltan claves.
     """
     if isinstance(raw_json, list):
-        return [initiate_analyzer(item) for item in raw_json]
+        return analyze_batch(raw_json)
 
-    if not isinstance(raw_json, dict):
-        raise TypeError("Expected JSON as dict or list of dicts.")
-
-    missing_keys = [key for key in ('conversation', 'messages') if key not in raw_json]
-    if missing_keys:
-        raise ValueError(f"Missing required keys: {', '.join(missing_keys)}")
+    _validate_item(raw_json)
 
     try:
         return process_conversation(raw_json)
@@ -33,3 +40,280 @@ def initiate_analyzer(raw_json: Union[Dict[str, Any], List[Dict[str, Any]]]) ->
     except Exception as e:
         print(f"An error occurred during analysis: {e}")
         sys.exit(1)
+
+
+def analyze_batch(items: List[Any], reuse: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Modo batch: analiza todas las conversaciones del request y recién al final
+    las guarda en los sinks configurados (storage/session_pipeline.py), con
+    un bulk_write de upserts (ordered=False) por colección en lugar de dos
+    escrituras por conversación. La escritura es sincrónica para poder
+    reportar errores.
+
+    Las conversaciones cuyo fingerprint (services/fingerprint.py) coincide
+    con el de la sesión guardada no se analizan ni se escriben: se devuelve
+    la sesión guardada. `reuse` (SESSION_DEDUP por defecto) en False fuerza
+    el análisis de todas.
+
+    Los agentes se resuelven una vez por userId en este proceso y el análisis
+    se reparte entre procesos con services.batch_executor; el orden de los
+    resultados respeta el de `items`.
+
+    Un error en una conversación no corta el lote; se reporta por ítem:
+      {
+        "sessions": [<session_doc guardado en todos los sinks>, ...],
+        "errors": [{"index", "conversationId", "stage", "error"}, ...]
+      }
+    donde stage es 'validation', 'analysis' o el nombre del sink que falló
+    ('sessions', 'metrics', ...).
+    """
+    errors: List[Dict[str, Any]] = []
+    valid_indexes = _validate_items(items, errors)
+
+    with timed("batch.agent_lookup"):
+        agents = get_agents_for_conversations([items[i]["conversation"] for i in valid_indexes])
+    work_indexes, work_items = _resolve_agents(items, valid_indexes, agents, errors)
+
+    with timed("batch.dedup_lookup"):
+        fingerprints, unchanged = find_unchanged_sessions(work_items, get_keyword_registry().version, reuse)
+    pending = [pos for pos in range(len(work_items)) if pos not in unchanged]
+
+    with timed("batch.analysis"):
+        results = analyze_items([work_items[pos] for pos in pending])
+    docs, doc_indexes = _collect_docs(items, work_indexes, fingerprints, pending, results, errors)
+    write_errors = get_session_pipeline().write_many(docs)
+    return _batch_report(work_indexes, unchanged, docs, doc_indexes, write_errors, errors)
+
+
+async def initiate_analyzer_async(raw_json: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    initiate_analyzer para api/asgi.py: mismas validaciones y resultados,
+    con Mongo async y el análisis fuera del event loop.
+    """
+    if isinstance(raw_json, list):
+        return await analyze_batch_async(raw_json)
+
+    _validate_item(raw_json)
+
+    try:
+        return await process_conversation_async(raw_json)
+    except Exception as e:
+        raise RuntimeError(f"Error processing conversation: {e}") from e
+
+
+async def analyze_batch_async(items: List[Any], reuse: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    analyze_batch con el cliente async de Mongo: los agentes ($in por
+    userId) y las sesiones guardadas ($in por _id) se buscan a la vez, el
+    análisis corre en un hilo (que reparte en el pool de procesos como
+    siempre) y los sinks escriben a la vez. Mismo reporte que analyze_batch.
+    """
+    errors: List[Dict[str, Any]] = []
+    valid_indexes = _validate_items(items, errors)
+    conversations = [items[i]["conversation"] for i in valid_indexes]
+
+    async def lookup_agents():
+        with timed("batch.agent_lookup"):
+            return await get_agents_for_conversations_async(conversations)
+
+    async def lookup_stored():
+        with timed("batch.dedup_lookup"):
+            return await find_stored_sessions_async([c.get("_id") for c in conversations], reuse)
+
+    agents, stored = await asyncio.gather(lookup_agents(), lookup_stored())
+    work_indexes, work_items = _resolve_agents(items, valid_indexes, agents, errors)
+    keywords_version = get_keyword_registry().version
+    fingerprints = [conversation_fingerprint(raw, agent, keywords_version) for raw, agent in work_items]
+    unchanged = match_stored_sessions(work_items, fingerprints, stored)
+    pending = [pos for pos in range(len(work_items)) if pos not in unchanged]
+
+    with timed("batch.analysis"):
+        results = await asyncio.to_thread(analyze_items, [work_items[pos] for pos in pending])
+    docs, doc_indexes = _collect_docs(items, work_indexes, fingerprints, pending, results, errors)
+    write_errors = await get_session_pipeline().write_many_async(docs)
+    return _batch_report(work_indexes, unchanged, docs, doc_indexes, write_errors, errors)
+
+
+def _validate_items(items: List[Any], errors: List[Dict[str, Any]]) -> List[int]:
+    valid_indexes: List[int] = []
+    for index, item in enumerate(items):
+        try:
+            _validate_item(item)
+            valid_indexes.append(index)
+        except (TypeError, ValueError) as e:
+            errors.append(_item_error(index, item, "validation", e))
+    return valid_indexes
+
+
+def _resolve_agents(items: List[Any], valid_indexes: List[int], agents: Dict[str, Dict[str, Any]],
+                    errors: List[Dict[str, Any]]) -> Tuple[List[int], List[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+    work_indexes: List[int] = []
+    work_items = []
+    for index in valid_indexes:
+        user_id = items[index]["conversation"].get("userId")
+        if user_id not in agents:
+            error = ValueError(f"No se encontró agente con userId={user_id}" if user_id else "Conversation sin clave 'userId'.")
+            errors.append(_item_error(index, items[index], "analysis", error))
+            continue
+        work_indexes.append(index)
+        work_items.append((items[index], agents[user_id]))
+    return work_indexes, work_items
+
+
+def _collect_docs(items: List[Any], work_indexes: List[int], fingerprints: List[str], pending: List[int],
+                  results: List[Tuple[str, Any]], errors: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    docs: List[Dict[str, Any]] = []
+    doc_indexes: List[int] = []
+    for pos, (status, value) in zip(pending, results):
+        index = work_indexes[pos]
+        if status == "ok":
+            value["fingerprint"] = fingerprints[pos]
+            docs.append(value)
+            doc_indexes.append(index)
+        else:
+            errors.append(_item_error(index, items[index], "analysis", value))
+    return docs, doc_indexes
+
+
+def _batch_report(work_indexes: List[int], unchanged: Dict[int, Dict[str, Any]], docs: List[Dict[str, Any]],
+                  doc_indexes: List[int], write_errors: List[Dict[str, Any]],
+                  errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    sessions: Dict[int, Dict[str, Any]] = {work_indexes[pos]: doc for pos, doc in unchanged.items()}
+    failed_docs = set()
+    for err in write_errors:
+        failed_docs.add(err["index"])
+        errors.append({
+            "index": doc_indexes[err["index"]],
+            "conversationId": err["_id"],
+            "stage": err["stage"],
+            "error": err["error"]
+        })
+
+    for i, (index, doc) in enumerate(zip(doc_indexes, docs)):
+        if i not in failed_docs:
+            sessions[index] = doc
+
+    errors.sort(key=lambda e: e["index"])
+    return {
+        "sessions": [sessions[index] for index in sorted(sessions)],
+        "errors": errors
+    }
+
+
+def analyze_stream(lines: Iterable[Union[bytes, str]], window_size: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    Analiza conversaciones en formato NDJSON (una por línea) a medida que llegan.
+
+    Las líneas se agrupan en ventanas de `window_size` conversaciones
+    (STREAM_WINDOW_SIZE por defecto); cada ventana se procesa con
+    analyze_batch y se emite un resultado por conversación, en orden:
+      {"index", "conversationId", "status": "ok", "successful", "tags"}
+      {"index", "conversationId", "status": "error", "stage", "error"}
+    En memoria nunca hay más de una ventana, sin importar el tamaño total.
+    """
+    window_size = max(1, window_size or settings.STREAM_WINDOW_SIZE)
+    window: List[Any] = []
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            window.append((index, json.loads(line), None))
+        except ValueError as e:
+            window.append((index, None, f"Invalid JSON: {e}"))
+        index += 1
+        if len(window) >= window_size:
+            yield from _analyze_window(window)
+            window = []
+    if window:
+        yield from _analyze_window(window)
+
+
+def _analyze_window(window: List[Any]) -> Iterator[Dict[str, Any]]:
+    parsed = [(index, item) for index, item, parse_error in window if parse_error is None]
+    try:
+        report = analyze_batch([item for _, item in parsed])
+    except Exception as e:
+        # Un fallo de toda la ventana (Mongo caído, etc.) no corta el stream:
+        # se reporta en cada conversación de la ventana y se sigue con la próxima
+        print(f"⚠️ Falló el análisis de una ventana del stream: {e}")
+        report = {"sessions": [], "errors": [_item_error(pos, item, "analysis", e) for pos, (_, item) in enumerate(parsed)]}
+
+    errors: Dict[int, Dict[str, Any]] = {}
+    for error in report["errors"]:
+        errors.setdefault(parsed[error["index"]][0], error)
+    # report["sessions"] respeta el orden de los ítems que no tuvieron errores
+    sessions = iter(report["sessions"])
+
+    for index, item, parse_error in window:
+        if parse_error is not None:
+            yield {"index": index, "conversationId": None, "status": "error", "stage": "validation", "error": parse_error}
+        elif index in errors:
+            error = errors[index]
+            yield {"index": index, "conversationId": error["conversationId"], "status": "error",
+                   "stage": error["stage"], "error": error["error"]}
+        else:
+            doc = next(sessions)
+            yield {"index": index, "conversationId": doc["conversationId"], "status": "ok",
+                   "successful": doc["successful"], "tags": doc["tags"]}
+
+
+def ingest_messages(raw_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Análisis incremental: suma mensajes nuevos de una conversación abierta
+    ({"conversation", "messages"} con sólo los mensajes nuevos) a su estado.
+    """
+    _validate_item(raw_json)
+    return get_incremental_analyzer().add_messages(raw_json)
+
+
+def finalize_conversation(raw_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cierra una conversación analizada de forma incremental y guarda la sesión.
+    "messages" es opcional: si viene completo se usa para el análisis
+    completo cuando el estado no alcanza (ver IncrementalAnalyzer.finalize).
+    """
+    if not isinstance(raw_json, dict):
+        raise TypeError("Expected JSON as dict.")
+    if "conversation" not in raw_json:
+        raise ValueError("Missing required keys: conversation")
+    _validate_conversation_id(raw_json)
+
+    session_doc, mode = get_incremental_analyzer().finalize(raw_json)
+    return {
+        "conversationId": session_doc["conversationId"],
+        "mode": mode,
+        "successful": session_doc["successful"],
+        "tags": session_doc["tags"]
+    }
+
+
+def _validate_conversation_id(raw_json: Dict[str, Any]) -> None:
+    conversation = raw_json["conversation"]
+    if not isinstance(conversation, dict) or not conversation.get("_id"):
+        raise ValueError("Conversation sin clave '_id'.")
+
+
+def _validate_item(raw_json: Any) -> None:
+    if not isinstance(raw_json, dict):
+        raise TypeError("Expected JSON as dict or list of dicts.")
+
+    missing_keys = [key for key in ('conversation', 'messages') if key not in raw_json]
+    if missing_keys:
+        raise ValueError(f"Missing required keys: {', '.join(missing_keys)}")
+
+    if not isinstance(raw_json['conversation'], dict):
+        raise TypeError("'conversation' must be an object.")
+    _validate_conversation_id(raw_json)
+    if not isinstance(raw_json['messages'], list):
+        raise TypeError("'messages' must be a list.")
+
+
+def _item_error(index: int, item: Any, stage: str, error: Exception) -> Dict[str, Any]:
+    conversation = item.get("conversation") if isinstance(item, dict) else None
+    return {
+        "index": index,
+        "conversationId": conversation.get("_id") if isinstance(conversation, dict) else None,
+        "stage": stage,
+        "error": str(error)
+    }
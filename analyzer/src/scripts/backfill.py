@@ -0,0 +1,140 @@
+# analyzer/scripts/backfill.py
+"""
+Vuelve a puntuar las conversaciones ya guardadas por el backend, por
+ejemplo después de cambiar keywords.yaml o las reglas de
+SuccessEvaluatorEngine (en ese caso subir SCORING_VERSION en
+services/fingerprint.py).
+
+    analyzer-backfill [--batch-size N] [--limit N] [--force] [--reset]
+
+Cada lote sigue el camino de POST /analyze con una lista: agentes en una
+consulta, análisis repartido en el pool de procesos (ANALYZER_WORKERS) y
+escritura con bulk upserts. Las conversaciones cuyo fingerprint no cambió
+se saltean salvo con --force.
+
+Después de cada lote se guarda el último _id procesado en el checkpoint
+(BACKFILL_CHECKPOINT): si el proceso se corta, volver a correrlo retoma
+desde ahí. Como las escrituras son upserts, repetir el lote interrumpido
+no duplica sesiones.
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+
+class Checkpoint:
+    """
+    Avance del backfill en un JSON: último _id procesado y totales.
+    Se escribe en un temporal y se reemplaza, así un corte nunca lo deja a medias.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict[str, Any] = {"lastId": None, "processed": 0, "sessions": 0, "errors": 0, "status": None}
+
+    def load(self) -> "Checkpoint":
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.state.update(json.load(f))
+        return self
+
+    def save(self) -> None:
+        self.state["updatedAt"] = datetime.now(timezone.utc).isoformat()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.state = Checkpoint(self.path).state
+
+
+def run_backfill(repo, checkpoint: Checkpoint, batch_size: int, status: Optional[str] = "closed",
+                 limit: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Recorre las conversaciones de `repo` (ver db/conversations_repo.py)
+    desde el checkpoint y las analiza de a `batch_size`. Retorna los totales.
+    """
+    from init_analyzer import analyze_batch
+
+    if checkpoint.state["lastId"] is not None and checkpoint.state.get("status") != status:
+        raise ValueError(
+            f"El checkpoint {checkpoint.path} es de status={checkpoint.state.get('status')!r}; usar --reset para empezar de nuevo"
+        )
+    checkpoint.state["status"] = status
+
+    started = time.monotonic()
+    done = 0
+    for conversations in repo.iter_conversation_batches(checkpoint.state["lastId"], batch_size, status):
+        if limit is not None:
+            conversations = conversations[:limit - done]
+        if not conversations:
+            break
+        batch_started = time.monotonic()
+
+        messages = repo.get_messages_by_conversation([c["_id"] for c in conversations])
+        items: List[Dict[str, Any]] = [{"conversation": c, "messages": messages.get(c["_id"], [])} for c in conversations]
+        report = analyze_batch(items, reuse=not force)
+
+        for error in report["errors"]:
+            print(f"❌ {error['conversationId']} ({error['stage']}): {error['error']}")
+
+        # El checkpoint avanza recién con el lote escrito
+        state = checkpoint.state
+        state["lastId"] = conversations[-1]["_id"]
+        state["processed"] += len(conversations)
+        state["sessions"] += len(report["sessions"])
+        state["errors"] += len(report["errors"])
+        checkpoint.save()
+
+        done += len(conversations)
+        elapsed = time.monotonic() - started
+        batch_elapsed = time.monotonic() - batch_started
+        print(
+            f"⏩ {state['processed']} conversaciones (+{len(conversations)}) hasta {state['lastId']}: "
+            f"{len(conversations) / max(batch_elapsed, 1e-9):.1f} conv/s en el lote, "
+            f"{done / max(elapsed, 1e-9):.1f} conv/s promedio, {state['errors']} errores"
+        )
+        if limit is not None and done >= limit:
+            break
+
+    return dict(checkpoint.state, elapsedSeconds=round(time.monotonic() - started, 3))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="analyzer-backfill", description="Re-analiza las conversaciones guardadas.")
+    parser.add_argument("--batch-size", type=int, default=settings.BACKFILL_BATCH_SIZE,
+                        help="Conversaciones por lote y por vuelta del cursor")
+    parser.add_argument("--checkpoint", default=settings.BACKFILL_CHECKPOINT, help="Archivo de avance")
+    parser.add_argument("--status", default="closed", help="Status de las conversaciones a procesar ('' para todas)")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de conversaciones en esta corrida")
+    parser.add_argument("--force", action="store_true", help="Re-analizar aunque el fingerprint no haya cambiado")
+    parser.add_argument("--reset", action="store_true", help="Ignorar el checkpoint y empezar desde el principio")
+    args = parser.parse_args(argv)
+
+    from db.conversations_repo import ConversationRepo
+    from services.batch_executor import shutdown_executor
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.reset:
+        checkpoint.reset()
+    checkpoint.load()
+
+    try:
+        totals = run_backfill(ConversationRepo(), checkpoint, max(1, args.batch_size),
+                              status=args.status or None, limit=args.limit, force=args.force)
+    finally:
+        shutdown_executor()
+    print(f"✅ Backfill terminado: {json.dumps(totals, ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
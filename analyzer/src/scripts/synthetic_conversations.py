@@ -0,0 +1,207 @@
+# analyzer/scripts/synthetic_conversations.py
+"""
+Generador offline de conversaciones sintéticas con el mismo formato que
+envía el backend a /analyze ({"conversation", "messages"}), para
+benchmarks y pruebas de carga sin Mongo ni webhook.
+
+    python -m scripts.synthetic_conversations -n 1000 --messages 10-40 \\
+        --languages es=0.7,en=0.3 --repetition-rate 0.1 --keyword-density 0.2 > convs.ndjson
+
+La salida es NDJSON (una conversación por línea), lista para /analyze/stream.
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from behavior_analysis.keyword_loader import load_keywords
+
+# Las claves de keywords.yaml que no son categorías
+_RESERVED_KEYS = {"matching", "languages"}
+
+_VOCABULARY = {
+    "es": (
+        "hola quería consultar por mi pedido que todavía no llegó hace varios días necesito saber cuándo "
+        "me lo van a entregar pagué con tarjeta la semana pasada envío decía tardaba tres hábiles también "
+        "quiero cambiar dirección de entrega si se puede factura cobro reclamo demora paquete sucursal "
+        "devolución producto cuenta número ayer mañana precio garantía nadie responde espero por favor "
+        "urgente ayuda estado compra online correo teléfono código seguimiento transferencia cuota"
+    ).split(),
+    "en": (
+        "hello i wanted to ask about my order that has not arrived yet after several days need know when "
+        "it will be delivered paid by card last week shipping said would take three business also want "
+        "change the delivery address if possible invoice charge complaint delay package branch refund "
+        "product account number yesterday tomorrow price warranty nobody answers waiting please urgent "
+        "help status purchase online email phone tracking code transfer installment"
+    ).split(),
+    "pt": (
+        "olá eu queria perguntar sobre meu pedido que ainda não chegou depois de vários dias preciso saber "
+        "quando vai ser entregue paguei com cartão na semana passada envio dizia demorava três úteis também "
+        "quero mudar endereço entrega se for possível fatura cobrança reclamação atraso pacote agência "
+        "devolução produto conta número ontem amanhã preço garantia ninguém responde espero por favor "
+        "urgente ajuda status compra online email telefone código rastreamento transferência parcela"
+    ).split(),
+}
+
+_AGENT_REPLIES = {
+    "es": [
+        "Gracias por escribirnos, ya estoy revisando el estado de tu pedido.",
+        "Tu envío figura en camino y debería llegar en las próximas 48 horas.",
+        "Podemos modificar la dirección de entrega, ¿me confirmás la nueva?",
+        "Lamento la demora, voy a escalar el caso con el área de logística.",
+    ],
+    "en": [
+        "Thanks for reaching out, I am checking the status of your order now.",
+        "Your shipment is on its way and should arrive within the next 48 hours.",
+        "We can update the delivery address, could you confirm the new one?",
+        "Sorry for the delay, I will escalate the case to our logistics team.",
+    ],
+    "pt": [
+        "Obrigado pelo contato, já estou verificando o status do seu pedido.",
+        "Seu envio está a caminho e deve chegar nas próximas 48 horas.",
+        "Podemos alterar o endereço de entrega, pode confirmar o novo?",
+        "Desculpe a demora, vou encaminhar o caso para a logística.",
+    ],
+}
+
+
+class ConversationGenerator:
+    """
+    Conversaciones reproducibles (misma semilla, mismas conversaciones):
+
+      - messages: rango (mín, máx) de mensajes por conversación.
+      - languages: idioma -> peso; cada conversación usa un solo idioma.
+      - repetition_rate: probabilidad de que un mensaje del usuario repita
+        (con una palabra cambiada) uno largo anterior.
+      - keyword_density: probabilidad de que un mensaje del usuario incluya
+        una keyword de keywords.yaml (del pack del idioma, si existe).
+    """
+    def __init__(self, seed: int = 0, messages: Tuple[int, int] = (6, 30),
+                 languages: Optional[Dict[str, float]] = None, repetition_rate: float = 0.05,
+                 keyword_density: float = 0.15, keywords: Optional[dict] = None):
+        self.rng = random.Random(seed)
+        self.messages = messages
+        self.languages = languages or {"es": 1.0}
+        unknown = set(self.languages) - set(_VOCABULARY)
+        if unknown:
+            raise ValueError(f"Idiomas sin vocabulario: {', '.join(sorted(unknown))}")
+        self.repetition_rate = repetition_rate
+        self.keyword_density = keyword_density
+        self._keywords = _keywords_by_language(keywords if keywords is not None else load_keywords())
+        self._count = 0
+
+    def generate(self, n: int) -> Iterator[Dict[str, Any]]:
+        for _ in range(n):
+            yield self.conversation()
+
+    def conversation(self) -> Dict[str, Any]:
+        rng = self.rng
+        self._count += 1
+        conversation_id = f"synthetic-{self._count:08d}"
+        user_id = f"usr-synthetic-{rng.randrange(20):02d}"
+        language = rng.choices(list(self.languages), weights=list(self.languages.values()))[0]
+
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randrange(180 * 86400))
+        now = start
+        messages: List[Dict[str, Any]] = []
+        long_user_texts: List[str] = []
+        for i in range(rng.randint(*self.messages)):
+            direction = "user" if i % 2 == 0 else "agent"
+            if direction == "user":
+                text = self._user_text(language, long_user_texts)
+                now += timedelta(seconds=rng.randint(5, 600))
+            else:
+                text = rng.choice(_AGENT_REPLIES[language])
+                now += timedelta(seconds=rng.randint(1, 90))
+            messages.append({
+                "_id": f"msg-{conversation_id}-{i:03d}",
+                "conversationId": conversation_id,
+                "timestamp": _iso(now),
+                "text": text,
+                "direction": direction,
+                "status": "active",
+                "userId": user_id,
+            })
+
+        conversation = {
+            "_id": conversation_id,
+            "from": f"549{rng.randrange(10**10):010d}",
+            "userId": user_id,
+            "status": "closed",
+            "createdAt": _iso(start),
+            "updatedAt": _iso(now),
+        }
+        return {"conversation": conversation, "messages": messages}
+
+    def _user_text(self, language: str, long_user_texts: List[str]) -> str:
+        rng = self.rng
+        if long_user_texts and rng.random() < self.repetition_rate:
+            # Casi igual a uno anterior: lo que busca BehaviorExtrasEvaluator
+            words = rng.choice(long_user_texts).split()
+            words[rng.randrange(len(words))] = rng.choice(_VOCABULARY[language])
+            return " ".join(words).capitalize()
+
+        vocabulary = _VOCABULARY[language]
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(3, 24))]
+        keywords = self._keywords.get(language) or self._keywords["default"]
+        if keywords and rng.random() < self.keyword_density:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+
+        text = " ".join(words)
+        if len(words) >= 12:
+            long_user_texts.append(text)
+        return text.capitalize()
+
+
+def _keywords_by_language(config: dict) -> Dict[str, List[str]]:
+    def flatten(categories: dict) -> List[str]:
+        return [kw for key, kws in categories.items() if key not in _RESERVED_KEYS for kw in kws or []]
+
+    packs = {"default": flatten(config)}
+    for language, categories in (config.get("languages") or {}).items():
+        packs[language] = flatten(categories)
+    return packs
+
+
+def _iso(value: datetime) -> str:
+    # Mismo formato que las fechas del backend (milisegundos y Z)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def _parse_range(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for entry in value.split(","):
+        language, _, weight = entry.partition("=")
+        weights[language.strip()] = float(weight or 1)
+    return weights
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera conversaciones sintéticas en NDJSON.")
+    parser.add_argument("-n", type=int, default=100, help="Cantidad de conversaciones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messages", type=_parse_range, default=(6, 30), help="Mensajes por conversación (mín-máx)")
+    parser.add_argument("--languages", type=_parse_weights, default={"es": 1.0}, help="Mezcla de idiomas, ej. es=0.7,en=0.3")
+    parser.add_argument("--repetition-rate", type=float, default=0.05)
+    parser.add_argument("--keyword-density", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    generator = ConversationGenerator(
+        seed=args.seed, messages=args.messages, languages=args.languages,
+        repetition_rate=args.repetition_rate, keyword_density=args.keyword_density
+    )
+    for raw in generator.generate(args.n):
+        sys.stdout.write(json.dumps(raw, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
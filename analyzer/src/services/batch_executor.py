@@ -0,0 +1,159 @@
+# analyzer/services/batch_executor.py
+
+import asyncio
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from services.batch_metrics import compute_batch_metrics
+from services.conversation_handler import build_session_doc
+from services.instrumentation import timed
+from services.token_utils import tokenize_conversations
+from utils.conversation_frame import ConversationFrame
+
+# Cada ítem es (raw_json, agent) y cada resultado ("ok", session_doc) o ("error", mensaje).
+WorkItem = Tuple[Dict[str, Any], Dict[str, Any]]
+WorkResult = Tuple[str, Any]
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def analyze_items(items: List[WorkItem]) -> List[WorkResult]:
+    """
+    Corre build_session_doc sobre un lote y devuelve los resultados en el
+    mismo orden que `items`.
+
+    Si el lote es chico o ANALYZER_WORKERS <= 1 se procesa en serie; si no,
+    se reparte en chunks de ANALYZER_CHUNK_SIZE entre un pool de procesos.
+    Los workers sólo hacen CPU (tokens, idioma, evaluadores): el agente
+    llega resuelto y las escrituras a Mongo quedan del lado del padre.
+    """
+    if settings.ANALYZER_WORKERS <= 1 or len(items) < settings.ANALYZER_PARALLEL_MIN_BATCH:
+        return _analyze_chunk(items)
+
+    chunk_size = max(1, settings.ANALYZER_CHUNK_SIZE)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    results: List[WorkResult] = []
+    try:
+        for chunk_results in _get_executor().map(_analyze_chunk, chunks):
+            results.extend(chunk_results)
+    except BrokenProcessPool:
+        # Un worker murió (OOM, señal): descartamos el pool y seguimos en serie
+        shutdown_executor()
+        return _analyze_chunk(items)
+    return results
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Corre trabajo de CPU (análisis de una conversación) sin frenar el event
+    loop de api/asgi.py. Con ANALYZER_WORKERS > 1 va al mismo pool de
+    procesos que los lotes (paralelo de verdad; `func` y sus argumentos
+    tienen que ser picklables); si no, a un hilo.
+    """
+    loop = asyncio.get_running_loop()
+    if settings.ANALYZER_WORKERS > 1:
+        try:
+            return await loop.run_in_executor(_get_executor(), func, *args)
+        except BrokenProcessPool:
+            shutdown_executor()
+    return await loop.run_in_executor(None, func, *args)
+
+
+def _analyze_chunk(items: List[WorkItem]) -> List[WorkResult]:
+    # Etapas por chunk con prefijo batch.: su duración es la de todo el chunk
+    with timed("batch.frame"):
+        frames = [_build_frame(raw_json) for raw_json, _ in items]
+    with timed("batch.tokenize"):
+        token_counts = _count_chunk_tokens(items, frames)
+    with timed("batch.metrics"):
+        metrics = _compute_chunk_metrics(frames)
+    results: List[WorkResult] = []
+    for (raw_json, agent), frame, counts, conv_metrics in zip(items, frames, token_counts, metrics):
+        try:
+            results.append(("ok", build_session_doc(raw_json, agent=agent, token_counts=counts,
+                                                    frame=frame, metrics=conv_metrics)))
+        except Exception as e:
+            # Devolvemos el mensaje y no la excepción: no todas son picklables
+            results.append(("error", str(e)))
+    return results
+
+
+def _build_frame(raw_json: Dict[str, Any]) -> Optional[ConversationFrame]:
+    # Si los mensajes son inválidos build_session_doc lo vuelve a intentar y reporta el error
+    try:
+        return ConversationFrame.from_messages(raw_json["messages"])
+    except Exception:
+        return None
+
+
+def _compute_chunk_metrics(frames: List[Optional[ConversationFrame]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Duración, conteos y latencia de todo el chunk en una pasada vectorizada.
+    Las conversaciones sin frame quedan en None y se calculan solas.
+    """
+    metrics: List[Optional[Dict[str, Any]]] = [None] * len(frames)
+    indexes = [i for i, frame in enumerate(frames) if frame is not None]
+    for i, result in zip(indexes, compute_batch_metrics([frames[i] for i in indexes])):
+        metrics[i] = result
+    return metrics
+
+
+def _count_chunk_tokens(items: List[WorkItem], frames: List[Optional[ConversationFrame]]) -> List[Optional[Dict[str, int]]]:
+    """
+    Cuenta los tokens de todo el chunk con una llamada por modelo
+    (tokenize_conversations) en lugar de una por conversación. Si algo
+    falla se devuelve None y cada conversación cuenta los suyos.
+    """
+    counts: List[Optional[Dict[str, int]]] = [None] * len(items)
+    by_model: Dict[str, List[int]] = {}
+    for i, (_, agent) in enumerate(items):
+        model_name = agent.get("modelName")
+        if model_name and frames[i] is not None:
+            by_model.setdefault(model_name, []).append(i)
+
+    for model_name, indexes in by_model.items():
+        try:
+            texts = [frames[i].agent_texts for i in indexes]
+            for i, result in zip(indexes, tokenize_conversations(texts, model_name)):
+                counts[i] = result
+        except Exception:
+            continue
+    return counts
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """
+    Pool perezoso y persistente por proceso (un gunicorn worker reutiliza el
+    mismo pool entre requests en lugar de levantar procesos cada vez). Un
+    pool heredado por fork no sirve en el hijo: si cambió el pid se crea otro.
+
+    Con forkserver (ANALYZER_MP_START_METHOD por defecto) los procesos salen
+    de un servidor de un solo hilo que ya importó este módulo, así que no
+    heredan locks tomados por los hilos del worker y arrancan calientes.
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        context = multiprocessing.get_context(settings.ANALYZER_MP_START_METHOD or None)
+        if context.get_start_method() == "forkserver":
+            context.set_forkserver_preload([__name__])
+        _executor = ProcessPoolExecutor(max_workers=settings.ANALYZER_WORKERS, mp_context=context)
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor, _executor_pid
+    # El pool heredado de otro proceso no se cierra desde acá, sólo se deja de usar
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=True)
+    _executor, _executor_pid = None, None
+
+
+atexit.register(shutdown_executor)
@@ -0,0 +1,105 @@
+# analyzer/services/batch_metrics.py
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from utils.conversation_frame import AGENT, MISSING_TS, USER, ConversationFrame
+
+
+def compute_batch_metrics(frames: List[ConversationFrame]) -> List[Dict[str, Any]]:
+    """
+    Calcula duración, cantidad de mensajes por dirección y latencia promedio
+    de muchas conversaciones a la vez, con operaciones vectorizadas sobre
+    columnas de todo el lote en lugar de un loop por conversación.
+
+    Devuelve, en el orden de `frames`, lo mismo que el camino por
+    conversación (ConversationFrame.duration_seconds, user_count/agent_count
+    y LatencyCalculator):
+      {"durationSeconds", "messageCount": {"user", "agent", "total"},
+       "latency": {"averageSeconds", "interactionsCount"}}
+    """
+    n = len(frames)
+    if not n:
+        return []
+
+    # Los frames ya guardan arrays/bytes: se unen los buffers crudos y se
+    # leen como columnas de una vez, sin convertir mensaje por mensaje
+    dirs = np.frombuffer(b"".join([f.directions for f in frames]), dtype=np.uint8)
+    ts = np.frombuffer(b"".join([f.timestamps for f in frames]), dtype=np.int64)
+    lengths = np.fromiter(map(len, [f.directions for f in frames]), dtype=np.int64, count=n)
+    conv = np.repeat(np.arange(n), lengths)
+
+    user_count = np.bincount(conv[dirs == USER], minlength=n)
+    agent_count = np.bincount(conv[dirs == AGENT], minlength=n)
+    duration = _durations(ts, lengths)
+    latency_sum, latency_count = _latencies(ts, dirs, conv, n)
+
+    # tolist() devuelve int/float de Python, que es lo que se guarda en Mongo
+    return [
+        {
+            "durationSeconds": seconds,
+            "messageCount": {"user": users, "agent": agents, "total": total},
+            "latency": {
+                "averageSeconds": latency / count if count else None,
+                "interactionsCount": count
+            }
+        }
+        for seconds, users, agents, total, latency, count in zip(
+            duration.tolist(), user_count.tolist(), agent_count.tolist(), lengths.tolist(),
+            latency_sum.tolist(), latency_count.tolist()
+        )
+    ]
+
+
+def _durations(ts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # Primer y último mensaje de cada conversación; 0 si está vacía o si
+    # algún timestamp falta (los faltantes quedan primeros en el frame)
+    duration = np.zeros(len(lengths), dtype=np.int64)
+    has_messages = lengths > 0
+    ends = np.cumsum(lengths)[has_messages]
+    first = ts[ends - lengths[has_messages]]
+    last = ts[ends - 1]
+    seconds = np.trunc((last - first) / 1e6).astype(np.int64)
+    duration[has_messages] = np.where(first == MISSING_TS, 0, seconds)
+    return duration
+
+
+def _latencies(ts: np.ndarray, dirs: np.ndarray, conv: np.ndarray, n: int):
+    """
+    Misma regla que LatencyCalculator, vectorizada: cada mensaje del agente
+    se empareja con el primer mensaje del usuario posterior al agente
+    anterior de su conversación, si el del agente es estrictamente posterior.
+    """
+    valid = ts != MISSING_TS
+    ts, dirs, conv = ts[valid], dirs[valid], conv[valid]
+
+    is_agent = dirs == AGENT
+    # Agentes (de todo el lote) antes de cada posición: identifica el tramo
+    agents_before = np.cumsum(is_agent) - is_agent
+    agent_pos = np.flatnonzero(is_agent)
+
+    user_pos = np.flatnonzero(dirs == USER)
+    if not len(user_pos) or not len(agent_pos):
+        return np.zeros(n), np.zeros(n, dtype=np.int64)
+
+    # Primer usuario de cada tramo (conversación, agentes anteriores)
+    segment = agents_before[user_pos]
+    first_in_segment = np.ones(len(user_pos), dtype=bool)
+    first_in_segment[1:] = (segment[1:] != segment[:-1]) | (conv[user_pos[1:]] != conv[user_pos[:-1]])
+    user_pos, segment = user_pos[first_in_segment], segment[first_in_segment]
+
+    # El agente que cierra el tramo tiene que existir y ser de la misma conversación
+    has_agent = segment < len(agent_pos)
+    user_pos = user_pos[has_agent]
+    reply_pos = agent_pos[segment[has_agent]]
+    same_conv = conv[reply_pos] == conv[user_pos]
+    user_pos, reply_pos = user_pos[same_conv], reply_pos[same_conv]
+
+    delta = ts[reply_pos] - ts[user_pos]
+    answered = delta > 0
+    owners = conv[user_pos[answered]]
+    # bincount acumula en orden, igual que la suma del camino por conversación
+    latency_sum = np.bincount(owners, weights=delta[answered] / 1e6, minlength=n)
+    latency_count = np.bincount(owners, minlength=n)
+    return latency_sum, latency_count
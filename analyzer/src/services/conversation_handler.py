@@ -1,60 +1,152 @@
 # analyzer/services/process.py
 
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-import os
-import json
-from storage.session_writter import save_session
-from utils.util_get_messages_by_direction import get_messages_by_direction
+from storage.session_pipeline import get_session_pipeline, persist_session
+from utils.conversation_frame import ConversationFrame
 
-from db.agent_repo import AgentRepo
+from db.agent_cache import get_agent_cache
 from services.token_utils import tokenize_texts, calculate_cost_with_tokonomics
-from db.sessions_repo import SessionRepo
 from services.latency_calculator import LatencyCalculator
 from behavior_analysis.success_context import SuccessEvaluationContext
 from behavior_analysis.success_engine import SuccessEvaluatorEngine
 from services.language_detector import ConversationLanguageDetector
+from services.fingerprint import conversation_fingerprint, find_stored_sessions_async, find_unchanged_sessions, match_stored_sessions
+from behavior_analysis.keyword_registry import get_keyword_registry
+from services.instrumentation import timed
 
 def process_conversation(raw_json: Dict[str, Any]) -> Dict[str, Any]:
+    with timed("agent_lookup"):
+        agent = get_agent_for_conversation(raw_json["conversation"])
+
+    # Reenvío de una conversación ya analizada: se devuelve la sesión guardada
+    with timed("dedup_lookup"):
+        fingerprints, unchanged = find_unchanged_sessions([(raw_json, agent)], get_keyword_registry().version)
+    if unchanged:
+        return unchanged[0]
+
+    session_doc = build_session_doc(raw_json, agent=agent)
+    session_doc["fingerprint"] = fingerprints[0]
+
+    # Se guarda en todos los sinks configurados ('sessions' y 'metrics' por defecto)
+    with timed("persist"):
+        persist_session(session_doc)
+
+    return session_doc
+
+
+async def process_conversation_async(raw_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Variante async de process_conversation para api/asgi.py. La búsqueda del
+    agente y la de la sesión guardada van a la vez por el cliente async de
+    Mongo, el análisis corre en el executor de CPU y la sesión se escribe en
+    todos los sinks a la vez. Mientras una conversación espera a Mongo el
+    worker atiende otras.
+    """
     conv = raw_json["conversation"]
-    msgs = raw_json["messages"]
 
-    normalized_msgs = _normalize_messages(msgs)#Normaliza el timestampt
-    normalized_msgs.sort(key=lambda m: m["timestamp_dt"] or datetime.min)#Ordena los mensajes por timestamp
+    async def lookup_agent():
+        with timed("agent_lookup"):
+            return await get_agent_for_conversation_async(conv)
+
+    async def lookup_stored():
+        with timed("dedup_lookup"):
+            return await find_stored_sessions_async([conv["_id"]])
+
+    agent, stored = await asyncio.gather(lookup_agent(), lookup_stored())
+    fingerprint = conversation_fingerprint(raw_json, agent, get_keyword_registry().version)
+    unchanged = match_stored_sessions([(raw_json, agent)], [fingerprint], stored)
+    if unchanged:
+        return unchanged[0]
+
+    from services.batch_executor import run_cpu_bound  # batch_executor importa este módulo
+    session_doc = await run_cpu_bound(build_session_doc, raw_json, agent)
+    session_doc["fingerprint"] = fingerprint
+
+    # Sin write-behind: con escrituras async el request no bloquea al worker mientras espera
+    with timed("persist"):
+        errors = await get_session_pipeline().write_many_async([session_doc])
+    if errors:
+        raise RuntimeError(f"No se pudo guardar en '{errors[0]['stage']}': {errors[0]['error']}")
+    return session_doc
 
-    user_count = _calc_messages_by_direction(normalized_msgs, direction="user")
-    agent_count = _calc_messages_by_direction(normalized_msgs, direction="agent")
-    total_count = len(normalized_msgs)
+
+def build_session_doc(raw_json: Dict[str, Any], agent: Optional[Dict[str, Any]] = None,
+                      token_counts: Optional[Dict[str, int]] = None,
+                      frame: Optional[ConversationFrame] = None,
+                      metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Analiza una conversación y arma el documento de sesión sin persistirlo.
+    Lo usa tanto process_conversation como el modo batch de initiate_analyzer.
+
+    Si se pasa `agent` (ya resuelto por el llamador) no se consulta Mongo,
+    lo que permite correr esta función en procesos worker sin acceso a la BD.
+    `token_counts` permite pasar los tokens ya contados en lote
+    (ver tokenize_conversations) para no tokenizar de a una conversación.
+    `frame` es el ConversationFrame de los mensajes si el llamador ya lo armó;
+    todas las etapas trabajan sobre él en lugar de recorrer los mensajes.
+    `metrics` trae duración, conteos y latencia ya calculados para todo el
+    lote (ver services.batch_metrics.compute_batch_metrics).
+    """
+    conv = raw_json["conversation"]
+    msgs = raw_json["messages"]
+
+    # Un solo recorrido de los mensajes: timestamps parseados, orden y textos por dirección
+    if frame is None:
+        with timed("frame"):
+            frame = ConversationFrame.from_messages(msgs)
+
+    if metrics is not None:
+        user_count = metrics["messageCount"]["user"]
+        agent_count = metrics["messageCount"]["agent"]
+        total_count = metrics["messageCount"]["total"]
+    else:
+        user_count = frame.user_count
+        agent_count = frame.agent_count
+        total_count = len(frame)
     message_stats = {
         "user_count": user_count,
         "agent_count": agent_count,
         "total_count": total_count
     }
 
-    duration = _calc_conversation_duration(normalized_msgs)
-    full_agent = _get_agent_data_from_conversation(conv)
-    agent_data = {
-        "agentId": full_agent.get("_id"),
-        "modelLLM": full_agent.get("modelName"),
-        "agentName": full_agent.get("name"),
-        "userId": full_agent.get("userId")
-    }
+    duration = metrics["durationSeconds"] if metrics is not None else frame.duration_seconds()
+    if agent is None:
+        with timed("agent_lookup"):
+            agent = get_agent_for_conversation(conv)
+    agent_data = build_agent_data(agent)
+
+    token_usage = calc_token_usage(frame, conv, agent_data, token_counts)
 
-    token_usage = _calc_tokens(normalized_msgs, conv, agent_data)
+    if metrics is not None:
+        latency_info = metrics["latency"]
+    else:
+        with timed("latency"):
+            latency_info = LatencyCalculator(frame).calculate_average_latency()
 
-    latency_info = LatencyCalculator(normalized_msgs).calculate_average_latency()
+    with timed("language"):
+        lang_detector = ConversationLanguageDetector.from_frame(frame)
+        language = lang_detector.get_predominant_language() or "unknown"
 
+    context = SuccessEvaluationContext(conv,msgs,message_stats,language,frame)
+    return assemble_session_doc(conv, agent_data, message_stats, duration, token_usage, latency_info, context)
 
-    
-    lang_detector = ConversationLanguageDetector(normalized_msgs)
-    language = lang_detector.get_predominant_language() or "unknown"
 
+def assemble_session_doc(conv: Dict[str, Any], agent_data: Dict[str, Any], message_stats: Dict[str, int],
+                         duration: int, token_usage: Dict[str, Any], latency_info: Dict[str, Any],
+                         context: SuccessEvaluationContext) -> Dict[str, Any]:
+    """
+    Corre los evaluadores de éxito sobre `context` y arma el documento de
+    sesión. Lo comparten build_session_doc y el cierre del análisis
+    incremental (services/incremental_analyzer.py).
+    """
     metadata = {
-        "language": language,
+        "language": context.language,
     }
   
 
-    successEngine = SuccessEvaluatorEngine(SuccessEvaluationContext(conv,msgs,message_stats))
+    successEngine = SuccessEvaluatorEngine(context)
 
     successful = successEngine.run()
     tags = successEngine.get_tags()
@@ -78,53 +170,34 @@ def process_conversation(raw_json: Dict[str, Any]) -> Dict[str, Any]:
         "successful": successful,
         "tags": tags,
         "messageCount": {
-            "user": user_count,
-            "agent": agent_count,
-            "total": total_count 
+            "user": message_stats["user_count"],
+            "agent": message_stats["agent_count"],
+            "total": message_stats["total_count"]
         },
         "latency": latency_info,
         "metadata": metadata,
+        "evaluators": successEngine.get_trace(),
         "conversationId": conv["_id"]
     }
 
-    output_path = os.path.join(os.path.dirname(__file__), "resultSession.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(session_doc, f, ensure_ascii=False, indent=2, default=str)
-
-    save_session(session_doc)
-    # Guardar también en la colección 'metrics'
-    repo = SessionRepo()
-    repo.save_session(session_doc)
-
     return session_doc
 
 
-def _normalize_messages(raw_messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    normalized = []
-    for m in raw_messages:
-        try:
-            ts_dt = datetime.fromisoformat(m["timestamp"])
-        except Exception:
-            ts_dt = None
-        normalized.append({**m, "timestamp_dt": ts_dt})
-    return normalized
-
-
-def _calc_messages_by_direction(messages: List[Dict[str, Any]], direction: str) -> int:
-    return sum(1 for m in messages if m.get("direction") == direction)
-
-
-def _calc_conversation_duration(messages: List[Dict[str, Any]]) -> int:
-    if not messages:
-        return 0
-    first = messages[0].get("timestamp_dt")
-    last = messages[-1].get("timestamp_dt")
-    if first and last:
-        return int((last - first).total_seconds())
-    return 0
+def build_agent_data(full_agent: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "agentId": full_agent.get("_id"),
+        "modelLLM": full_agent.get("modelName"),
+        "agentName": full_agent.get("name"),
+        "userId": full_agent.get("userId")
+    }
 
 
-def _calc_tokens(messages: List[Dict[str, Any]], conversation: Dict[str, Any], agent_data: Dict[str, Any]) -> Dict[str, Any]:
+def calc_token_usage(frame: Optional[ConversationFrame], conversation: Dict[str, Any], agent_data: Dict[str, Any],
+                 token_counts: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Tokens y costo del agente; con `token_counts` ya contados no hace falta el frame.
+    Si el modelo todavía no tiene precio, cost queda en None y costPending en True.
+    """
     user_id = conversation.get("userId")
     if not user_id:
         raise ValueError("Conversation sin clave 'userId'.")
@@ -133,38 +206,60 @@ def _calc_tokens(messages: List[Dict[str, Any]], conversation: Dict[str, Any], a
     if not model_name:
         raise ValueError(f"agent_data no contiene 'modelLLM' para userId={user_id}")
 
-    agent_msgs = get_messages_by_direction(messages, "agent")
-    texts: List[str] = [m.get("text", "") for m in agent_msgs]
-
-    tokens_info = tokenize_texts(texts, model_name)
+    tokens_info = token_counts
+    if not tokens_info:
+        with timed("tokenize"):
+            tokens_info = tokenize_texts(frame.agent_texts, model_name)
     prompt_tokens = tokens_info["promptTokens"]
     completion_tokens = tokens_info["completionTokens"]
     total_tokens = tokens_info["totalTokens"]
 
-    cost_usd = calculate_cost_with_tokonomics(
-        model_name=model_name,
-        prompt_tokens=prompt_tokens,
-        completion_tokens=completion_tokens
-    )
+    with timed("pricing"):
+        cost_usd = calculate_cost_with_tokonomics(
+            model_name=model_name,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens
+        )
 
     return {
         "promptTokens": prompt_tokens,
         "completionTokens": completion_tokens,
         "totalTokens": total_tokens,
-        "cost": cost_usd
+        "cost": cost_usd,
+        "costPending": cost_usd is None
     }
 
 
-def _get_agent_data_from_conversation(conversation: Dict[str, Any]) -> Dict[str, Any]:
+def get_agent_for_conversation(conversation: Dict[str, Any]) -> Dict[str, Any]:
     user_id = conversation.get("userId")
     if not user_id:
         raise ValueError("Conversation sin clave 'userId'.")
-    repo = AgentRepo()
-    agent_data = repo.get_agent_by_user_id(user_id)
+    agent_data = get_agent_cache().get(user_id)
 
     if not agent_data:
         raise ValueError(f"No se encontró agente con userId={user_id}")
     return agent_data
 
 
+async def get_agent_for_conversation_async(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = conversation.get("userId")
+    if not user_id:
+        raise ValueError("Conversation sin clave 'userId'.")
+    agent_data = await get_agent_cache().get_async(user_id)
+
+    if not agent_data:
+        raise ValueError(f"No se encontró agente con userId={user_id}")
+    return agent_data
+
+
+def get_agents_for_conversations(conversations: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Resuelve el agente de cada userId distinto de un lote: los que están en
+    cache salen de memoria y el resto se trae con una única consulta $in.
+    Los userId sin agente no aparecen en el resultado.
+    """
+    return get_agent_cache().prefetch(c.get("userId") for c in conversations)
+
 
+async def get_agents_for_conversations_async(conversations: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return await get_agent_cache().prefetch_async(c.get("userId") for c in conversations)
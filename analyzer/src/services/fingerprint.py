@@ -0,0 +1,87 @@
+# analyzer/services/fingerprint.py
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from behavior_analysis.evaluator_registry import get_evaluator_registry
+from config import settings
+
+# Subir cuando cambie cómo se calculan métricas, tags o el puntaje: invalida
+# los resultados guardados con la versión anterior.
+SCORING_VERSION = "2"
+
+# Únicos campos que lee el análisis; el resto no cambia el resultado
+_CONVERSATION_FIELDS = ("_id", "userId", "from", "createdAt", "updatedAt")
+_AGENT_FIELDS = ("_id", "modelName", "name", "userId")
+_MESSAGE_FIELDS = ("direction", "text", "timestamp")
+
+
+def conversation_fingerprint(raw_json: Dict[str, Any], agent: Dict[str, Any], keywords_version: str) -> str:
+    """
+    sha256 de todo lo que determina el documento de sesión: mensajes,
+    conversación, agente, versión de keywords.yaml y de evaluators.yaml y
+    SCORING_VERSION.
+    Si coincide con el de la sesión guardada, el análisis daría lo mismo.
+    """
+    conversation = raw_json["conversation"]
+    payload = {
+        "scoring": SCORING_VERSION,
+        "keywords": keywords_version,
+        "evaluators": get_evaluator_registry().version,
+        "conversation": {k: conversation.get(k) for k in _CONVERSATION_FIELDS},
+        "agent": {k: agent.get(k) for k in _AGENT_FIELDS},
+        "messages": [{k: m.get(k) for k in _MESSAGE_FIELDS} for m in raw_json["messages"]]
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def find_unchanged_sessions(items: List[Tuple[Dict[str, Any], Dict[str, Any]]], keywords_version: str,
+                            reuse: Optional[bool] = None) -> Tuple[List[str], Dict[int, Dict[str, Any]]]:
+    """
+    Para cada (raw_json, agent) calcula el fingerprint y busca con una sola
+    consulta por _id las sesiones ya guardadas con el mismo fingerprint.
+
+    Retorna (fingerprints, {posición en items: sesión guardada}); con
+    `reuse` en False (SESSION_DEDUP por defecto) no consulta y el dict queda vacío.
+    """
+    if reuse is None:
+        reuse = settings.SESSION_DEDUP
+    fingerprints = [conversation_fingerprint(raw, agent, keywords_version) for raw, agent in items]
+    if not reuse or not items:
+        return fingerprints, {}
+
+    from storage.session_pipeline import get_session_pipeline
+    stored = get_session_pipeline().find_sessions([raw["conversation"]["_id"] for raw, _ in items])
+    return fingerprints, match_stored_sessions(items, fingerprints, stored)
+
+
+async def find_stored_sessions_async(conversation_ids: List[Any], reuse: Optional[bool] = None) -> Dict[Any, Dict[str, Any]]:
+    """
+    Sesiones guardadas por _id con el cliente async (api/asgi.py). No
+    necesita el agente, así que puede correr a la vez que su búsqueda; el
+    fingerprint se compara después con match_stored_sessions.
+    """
+    if reuse is None:
+        reuse = settings.SESSION_DEDUP
+    if not reuse or not conversation_ids:
+        return {}
+    from storage.session_pipeline import get_session_pipeline
+    return await get_session_pipeline().find_sessions_async(conversation_ids)
+
+
+def match_stored_sessions(items: List[Tuple[Dict[str, Any], Dict[str, Any]]], fingerprints: List[str],
+                          stored: Dict[Any, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    {posición en items: sesión guardada} de las que tienen el mismo fingerprint.
+    Las guardadas sin costo (modelo sin precio todavía) se vuelven a analizar.
+    """
+    unchanged: Dict[int, Dict[str, Any]] = {}
+    for i, ((raw, _), fingerprint) in enumerate(zip(items, fingerprints)):
+        doc: Optional[Dict[str, Any]] = stored.get(raw["conversation"]["_id"])
+        if doc is None or (doc.get("tokenUsage") or {}).get("costPending"):
+            continue
+        if doc.get("fingerprint") == fingerprint:
+            unchanged[i] = doc
+    return unchanged
@@ -0,0 +1,295 @@
+# analyzer/services/incremental_analyzer.py
+
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from behavior_analysis.behavior_extras_evaluator import is_similar_message
+from behavior_analysis.keyword_registry import KeywordRegistry, KeywordSnapshot, get_keyword_registry
+from behavior_analysis.near_duplicates import MinHashLSH
+from behavior_analysis.success_context import SuccessEvaluationContext
+from config import settings
+from services.conversation_handler import (
+    assemble_session_doc, build_agent_data, build_session_doc, calc_token_usage, get_agent_for_conversation
+)
+from services.language_detector import LanguageVotes
+from services.token_utils import tokenize_texts
+from storage.session_pipeline import persist_session
+from utils.conversation_frame import AGENT, MISSING_TS, USER, ConversationFrame
+
+DEFAULT_PACK = "default"
+
+
+class MissingStateError(Exception):
+    """
+    La conversación no tiene estado incremental y no se enviaron sus mensajes.
+    """
+
+
+class ConversationAccumulator:
+    """
+    Acumuladores de una conversación abierta, actualizados a medida que
+    llegan los mensajes. `state` es un dict serializable que se persiste
+    entre requests (ver db/analysis_state_repo.py):
+
+      - counts: mensajes por dirección.
+      - timestamps: primero/último en microsegundos y si faltó alguno (duración).
+      - latency: usuario pendiente de respuesta, suma y cantidad (LatencyCalculator).
+      - promptTokens: tokens de los textos del agente ya contados.
+      - keywords: keywords encontradas por pack de idioma y categoría.
+      - language: votación de idioma (LanguageVotes).
+      - repetition: textos largos del usuario y sus bandas MinHash (con el
+        esquema con que se armaron), o found.
+
+    Con los mensajes en orden cronológico y el mismo keywords.yaml durante
+    toda la conversación, finalize() da el mismo documento que el análisis
+    completo; si no, `exact` queda en False.
+    """
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+
+    @classmethod
+    def new(cls, conversation_id: str, agent_data: Dict[str, Any], keywords_version: str) -> "ConversationAccumulator":
+        return cls({
+            "_id": conversation_id,
+            "rev": None,
+            "agentData": agent_data,
+            "exact": True,
+            "counts": {"user": 0, "agent": 0, "total": 0},
+            "timestamps": {"first": None, "last": None, "missing": False},
+            "latency": {"pendingUserTs": None, "sum": 0.0, "count": 0},
+            "promptTokens": 0,
+            "keywords": {"version": keywords_version, "packs": {}},
+            "language": LanguageVotes(early_stop=settings.LANG_EARLY_STOP).to_state(),
+            "repetition": {"found": False, "texts": [], "bands": []}
+        })
+
+    def add_messages(self, messages: List[Dict[str, Any]], snapshot: KeywordSnapshot, lsh: MinHashLSH) -> None:
+        frame = ConversationFrame.from_messages(messages)
+        self._add_counts_and_times(frame)
+        self._add_tokens(frame)
+        self._add_keywords(frame, snapshot)
+
+        votes = LanguageVotes.from_state(self.state["language"])
+        for text in frame.user_texts:
+            votes.add(text)
+        self.state["language"] = votes.to_state()
+
+        for text in frame.user_lowered:
+            self._add_repetition(text, lsh)
+
+    def finalize(self, conversation: Dict[str, Any], snapshot: KeywordSnapshot) -> Dict[str, Any]:
+        """
+        Arma el documento de sesión sólo a partir de los acumuladores.
+        """
+        counts = self.state["counts"]
+        message_stats = {"user_count": counts["user"], "agent_count": counts["agent"], "total_count": counts["total"]}
+
+        times = self.state["timestamps"]
+        duration = 0 if times["missing"] or times["first"] is None else int((times["last"] - times["first"]) / 1e6)
+
+        latency = self.state["latency"]
+        latency_info = {
+            "averageSeconds": latency["sum"] / latency["count"] if latency["count"] else None,
+            "interactionsCount": latency["count"]
+        }
+
+        language = LanguageVotes.from_state(self.state["language"]).result() or "unknown"
+        pack = language if language in snapshot.packs else DEFAULT_PACK
+        keyword_hits = snapshot.matcher_for(language).weigh(self.state["keywords"]["packs"].get(pack, {}))
+
+        agent_data = self.state["agentData"]
+        prompt_tokens = self.state["promptTokens"]
+        token_usage = calc_token_usage(None, conversation, agent_data, {
+            "promptTokens": prompt_tokens,
+            "completionTokens": 0,
+            "totalTokens": prompt_tokens
+        })
+
+        context = SuccessEvaluationContext(
+            conversation, [], message_stats, language,
+            keyword_hits=keyword_hits, repeated_messages=self.state["repetition"]["found"]
+        )
+        return assemble_session_doc(conversation, agent_data, message_stats, duration, token_usage, latency_info, context)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"conversationId": self.state["_id"], "messages": self.state["counts"]["total"], "exact": self.state["exact"]}
+
+    def _add_counts_and_times(self, frame: ConversationFrame) -> None:
+        counts, times, latency = self.state["counts"], self.state["timestamps"], self.state["latency"]
+        counts["user"] += frame.user_count
+        counts["agent"] += frame.agent_count
+        counts["total"] += len(frame)
+
+        for ts, direction in zip(frame.timestamps, frame.directions):
+            if ts == MISSING_TS:
+                # El análisis completo los ordena primero: si llegan tarde cambia el orden
+                if times["last"] is not None:
+                    self.state["exact"] = False
+                times["missing"] = True
+                continue
+            if times["last"] is not None and ts < times["last"]:
+                self.state["exact"] = False
+            times["first"] = ts if times["first"] is None else min(times["first"], ts)
+            times["last"] = ts if times["last"] is None else max(times["last"], ts)
+
+            # Misma regla que LatencyCalculator: el primer usuario después del
+            # agente anterior queda pendiente y lo cierra el próximo agente
+            if direction == USER and latency["pendingUserTs"] is None:
+                latency["pendingUserTs"] = ts
+            elif direction == AGENT:
+                pending = latency["pendingUserTs"]
+                if pending is not None and ts > pending:
+                    latency["sum"] += (ts - pending) / 1e6
+                    latency["count"] += 1
+                latency["pendingUserTs"] = None
+
+    def _add_tokens(self, frame: ConversationFrame) -> None:
+        if not frame.agent_texts:
+            return
+        model_name = self.state["agentData"].get("modelLLM")
+        if not model_name:
+            raise ValueError(f"agent_data no contiene 'modelLLM' para la conversación {self.state['_id']}")
+        self.state["promptTokens"] += tokenize_texts(frame.agent_texts, model_name)["promptTokens"]
+
+    def _add_keywords(self, frame: ConversationFrame, snapshot: KeywordSnapshot) -> None:
+        keywords = self.state["keywords"]
+        if keywords["version"] != snapshot.version:
+            self.state["exact"] = False
+        if not frame.user_lowered:
+            return
+        # Un acumulado por pack: el idioma recién se conoce al cerrar
+        matchers = {DEFAULT_PACK: snapshot.default, **snapshot.packs}
+        for pack, matcher in matchers.items():
+            seen: Dict[str, Set[str]] = {
+                category: set(kws) for category, kws in keywords["packs"].get(pack, {}).items()
+            }
+            matcher.collect(frame.user_lowered, seen)
+            keywords["packs"][pack] = {category: sorted(kws) for category, kws in seen.items()}
+
+    def _add_repetition(self, text: str, lsh: MinHashLSH) -> None:
+        repetition = self.state["repetition"]
+        if repetition["found"] or len(text.split()) < settings.REPETITION_MIN_WORDS:
+            return
+
+        previous = repetition["texts"]
+        if repetition.get("scheme") != lsh.scheme:
+            # Estado guardado con otro MinHash (otra versión o configuración):
+            # se rearman las bandas desde los textos, que se guardan igual
+            repetition["bands"] = [lsh.band_keys(lsh.signature(t)) for t in previous]
+            repetition["scheme"] = lsh.scheme
+        bands = lsh.band_keys(lsh.signature(text))
+        if len(previous) < settings.REPETITION_EXACT_MAX_MESSAGES:
+            candidates = range(len(previous))
+        else:
+            # Sólo los textos que comparten alguna banda con el nuevo
+            candidates = [
+                i for i, other in enumerate(repetition["bands"])
+                if any(a == b for a, b in zip(bands, other))
+            ]
+
+        if any(is_similar_message(previous[i], text) for i in candidates):
+            # Ya no hace falta guardar los textos
+            self.state["repetition"] = {"found": True, "texts": [], "bands": []}
+            return
+        previous.append(text)
+        repetition["bands"].append(bands)
+
+
+class IncrementalAnalyzer:
+    """
+    Análisis por mensaje: add_messages() actualiza los acumuladores de la
+    conversación a medida que llegan los mensajes y finalize() la cierra
+    en O(1) (sin volver a recorrer los mensajes), guarda la sesión y borra
+    el estado.
+    """
+    def __init__(self, repo=None, registry: Optional[KeywordRegistry] = None):
+        self._repo = repo
+        self.registry = registry or get_keyword_registry()
+        self.lsh = MinHashLSH(
+            num_perm=settings.REPETITION_MINHASH_PERM,
+            bands=settings.REPETITION_LSH_BANDS,
+            jaccard_floor=settings.REPETITION_JACCARD_FLOOR,
+            shingle_size=settings.REPETITION_SHINGLE_SIZE
+        )
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            from db.analysis_state_repo import get_analysis_state_repo
+            self._repo = get_analysis_state_repo()
+        return self._repo
+
+    def add_messages(self, raw_json: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Suma los mensajes nuevos de `raw_json` ({"conversation", "messages"})
+        al estado de la conversación. Si otro worker escribió el estado en el
+        medio se relee y se reintenta.
+        """
+        conversation = raw_json["conversation"]
+        conversation_id = conversation["_id"]
+        snapshot = self.registry.get()
+        for _ in range(max(1, settings.INCREMENTAL_MAX_RETRIES)):
+            stored = self.repo.get_state(conversation_id)
+            if stored is None:
+                agent_data = build_agent_data(get_agent_for_conversation(conversation))
+                accumulator = ConversationAccumulator.new(conversation_id, agent_data, snapshot.version)
+            else:
+                accumulator = ConversationAccumulator(stored)
+            accumulator.add_messages(raw_json["messages"], snapshot, self.lsh)
+            if self.repo.save_state(accumulator.state):
+                return accumulator.summary()
+        raise RuntimeError(f"Escrituras concurrentes sobre la conversación {conversation_id}, reintentar")
+
+    def finalize(self, raw_json: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """
+        Cierra la conversación y guarda la sesión. Retorna (session_doc, modo):
+          - "incremental": a partir del estado acumulado.
+          - "full": análisis completo, cuando no hay estado o no es exacto
+            (mensajes fuera de orden, faltantes o keywords.yaml cambiado)
+            y el request trae todos los mensajes.
+        """
+        conversation = raw_json["conversation"]
+        conversation_id = conversation["_id"]
+        messages = raw_json.get("messages")
+        for _ in range(max(1, settings.INCREMENTAL_MAX_RETRIES)):
+            stored = self.repo.get_state(conversation_id)
+
+            if stored is not None and (messages is None or self._is_usable(stored, messages)):
+                session_doc = ConversationAccumulator(stored).finalize(conversation, self.registry.get())
+                mode = "incremental"
+            elif messages is not None:
+                session_doc = build_session_doc(raw_json)
+                mode = "full"
+            else:
+                raise MissingStateError(f"No hay estado incremental para la conversación {conversation_id}")
+
+            # Sólo se borra el estado que se leyó: si entraron mensajes en el
+            # medio (otro rev) se relee y se cierra de nuevo con ellos
+            if stored is not None and not self.repo.delete_state(conversation_id, stored["rev"]):
+                continue
+            try:
+                persist_session(session_doc)
+            except Exception:
+                if stored is not None:
+                    # Sin la sesión guardada se devuelve el estado para poder reintentar el cierre
+                    self.repo.save_state({**stored, "rev": None})
+                raise
+            return session_doc, mode
+        raise RuntimeError(f"Escrituras concurrentes sobre la conversación {conversation_id}, reintentar")
+
+    @staticmethod
+    def _is_usable(state: Dict[str, Any], messages: List[Dict[str, Any]]) -> bool:
+        return state["exact"] and state["counts"]["total"] == len(messages)
+
+
+_analyzer: Optional[IncrementalAnalyzer] = None
+_analyzer_lock = threading.Lock()
+
+
+def get_incremental_analyzer() -> IncrementalAnalyzer:
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = IncrementalAnalyzer()
+    return _analyzer
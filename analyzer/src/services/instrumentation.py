@@ -0,0 +1,100 @@
+# analyzer/services/instrumentation.py
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+from config import settings
+
+# De 100µs a 10s: cubre desde el matcher de keywords hasta un insert lento
+_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    "analyzer_stage_duration_seconds", "Duración de cada etapa del análisis", ["stage"], buckets=_BUCKETS
+)
+STAGE_ERRORS = Counter("analyzer_stage_errors_total", "Etapas que terminaron con excepción", ["stage"])
+SESSIONS_WRITTEN = Counter("analyzer_sessions_written_total", "Sesiones escritas por sink", ["sink"])
+SESSIONS_FAILED = Counter("analyzer_sessions_failed_total", "Sesiones que un sink no pudo escribir", ["sink"])
+SESSIONS_DROPPED = Counter(
+    "analyzer_session_writer_dropped_total", "Sesiones del writer diferido descartadas tras agotar los reintentos", ["sink"]
+)
+
+# Pool de conexiones de Mongo (db/mongo_client.py); los gauges suman sólo procesos vivos
+MONGO_POOL_OPEN = Gauge("analyzer_mongo_pool_connections", "Conexiones a Mongo abiertas", multiprocess_mode="livesum")
+MONGO_POOL_IN_USE = Gauge("analyzer_mongo_pool_checked_out", "Conexiones a Mongo en uso", multiprocess_mode="livesum")
+MONGO_POOL_WAITING = Gauge(
+    "analyzer_mongo_pool_waiting", "Operaciones esperando una conexión libre", multiprocess_mode="livesum"
+)
+MONGO_POOL_WAIT_SECONDS = Histogram(
+    "analyzer_mongo_pool_checkout_seconds", "Espera para obtener una conexión del pool", buckets=_BUCKETS
+)
+MONGO_POOL_CHECKOUT_FAILED = Counter(
+    "analyzer_mongo_pool_checkout_failed_total", "Pedidos de conexión que fallaron (timeout, pool cerrado)"
+)
+
+# labels() arma la clave en cada llamada: se guarda el hijo por etapa
+_stage_children: Dict[str, Tuple[object, object]] = {}
+
+
+def _children(stage: str):
+    children = _stage_children.get(stage)
+    if children is None:
+        children = _stage_children[stage] = (STAGE_SECONDS.labels(stage), STAGE_ERRORS.labels(stage))
+    return children
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Mide la duración de un bloque en el histograma de `stage` y cuenta las
+    excepciones. Con METRICS_ENABLED apagado no hace nada.
+
+        with timed("language"):
+            language = detector.get_predominant_language()
+    """
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    histogram, errors = _children(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        errors.inc()
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+def count_writes(sink: str, written: int, failed: int) -> None:
+    if not settings.METRICS_ENABLED:
+        return
+    if written:
+        SESSIONS_WRITTEN.labels(sink).inc(written)
+    if failed:
+        SESSIONS_FAILED.labels(sink).inc(failed)
+
+
+def count_dropped(sink: str, dropped: int) -> None:
+    if settings.METRICS_ENABLED and dropped:
+        SESSIONS_DROPPED.labels(sink).inc(dropped)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Métricas en formato de texto de Prometheus.
+
+    Con PROMETHEUS_MULTIPROC_DIR (lo define gunicorn.conf.py) cada proceso,
+    workers de gunicorn y del pool de análisis, escribe sus valores en
+    archivos propios de ese directorio y acá se suman todos; así cualquier
+    worker que atienda /metrics devuelve el total del servicio.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
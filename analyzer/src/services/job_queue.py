@@ -0,0 +1,204 @@
+# analyzer/services/job_queue.py
+
+import copy
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+
+class QueueFullError(Exception):
+    """
+    Hay demasiados jobs pendientes en este proceso.
+    """
+
+
+class JobStore:
+    """
+    Estado de los jobs en disco (un JSON por job en JOBS_DIR).
+
+    Se guarda en disco y no en memoria para que cualquier worker de gunicorn
+    pueda responder /jobs/<id>, no sólo el que recibió el payload. Cada job
+    anota el host y pid del worker que lo corre: si ese proceso ya no existe
+    (reciclado, OOM, timeout) y el job seguía sin terminar, se reporta como
+    fallido en lugar de quedar "queued" para siempre.
+    """
+    def __init__(self, directory: Optional[str] = None, ttl_seconds: Optional[float] = None):
+        self.directory = directory or settings.JOBS_DIR
+        self.ttl_seconds = settings.JOBS_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        # purge_if_due barre el directorio a lo sumo una vez cada ttl/10 por proceso
+        self.purge_interval = self.ttl_seconds / 10
+        self._last_purge: Optional[float] = None
+        self._purge_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def save(self, job: Dict[str, Any]) -> None:
+        path = self._path(job["id"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Sólo ids generados por nosotros: evita leer rutas arbitrarias
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return None
+        if job["status"] in ("queued", "running") and _worker_gone(job):
+            job.update(status="failed", error="El worker que corría el job terminó antes de completarlo")
+        return job
+
+    def purge_expired(self) -> int:
+        """
+        Borra los jobs terminados hace más de ttl_seconds.
+        """
+        limit = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) < limit:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def purge_if_due(self) -> int:
+        """
+        purge_expired() si pasó purge_interval desde la última vez; si no,
+        no toca el disco (se llama al terminar cada job).
+        """
+        now = time.monotonic()
+        with self._purge_lock:
+            if self._last_purge is not None and now - self._last_purge < self.purge_interval:
+                return 0
+            self._last_purge = now
+        return self.purge_expired()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+
+class JobQueue:
+    """
+    Cola de análisis en segundo plano para /analyze en modo asíncrono.
+
+    submit() registra el job, lo encola en un pool de hilos del proceso y
+    retorna el id al instante; el hilo corre `runner` (analyze_batch) y
+    deja el resultado por conversación en el JobStore.
+    """
+    def __init__(self, runner: Callable[[List[Any]], Dict[str, Any]], store: Optional[JobStore] = None,
+                 workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.runner = runner
+        self.store = store or JobStore()
+        self.workers = settings.JOBS_WORKERS if workers is None else workers
+        self.max_pending = settings.JOBS_MAX_PENDING if max_pending is None else max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, payload: Any) -> Dict[str, Any]:
+        items = payload if isinstance(payload, list) else [payload]
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Hay {self._pending} jobs pendientes, reintentar más tarde")
+            self._pending += 1
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "createdAt": _now(),
+            "startedAt": None,
+            "finishedAt": None,
+            "total": len(items),
+            "workerHost": socket.gethostname(),
+            "workerPid": os.getpid(),
+            "conversations": [
+                {"index": i, "conversationId": _conversation_id(item), "status": "pending"}
+                for i, item in enumerate(items)
+            ]
+        }
+        try:
+            self.store.save(job)
+            # El hilo trabaja sobre su propia copia: lo que se retorna es el estado inicial
+            self._get_executor().submit(self._run, copy.deepcopy(job), items)
+        except Exception as e:
+            # El job no llegó al pool: _run nunca va a liberar su lugar
+            with self._lock:
+                self._pending -= 1
+            job.update(status="failed", error=str(e), finishedAt=_now())
+            try:
+                self.store.save(job)
+            except OSError:
+                pass
+            raise
+        return job
+
+    def _run(self, job: Dict[str, Any], items: List[Any]) -> None:
+        try:
+            job["status"] = "running"
+            job["startedAt"] = _now()
+            self.store.save(job)
+
+            report = self.runner(items)
+            errors = {}
+            for error in report["errors"]:
+                errors.setdefault(error["index"], error)
+            for conversation in job["conversations"]:
+                error = errors.get(conversation["index"])
+                if error:
+                    conversation.update(status="error", stage=error["stage"], error=error["error"])
+                else:
+                    conversation["status"] = "ok"
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finishedAt"] = _now()
+            self.store.save(job)
+            with self._lock:
+                self._pending -= 1
+            self.store.purge_if_due()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Los hilos no sobreviven al fork: un pool por proceso
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analyzer-job")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+
+def _conversation_id(item: Any) -> Optional[str]:
+    conversation = item.get("conversation") if isinstance(item, dict) else None
+    return conversation.get("_id") if isinstance(conversation, dict) else None
+
+
+def _worker_gone(job: Dict[str, Any]) -> bool:
+    # Sólo se puede saber para procesos de esta misma máquina
+    if job.get("workerHost") != socket.gethostname() or not job.get("workerPid"):
+        return False
+    try:
+        os.kill(job["workerPid"], 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -1,39 +1,95 @@
-from langdetect import detect
-from collections import Counter
+import hashlib
+import math
+import threading
+from langdetect import DetectorFactory, detect
+from collections import Counter, OrderedDict
 from typing import List, Dict, Optional
 
+from config import settings
+from utils.conversation_frame import ConversationFrame
+
+# langdetect es aleatorio por defecto: con semilla fija el mismo texto
+# siempre da el mismo idioma
+DetectorFactory.seed = settings.LANG_DETECT_SEED
+
+_cache: "OrderedDict[bytes, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def detect_language(text: str) -> str:
+    """
+    Idioma de un texto con langdetect, cacheado por hash del texto.
+    Devuelve "unknown" si langdetect no puede decidir.
+    """
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _cache_lock:
+        lang = _cache.get(key)
+        if lang is not None:
+            _cache.move_to_end(key)
+            return lang
+
+    try:
+        lang = detect(text)
+    except Exception:
+        lang = "unknown"
+
+    with _cache_lock:
+        _cache[key] = lang
+        while len(_cache) > settings.LANG_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return lang
+
+
+def is_trivial_text(text: str) -> bool:
+    """
+    Textos sin información de idioma: emojis, números, "ok", "si"...
+    """
+    return sum(1 for ch in text if ch.isalpha()) < settings.LANG_MIN_LETTERS
+
 
 class ConversationLanguageDetector:
     """
     Detecta el idioma predominante de los mensajes de una conversación.
+
+    Con early_stop (por defecto, ver LANG_EARLY_STOP) get_predominant_language
+    no corre langdetect sobre todos los mensajes: descarta los triviales,
+    junta los cortos en bloques de al menos LANG_CHUNK_CHARS caracteres y
+    va votando bloque por bloque hasta que un idioma saca una ventaja
+    estadística (test de signo: ventaja >= LANG_LEAD_Z * sqrt(votos)).
     """
-    def __init__(self, messages: List[Dict[str, any]]):
+    def __init__(self, messages: List[Dict[str, any]], early_stop: Optional[bool] = None):
         direction: str = "user"#Dirección de los mensajes a analizar
         self.messages = messages
         self.direction = direction
+        self.early_stop = settings.LANG_EARLY_STOP if early_stop is None else early_stop
         self.languages: List[str] = []
+        self._texts: Optional[List[str]] = None
+
+    @classmethod
+    def from_frame(cls, frame: ConversationFrame, early_stop: Optional[bool] = None) -> "ConversationLanguageDetector":
+        """
+        Usa los textos del usuario ya extraídos en el frame de la conversación.
+        """
+        detector = cls([], early_stop=early_stop)
+        detector._texts = frame.user_texts
+        return detector
 
     def _get_texts(self) -> List[str]:
         """
         Extrae los textos de los mensajes con la dirección deseada.
         """
-        return [
-            m.get("text", "") for m in self.messages
-            if m.get("direction") == self.direction and m.get("text")
-        ]
+        if self._texts is None:
+            self._texts = [
+                m.get("text", "") for m in self.messages
+                if m.get("direction") == self.direction and m.get("text")
+            ]
+        return self._texts
 
     def detect_languages(self) -> List[str]:
         """
         Detecta el idioma de cada mensaje y guarda los resultados.
         """
-        texts = self._get_texts()
-        langs = []
-        for text in texts:
-            try:
-                lang = detect(text)
-            except Exception:
-                lang = "unknown"
-            langs.append(lang)
+        langs = [detect_language(text) for text in self._get_texts()]
         self.languages = langs
         return langs
 
@@ -41,6 +97,9 @@ class ConversationLanguageDetector:
         """
         Devuelve el idioma predominante o None si no se pudo detectar.
         """
+        if self.early_stop and not self.languages:
+            return self._detect_predominant_early()
+
         if not self.languages:
             self.detect_languages()
 
@@ -48,5 +107,86 @@ class ConversationLanguageDetector:
         if not valid_langs:
             return None
 
-        most_common = Counter(valid_langs).most_common(1)[0][0] #Obtiene el idioma más común; [0][0] significa [0] es el primer elemento de la lista y [0] es el primer elemento de la tupla 
+        most_common = Counter(valid_langs).most_common(1)[0][0] #Obtiene el idioma más común; [0][0] significa [0] es el primer elemento de la lista y [0] es el primer elemento de la tupla
         return most_common
+
+    def _detect_predominant_early(self) -> Optional[str]:
+        votes = LanguageVotes(early_stop=True)
+        for text in self._get_texts():
+            votes.add(text)
+            if votes.decided:
+                break
+        return votes.result()
+
+
+class LanguageVotes:
+    """
+    Votación de idioma acumulable de a un texto, con estado serializable
+    (to_state / from_state) para el análisis incremental.
+
+    Con early_stop junta textos no triviales consecutivos hasta
+    LANG_CHUNK_CHARS caracteres (langdetect acierta más con textos más largos
+    y se llama menos veces), vota un idioma por bloque y se da por decidida
+    cuando un idioma saca ventaja suficiente o se llega a LANG_MAX_SAMPLES.
+    Sin early_stop vota cada texto por separado.
+    """
+    def __init__(self, early_stop: bool = True, votes: Optional[Dict[str, int]] = None,
+                 pending: Optional[List[str]] = None, decided: bool = False):
+        self.early_stop = early_stop
+        self.votes: Counter = Counter(votes or {})
+        self.pending: List[str] = list(pending or [])
+        self.decided = decided
+
+    def add(self, text: str) -> None:
+        if self.decided:
+            return
+        if not self.early_stop:
+            self._vote(text)
+            return
+        if is_trivial_text(text):
+            return
+        self.pending.append(text)
+        if sum(len(t) for t in self.pending) >= settings.LANG_CHUNK_CHARS:
+            self._vote_pending()
+
+    def result(self) -> Optional[str]:
+        """
+        Idioma con más votos, contando el último bloque incompleto.
+        """
+        votes = self.votes
+        if self.pending and not self.decided:
+            votes = votes.copy()
+            lang = detect_language(" ".join(self.pending))
+            if lang != "unknown":
+                votes[lang] += 1
+        if not votes:
+            return None
+        return votes.most_common(1)[0][0]
+
+    def to_state(self) -> Dict[str, any]:
+        return {"earlyStop": self.early_stop, "votes": dict(self.votes), "pending": self.pending, "decided": self.decided}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, any]) -> "LanguageVotes":
+        return cls(state["earlyStop"], state["votes"], state["pending"], state["decided"])
+
+    def _vote_pending(self) -> None:
+        chunk = " ".join(self.pending)
+        self.pending = []
+        if not self._vote(chunk):
+            return
+        total = sum(self.votes.values())
+        if total >= settings.LANG_MIN_SAMPLES:
+            ranked = self.votes.most_common(2)
+            lead = ranked[0][1] - (ranked[1][1] if len(ranked) > 1 else 0)
+            if lead >= settings.LANG_LEAD_Z * math.sqrt(total):
+                self.decided = True
+        if total >= settings.LANG_MAX_SAMPLES:
+            self.decided = True
+
+    def _vote(self, text: str) -> bool:
+        lang = detect_language(text)
+        if lang == "unknown":
+            return False
+        self.votes[lang] += 1
+        return True
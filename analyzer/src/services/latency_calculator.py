@@ -1,29 +1,26 @@
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Dict, Optional
+from utils.conversation_frame import AGENT, MISSING_TS, USER, ConversationFrame
 
 class LatencyCalculator:
-    def __init__(self, messages: List[Dict]):
-        self.messages = sorted(
-            [m for m in messages if m.get("timestamp_dt")],
-            key=lambda m: m["timestamp_dt"]
-        )
+    def __init__(self, frame: ConversationFrame):
+        # El frame ya viene ordenado por timestamp; se descartan los que no tienen
+        self.timestamps = [t for t in frame.timestamps if t != MISSING_TS]
+        self.directions = [d for t, d in zip(frame.timestamps, frame.directions) if t != MISSING_TS]
 
     def calculate_average_latency(self) -> Dict[str, Optional[float]]:
         total_latency = 0.0
         interaction_count = 0
 
         i = 0
-        while i < len(self.messages):
-            current_msg = self.messages[i]
-            if current_msg.get("direction") == "user":
-                user_time = current_msg["timestamp_dt"]
+        while i < len(self.timestamps):
+            if self.directions[i] == USER:
+                user_time = self.timestamps[i]
                 # Buscar siguiente respuesta del agente
-                for j in range(i + 1, len(self.messages)):
-                    next_msg = self.messages[j]
-                    if next_msg.get("direction") == "agent":
-                        agent_time = next_msg["timestamp_dt"]
+                for j in range(i + 1, len(self.timestamps)):
+                    if self.directions[j] == AGENT:
+                        agent_time = self.timestamps[j]
                         if agent_time > user_time:
-                            latency = (agent_time - user_time).total_seconds()
+                            latency = (agent_time - user_time) / 1e6
                             total_latency += latency
                             interaction_count += 1
                             i = j  # continuar desde este punto
@@ -0,0 +1,194 @@
+# analyzer/services/pricing_catalog.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from config import settings
+
+# (costo USD por token de entrada, costo USD por token de salida)
+Price = Tuple[float, float]
+Fetcher = Callable[[Iterable[str]], Dict[str, Price]]
+
+# Snapshot versionado con el código: sólo se lee
+_BUNDLED_SNAPSHOT = os.path.join(os.path.dirname(__file__), "pricing_snapshot.json")
+
+
+class PricingCatalog:
+    """
+    Tabla de precios por modelo en memoria, cargada desde el snapshot
+    incluido en el código y, encima, el snapshot de runtime (`snapshot_path`).
+
+    El cálculo de costo es aritmética pura sobre la tabla: no hay red ni
+    event loop en el camino del request. Un hilo en segundo plano refresca
+    los precios (por defecto con tokonomics) cada `refresh_interval`
+    segundos y reescribe el snapshot de runtime (el incluido nunca se
+    escribe); si no hay red (despliegues aislados) simplemente se siguen
+    usando los snapshots. Un modelo que no está en la tabla no tiene costo
+    todavía (None): se le pide al hilo de refresco, que lo busca enseguida.
+    """
+    def __init__(self, snapshot_path: Optional[str] = None, refresh_interval: Optional[float] = None,
+                 fetcher: Optional[Fetcher] = None, bundled_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path or settings.PRICING_SNAPSHOT_FILE
+        self.bundled_path = bundled_path or _BUNDLED_SNAPSHOT
+        self.refresh_interval = settings.PRICING_REFRESH_SECONDS if refresh_interval is None else refresh_interval
+        self._fetcher = fetcher or _fetch_with_tokonomics
+        # Lo refrescado (runtime) pisa a lo incluido
+        self._prices: Dict[str, Price] = {**_load_snapshot(self.bundled_path), **_load_snapshot(self.snapshot_path)}
+        self._wanted: set = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._refresher_pid: Optional[int] = None
+        self.last_refresh: Optional[float] = None
+
+    def price(self, model_name: str) -> Optional[Price]:
+        """
+        Busca el precio del modelo: nombre exacto, formato "proveedor:modelo"
+        y, por último, el prefijo conocido más largo ("gpt-4o-2024-08-06" → "gpt-4o").
+        """
+        prices = self._prices
+        name = base = model_name.lower()
+        candidates = [name]
+        if ":" in name:
+            provider, base = name.split(":", 1)
+            candidates += [base, f"{provider}/{base}"]
+        for candidate in candidates:
+            if candidate in prices:
+                return prices[candidate]
+
+        while "-" in base:
+            base = base.rsplit("-", 1)[0]
+            if base in prices:
+                return prices[base]
+        return None
+
+    def cost(self, model_name: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """
+        Costo USD con la tabla local, o None si el modelo todavía no tiene
+        precio: en ese caso se despierta al refresco para que lo busque, sin
+        bloquear este request.
+        """
+        self._ensure_refresher()
+        price = self.price(model_name)
+        if price is None:
+            with self._lock:
+                self._wanted.add(model_name.lower())
+            self._wake.set()
+            return None
+        input_cost, output_cost = price
+        return (prompt_tokens or 0) * input_cost + (completion_tokens or 0) * output_cost
+
+    def refresh(self) -> int:
+        """
+        Trae precios nuevos para los modelos conocidos y los pedidos que
+        faltaban, actualiza la tabla y reescribe el snapshot. Retorna cuántos
+        modelos se actualizaron.
+        """
+        with self._lock:
+            models = set(self._prices) | set(self._wanted)
+        fetched = self._fetcher(sorted(models))
+        if not fetched:
+            return 0
+        self._merge(fetched)
+        with self._lock:
+            self.last_refresh = time.time()
+        return len(fetched)
+
+    def _merge(self, fetched: Dict[str, Price]) -> None:
+        with self._lock:
+            # Se reemplaza la tabla entera: los lectores ven la vieja o la nueva
+            self._prices = {**self._prices, **{k.lower(): tuple(v) for k, v in fetched.items()}}
+            self._wanted -= set(self._prices)
+            self._write_snapshot()
+
+    def _ensure_refresher(self) -> None:
+        # Los hilos no sobreviven al fork de gunicorn: uno por proceso
+        if self.refresh_interval <= 0 or self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+            threading.Thread(target=self._refresh_loop, name="pricing-refresh", daemon=True).start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            # Espera el intervalo o a que se pida un modelo desconocido
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ No se pudo refrescar el catálogo de precios: {e}")
+
+    def _write_snapshot(self) -> None:
+        data = {
+            "updatedAt": datetime.now(timezone.utc).isoformat(),
+            "source": "tokonomics",
+            "models": {
+                name: {"input_cost_per_token": p[0], "output_cost_per_token": p[1]}
+                for name, p in sorted(self._prices.items())
+            }
+        }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el snapshot de precios: {e}")
+
+
+def _load_snapshot(path: str) -> Dict[str, Price]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {
+        name.lower(): (float(p["input_cost_per_token"]), float(p["output_cost_per_token"]))
+        for name, p in data.get("models", {}).items()
+    }
+
+
+def _fetch_with_tokonomics(models: Iterable[str]) -> Dict[str, Price]:
+    """
+    Fetcher por defecto: consulta tokonomics (datos de precios de LiteLLM).
+    Si tokonomics no está instalado no trae nada.
+    """
+    try:
+        from tokonomics import get_model_costs
+    except ImportError:
+        return {}
+
+    models = list(models)
+
+    async def _inner():
+        results = await asyncio.gather(*(get_model_costs(m) for m in models))
+        return {
+            m: (c["input_cost_per_token"], c["output_cost_per_token"])
+            for m, c in zip(models, results) if c
+        }
+
+    return asyncio.run(_inner())
+
+
+_catalog: Optional[PricingCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_pricing_catalog() -> PricingCatalog:
+    """
+    Catálogo de precios del proceso (se crea en el primer uso).
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = PricingCatalog()
+    return _catalog
@@ -0,0 +1,137 @@
+# analyzer/services/request_profiler.py
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from config import settings
+
+# <duración en µs>_<epoch en ms>_<pid>_<aleatorio>.prof: el orden por nombre es el orden por duración
+_PROFILE_ID = re.compile(r"^(\d{12})_(\d+)_(\d+)_[0-9a-f]{8}$")
+
+
+class RequestProfiler:
+    """
+    Perfilado opcional de requests con cProfile.
+
+    Un request se perfila si PROFILE_ENABLED está prendido y trae el header
+    PROFILE_HEADER o sale sorteado con PROFILE_SAMPLE_RATE. Apagado, el costo
+    es leer un setting. Sólo se conservan en PROFILE_DIR los PROFILE_KEEP
+    perfiles más lentos (compartidos por todos los workers del host), en el
+    formato de pstats: se abren con `python -m pstats`, snakeviz o tuna.
+    """
+    def __init__(self, directory: Optional[str] = None, keep: Optional[int] = None):
+        self.directory = directory or settings.PROFILE_DIR
+        self.keep = settings.PROFILE_KEEP if keep is None else keep
+        # cProfile admite un solo perfilador activo por proceso
+        self._active = threading.Lock()
+
+    def should_profile(self, headers: Mapping[str, str]) -> bool:
+        if not settings.PROFILE_ENABLED:
+            return False
+        if headers.get(settings.PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+            return True
+        return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+    def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, Optional[str]]:
+        """
+        Corre func perfilada. Retorna (resultado, id del perfil); el id es
+        None si el request no quedó entre los más lentos o si ya había otro
+        request perfilándose en este proceso.
+        """
+        if not self._active.acquire(blocking=False):
+            return func(*args, **kwargs), None
+
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Otra herramienta (debugger, coverage) ya está perfilando el proceso
+                return func(*args, **kwargs), None
+
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                # También se guarda si func falló: un request lento que termina en error interesa igual
+                try:
+                    profile_id = self._store(profiler, time.perf_counter() - start)
+                except OSError as e:
+                    print(f"⚠️ No se pudo guardar el perfil: {e}")
+                    profile_id = None
+            return result, profile_id
+        finally:
+            self._active.release()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        Perfiles guardados, del más lento al más rápido.
+        """
+        profiles = []
+        for profile_id in self._profile_ids():
+            duration_us, created_ms, pid = _PROFILE_ID.match(profile_id).groups()[:3]
+            profiles.append({
+                "id": profile_id,
+                "durationSeconds": int(duration_us) / 1e6,
+                "createdAt": int(created_ms) / 1000,
+                "pid": int(pid)
+            })
+        return profiles
+
+    def path_for(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def _store(self, profiler: cProfile.Profile, seconds: float) -> Optional[str]:
+        if self.keep <= 0:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        existing = self._profile_ids()
+        duration_us = min(int(seconds * 1e6), 10 ** 12 - 1)
+        # Ya hay `keep` más lentos: ni se escribe
+        if len(existing) >= self.keep and duration_us <= int(existing[-1][:12]):
+            return None
+
+        profile_id = f"{duration_us:012d}_{int(time.time() * 1000)}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        tmp_path = f"{path}.tmp"
+        profiler.dump_stats(tmp_path)
+        os.replace(tmp_path, path)
+
+        # Anillo acotado: se borran los más rápidos que sobran
+        for stale in self._profile_ids()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, f"{stale}.prof"))
+            except FileNotFoundError:
+                pass  # Lo borró otro worker
+        return profile_id if os.path.exists(path) else None
+
+    def _profile_ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = [name[:-5] for name in names if name.endswith(".prof") and _PROFILE_ID.match(name[:-5])]
+        return sorted(ids, reverse=True)
+
+
+_profiler: Optional[RequestProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_request_profiler() -> RequestProfiler:
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = RequestProfiler()
+    return _profiler
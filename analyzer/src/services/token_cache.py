@@ -0,0 +1,90 @@
+# analyzer/services/token_cache.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+
+# Costo aproximado en memoria de una entrada: tupla clave + digest de 16
+# bytes + str del encoding (compartido) + int + nodo del OrderedDict.
+ENTRY_BYTES = 200
+
+_Key = Tuple[str, bytes]
+
+
+class TokenCountCache:
+    """
+    Memo LRU de conteos de tokens indexado por (encoding, hash del texto).
+
+    Las respuestas de los agentes suelen ser plantillas (saludos, menús,
+    despedidas): un texto repetido cuesta una búsqueda en un dict en lugar
+    de una pasada de BPE. Se guarda el hash y no el texto, así que cada
+    entrada ocupa lo mismo y el tope de memoria se traduce en un tope de
+    entradas.
+    """
+    def __init__(self, max_bytes: Optional[int] = None):
+        max_bytes = settings.TOKEN_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_entries = max(0, max_bytes // ENTRY_BYTES)
+        self._entries: "OrderedDict[_Key, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(encoding_name: str, text: str) -> _Key:
+        return encoding_name, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key: _Key) -> Optional[int]:
+        with self._lock:
+            count = self._entries.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, key: _Key, count: int) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxEntries": self.max_entries,
+            "approxBytes": len(self._entries) * ENTRY_BYTES,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": (self.hits / total) if total else None
+        }
+
+
+_token_cache: Optional[TokenCountCache] = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCountCache:
+    """
+    Memo de tokens del proceso (se crea en el primer uso).
+    """
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCountCache()
+    return _token_cache
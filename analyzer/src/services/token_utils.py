@@ -1,18 +1,53 @@
 # analyzer/services/token_utils.py
 
 import tiktoken
-import asyncio
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 
-from tokonomics import calculate_token_cost, get_model_limits
+from config import settings
+from services.pricing_catalog import get_pricing_catalog
+from services.token_cache import get_token_cache
 
-# Mapeo modelo → encoding
+# Mapeo modelo → encoding. Los nombres con sufijo (fecha, variante) se
+# resuelven por el prefijo más largo: "gpt-4o-2024-08-06" → "gpt-4o".
 _MODEL_TO_ENCODING = {
     "gpt-3.5-turbo":    "cl100k_base",
+    "gpt-35-turbo":     "cl100k_base",
     "gpt-4":            "cl100k_base",
+    "gpt-4-turbo":      "cl100k_base",
+    "gpt-4o":           "o200k_base",
+    "gpt-4o-mini":      "o200k_base",
+    "chatgpt-4o":       "o200k_base",
+    "gpt-4.1":          "o200k_base",
+    "gpt-4.5":          "o200k_base",
+    "gpt-5":            "o200k_base",
+    "o1":               "o200k_base",
+    "o3":               "o200k_base",
+    "o4-mini":          "o200k_base",
+    "text-embedding-3-small": "cl100k_base",
+    "text-embedding-3-large": "cl100k_base",
     "text-davinci-003": "p50k_base",
     # …agregar otros modelos si los usás…
 }
+_DEFAULT_ENCODING = "cl100k_base"
+
+
+def encoding_name_for_model(model_name: str) -> str:
+    name = model_name.lower()
+    while True:
+        if name in _MODEL_TO_ENCODING:
+            return _MODEL_TO_ENCODING[name]
+        if "-" not in name:
+            return _DEFAULT_ENCODING
+        name = name.rsplit("-", 1)[0]
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    """
+    Encoding residente en memoria: las tablas BPE se cargan una vez por proceso.
+    """
+    return tiktoken.get_encoding(encoding_name)
 
 
 def tokenize_texts(
@@ -39,37 +74,73 @@ def tokenize_texts(
     Retorna:
       Un dict con las tres claves indicadas.
     """
+    return tokenize_conversations([texts], model_name)[0]
 
-    # 1) Determinar encoding a partir del modelo
-    encoding_name = _MODEL_TO_ENCODING.get(model_name.lower(), "cl100k_base")
-    encoding = tiktoken.get_encoding(encoding_name)
-
-    # 2) Contar tokens de todos los textos
-    prompt_tokens = 0
-    for txt in texts:
-        snippet = txt or ""
-        token_ids = encoding.encode(snippet)
-        prompt_tokens += len(token_ids)
 
-    # 3) Asignar completionTokens y calcular totalTokens
-    completion_tokens = 0
-    total_tokens = prompt_tokens + completion_tokens
-
-    return {
-        "promptTokens": prompt_tokens,
-        "completionTokens": completion_tokens,
-        "totalTokens": total_tokens
-    }
+def tokenize_conversations(
+    texts_per_conversation: List[List[str]],
+    model_name: str
+) -> List[Dict[str, int]]:
+    """
+    Igual que tokenize_texts pero para varias conversaciones del mismo modelo
+    en una sola llamada: todos los textos se codifican juntos con
+    encode_batch de tiktoken, que reparte el trabajo en TOKENIZER_THREADS
+    hilos (el BPE nativo libera el GIL). Retorna un dict por conversación,
+    en el mismo orden.
+
+    Antes de codificar se consulta el memo de services/token_cache.py: sólo
+    se codifican los textos que no se vieron antes (una vez cada uno).
+    """
+    encoding_name = encoding_name_for_model(model_name)
+    flat: List[str] = [txt or "" for texts in texts_per_conversation for txt in texts]
+    token_counts = _count_with_cache(flat, encoding_name)
+
+    results: List[Dict[str, int]] = []
+    offset = 0
+    for texts in texts_per_conversation:
+        prompt_tokens = sum(token_counts[offset:offset + len(texts)])
+        offset += len(texts)
+        # completionTokens se deja en 0 hasta poder separarlos
+        completion_tokens = 0
+        results.append({
+            "promptTokens": prompt_tokens,
+            "completionTokens": completion_tokens,
+            "totalTokens": prompt_tokens + completion_tokens
+        })
+    return results
+
+
+def _count_with_cache(texts: List[str], encoding_name: str) -> List[int]:
+    cache = get_token_cache()
+    keys = [cache.key(encoding_name, txt) for txt in texts]
+    counts: List[Optional[int]] = [cache.get(k) for k in keys]
+
+    # Textos sin memo, sin repetir: cada uno se codifica una sola vez
+    pending: Dict[Tuple[str, bytes], str] = {}
+    for key, txt, count in zip(keys, texts, counts):
+        if count is None:
+            pending.setdefault(key, txt)
+
+    if pending:
+        encoding = get_encoding(encoding_name)
+        encoded = encoding.encode_batch(list(pending.values()), num_threads=settings.TOKENIZER_THREADS)
+        fresh = {key: len(ids) for key, ids in zip(pending, encoded)}
+        for key, count in fresh.items():
+            cache.put(key, count)
+        counts = [fresh[k] if c is None else c for k, c in zip(keys, counts)]
+
+    return counts
 
 
 def calculate_cost_with_tokonomics(
     model_name: str,
     prompt_tokens: int,
     completion_tokens: int
-) -> float:
+) -> Optional[float]:
     """
-    Usa la librería 'tokonomics' para calcular el costo en USD. Ejecuta
-    la coroutine internamente con asyncio.run para retornar de forma sincrónica.
+    Calcula el costo en USD con el catálogo de precios local
+    (services/pricing_catalog.py). Es aritmética pura sobre la tabla en
+    memoria; tokonomics sólo se usa en segundo plano para refrescarla.
 
     Recibe:
       - model_name: cadena exacta del modelo (p. ej. "gpt-4").
@@ -77,15 +148,8 @@ def calculate_cost_with_tokonomics(
       - completion_tokens: int, tokens de salida.
 
     Retorna:
-      - total_cost (float): costo USD redondeado a 6 decimales.
+      - total_cost (float): costo USD redondeado a 6 decimales, o None si
+        el modelo todavía no está en el catálogo (lo busca el refresco).
     """
-
-    async def _inner():
-        return await calculate_token_cost(
-            model=model_name,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens
-        )
-
-    costos = asyncio.run(_inner())
-    return round(costos.total_cost, 6)
+    cost = get_pricing_catalog().cost(model_name, prompt_tokens, completion_tokens)
+    return None if cost is None else round(cost, 6)
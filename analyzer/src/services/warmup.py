@@ -0,0 +1,100 @@
+# analyzer/services/warmup.py
+
+import importlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+# Dependencias pesadas; ninguna abre conexiones al importarse
+_HEAVY_IMPORTS = ("numpy", "yaml", "pymongo", "tiktoken", "langdetect", "tokonomics")
+
+_report: Dict[str, Any] = {}
+
+
+def warmup(encodings: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Importa las dependencias pesadas y carga los artefactos que si no se
+    cargarían en el primer request de cada worker: tablas BPE de tiktoken,
+    perfiles de langdetect, keywords.yaml compilado, evaluadores y catálogo
+    de precios.
+
+    gunicorn.conf.py la llama en el master antes del fork: los workers
+    (también los que se reciclan por --max-requests) heredan todo ya
+    cargado y comparten esas páginas copy-on-write. No crea clientes de
+    Mongo ni hilos, que no sobreviven al fork.
+
+    Un paso que falla (p. ej. sin red para bajar un encoding) se reporta y
+    se sigue; ese worker lo cargará en el primer uso como siempre.
+    """
+    encodings = encodings if encodings is not None else [e for e in settings.WARMUP_ENCODINGS.split(",") if e.strip()]
+    steps: List[Tuple[str, Callable[[], Any]]] = [
+        (f"import.{name}", lambda name=name: importlib.import_module(name)) for name in _HEAVY_IMPORTS
+    ]
+    steps += [(f"tiktoken.{name.strip()}", lambda name=name: _load_encoding(name.strip())) for name in encodings]
+    steps += [
+        # Módulos del análisis que los handlers importan en el primer request;
+        # db/mongo_client.py crea el cliente recién en el primer uso de cada proceso
+        ("import.init_analyzer", lambda: importlib.import_module("init_analyzer")),
+        ("langdetect.profiles", _load_language_profiles),
+        ("keywords", _load_keywords),
+        ("evaluators", _load_evaluators),
+        ("pricing", _load_pricing),
+    ]
+
+    started = time.perf_counter()
+    timings: Dict[str, Any] = {}
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            step()
+            timings[name] = round(time.perf_counter() - step_started, 4)
+        except Exception as e:
+            timings[name] = f"error: {type(e).__name__}: {e}"
+
+    _report.clear()
+    _report.update({
+        "pid": os.getpid(),
+        "finishedAt": time.time(),
+        "totalSeconds": round(time.perf_counter() - started, 4),
+        "steps": timings
+    })
+    failed = [name for name, value in timings.items() if isinstance(value, str)]
+    print(f"🔥 Warmup en {_report['totalSeconds']}s" + (f" (fallaron: {', '.join(failed)})" if failed else ""))
+    return dict(_report)
+
+
+def get_warmup_report() -> Dict[str, Any]:
+    """
+    Tiempos del último warmup; en un worker de gunicorn es el del master
+    (heredado en el fork). Vacío si no hubo warmup.
+    """
+    return dict(_report)
+
+
+def _load_encoding(name: str) -> None:
+    from services.token_utils import get_encoding
+    get_encoding(name)
+
+
+def _load_language_profiles() -> None:
+    from langdetect.detector_factory import init_factory
+    import services.language_detector  # noqa: F401 (fija la semilla de langdetect)
+    init_factory()
+
+
+def _load_keywords() -> None:
+    from behavior_analysis.keyword_registry import get_keyword_registry
+    get_keyword_registry().get()
+
+
+def _load_evaluators() -> None:
+    from behavior_analysis.evaluator_registry import get_evaluator_registry
+    get_evaluator_registry()
+
+
+def _load_pricing() -> None:
+    # Sólo el snapshot: el hilo de refresco arranca en cada worker en el primer uso
+    from services.pricing_catalog import get_pricing_catalog
+    get_pricing_catalog()
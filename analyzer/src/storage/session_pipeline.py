@@ -0,0 +1,303 @@
+# analyzer/storage/session_pipeline.py
+
+import asyncio
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from services.instrumentation import count_dropped, count_writes, timed
+from storage.sinks import SessionSink, build_sinks
+
+# Marca que despierta al hilo del writer para que termine
+_STOP = object()
+
+
+class BufferFullError(Exception):
+    """
+    El buffer de escritura está lleno y no se liberó lugar a tiempo.
+    """
+
+
+class SessionPipeline:
+    """
+    Escribe lotes de sesiones en todos los sinks configurados.
+    """
+    def __init__(self, sinks: List[SessionSink]):
+        self.sinks = sinks
+
+    def write_many(self, docs: List[Dict[str, Any]], only: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Escribe el lote en cada sink (o sólo en los de `only`) y devuelve los
+        errores por ítem: [{"index", "_id", "stage", "error"}], con stage =
+        nombre del sink. Un sink que falla entero reporta error en todos los ítems.
+        """
+        errors: List[Dict[str, Any]] = []
+        if not docs:
+            return errors
+        for sink in self.sinks:
+            if only is not None and sink.name not in only:
+                continue
+            try:
+                with timed(f"write.{sink.name}"):
+                    sink_errors = sink.write(docs)
+            except Exception as e:
+                sink_errors = _whole_batch_failed(docs, e)
+            errors.extend(_tag_errors(sink, docs, sink_errors))
+        return errors
+
+    async def write_many_async(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        write_many con todos los sinks escribiendo a la vez (api/asgi.py).
+        Mismo formato de errores, en el orden de los sinks.
+        """
+        if not docs:
+            return []
+        results = await asyncio.gather(*(self._write_sink_async(sink, docs) for sink in self.sinks))
+        return [error for sink_errors in results for error in sink_errors]
+
+    async def _write_sink_async(self, sink: SessionSink, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            with timed(f"write.{sink.name}"):
+                sink_errors = await sink.write_async(docs)
+        except Exception as e:
+            sink_errors = _whole_batch_failed(docs, e)
+        return _tag_errors(sink, docs, sink_errors)
+
+    def find_sessions(self, ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Sesiones ya guardadas, con un solo $in por _id en cada sink que
+        permite consultar (las colecciones de Mongo de SESSION_SINKS). Una
+        sesión sólo se devuelve si todos la tienen con el mismo fingerprint:
+        si un sink no llegó a guardarla, se vuelve a analizar y se escribe
+        de nuevo en todos.
+        """
+        return _stored_in_all([sink.find_many(ids) for sink in self.sinks])
+
+    async def find_sessions_async(self, ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        return _stored_in_all(await asyncio.gather(*(sink.find_many_async(ids) for sink in self.sinks)))
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def _stored_in_all(found: List[Optional[Dict[Any, Dict[str, Any]]]]) -> Dict[Any, Dict[str, Any]]:
+    # None = el sink no permite consultar
+    found = [f for f in found if f is not None]
+    if not found:
+        return {}
+    first, others = found[0], found[1:]
+    return {
+        _id: doc for _id, doc in first.items()
+        if all(_id in other and other[_id].get("fingerprint") == doc.get("fingerprint") for other in others)
+    }
+
+
+def _whole_batch_failed(docs: List[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+    # Un sink que falla entero reporta error en todos los ítems
+    return [{"index": i, "_id": d.get("_id"), "error": str(error)} for i, d in enumerate(docs)]
+
+
+def _tag_errors(sink: SessionSink, docs: List[Dict[str, Any]], sink_errors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    count_writes(sink.name, len(docs) - len(sink_errors), len(sink_errors))
+    return [{**error, "stage": sink.name} for error in sink_errors]
+
+
+class BufferedSessionWriter:
+    """
+    Escritura diferida (write-behind) delante de un SessionPipeline.
+
+    submit() sólo encola el documento; un hilo del proceso junta hasta
+    `max_docs` documentos o espera como mucho `max_delay` segundos y los
+    escribe como un lote. Si el buffer llega a `capacity`, submit() se
+    bloquea hasta `block_seconds` (backpressure) y después lanza
+    BufferFullError. Al terminar el proceso se vacía lo pendiente.
+
+    Los documentos que un sink no pudo escribir se reintentan sólo en ese
+    sink hasta `retries` veces; si igual fallan se descartan y se cuentan
+    en analyzer_session_writer_dropped_total (y en `failed`).
+    """
+    def __init__(self, pipeline: SessionPipeline, max_docs: Optional[int] = None, max_delay: Optional[float] = None,
+                 capacity: Optional[int] = None, block_seconds: Optional[float] = None,
+                 retries: Optional[int] = None, retry_delay: Optional[float] = None):
+        self.pipeline = pipeline
+        self.max_docs = settings.SESSION_BUFFER_MAX_DOCS if max_docs is None else max_docs
+        self.max_delay = settings.SESSION_BUFFER_MAX_DELAY if max_delay is None else max_delay
+        self.block_seconds = settings.SESSION_BUFFER_BLOCK_SECONDS if block_seconds is None else block_seconds
+        self.retries = settings.SESSION_BUFFER_RETRIES if retries is None else retries
+        self.retry_delay = settings.SESSION_BUFFER_RETRY_DELAY if retry_delay is None else retry_delay
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(
+            maxsize=settings.SESSION_BUFFER_CAPACITY if capacity is None else capacity
+        )
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        self._closed = False
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, doc: Dict[str, Any]) -> None:
+        self._ensure_flusher()
+        try:
+            self._queue.put(doc, timeout=self.block_seconds)
+        except queue.Full:
+            raise BufferFullError(f"Buffer de sesiones lleno ({self._queue.maxsize} pendientes)")
+
+    def flush(self) -> None:
+        """
+        Escribe ya todo lo pendiente en el hilo que llama.
+        """
+        while not self._queue.empty():
+            batch = self._drain(first_timeout=None)
+            if batch:
+                self._write(batch)
+
+    def close(self) -> None:
+        """
+        Espera al lote que el hilo tenga en curso y escribe lo que quede.
+        """
+        self._closed = True
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass
+            self._flusher.join()
+        self.flush()
+        self.pipeline.close()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_flusher(self) -> None:
+        # Los hilos no sobreviven al fork de gunicorn: uno por proceso
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name="session-writer", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            batch = self._drain(first_timeout=self.max_delay)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, first_timeout: Optional[float]) -> List[Dict[str, Any]]:
+        try:
+            if first_timeout is None:
+                first = self._queue.get_nowait()
+            else:
+                first = self._queue.get(timeout=first_timeout)
+        except queue.Empty:
+            return []
+
+        if first is _STOP:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + (self.max_delay if first_timeout is not None else 0)
+        while len(batch) < self.max_docs:
+            remaining = deadline - time.monotonic()
+            try:
+                doc = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if doc is _STOP:
+                break
+            batch.append(doc)
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # Sinks que le faltan a cada documento del lote
+        names = [sink.name for sink in self.pipeline.sinks]
+        missing: Dict[int, Set[str]] = {i: set(names) for i in range(len(batch))}
+        last_error: Dict[int, str] = {}
+        for attempt in range(max(0, self.retries) + 1):
+            if attempt:
+                time.sleep(self.retry_delay * attempt)
+            for name in names:
+                indexes = [i for i, sinks in missing.items() if name in sinks]
+                if not indexes:
+                    continue
+                failed = {}
+                for error in self.pipeline.write_many([batch[i] for i in indexes], only={name}):
+                    failed[indexes[error["index"]]] = error["error"]
+                last_error.update(failed)
+                for i in indexes:
+                    if i not in failed:
+                        missing[i].discard(name)
+            missing = {i: sinks for i, sinks in missing.items() if sinks}
+            if not missing:
+                break
+
+        self.written += len(batch) - len(missing)
+        self.failed += len(missing)
+        for name in names:
+            count_dropped(name, sum(1 for sinks in missing.values() if name in sinks))
+        for i, sinks in missing.items():
+            print(f"❌ Sesión {batch[i].get('_id')} descartada sin guardar en {', '.join(sorted(sinks))}: {last_error.get(i)}")
+        if len(batch) > len(missing):
+            print(f"✅ {len(batch) - len(missing)} sesiones guardadas")
+
+
+_pipeline: Optional[SessionPipeline] = None
+_writer: Optional[BufferedSessionWriter] = None
+_init_lock = threading.Lock()
+
+
+def get_session_pipeline() -> SessionPipeline:
+    """
+    Pipeline de sinks del proceso, según SESSION_SINKS / SESSION_DEBUG_FILE /
+    SESSION_NDJSON_LOG.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _init_lock:
+            if _pipeline is None:
+                _pipeline = SessionPipeline(build_sinks(
+                    settings.SESSION_SINKS, settings.SESSION_DEBUG_FILE, settings.SESSION_NDJSON_LOG
+                ))
+    return _pipeline
+
+
+def get_session_writer() -> BufferedSessionWriter:
+    """
+    Writer diferido del proceso; se vacía solo al salir (atexit).
+    """
+    global _writer
+    if _writer is None:
+        pipeline = get_session_pipeline()
+        with _init_lock:
+            if _writer is None:
+                _writer = BufferedSessionWriter(pipeline)
+                atexit.register(_writer.close)
+    return _writer
+
+
+def persist_session(session_doc: Dict[str, Any]) -> None:
+    """
+    Guarda una sesión suelta: la encola en el writer diferido o, con
+    SESSION_WRITE_BEHIND apagado, la escribe ya y lanza el primer error.
+    """
+    if settings.SESSION_WRITE_BEHIND:
+        get_session_writer().submit(session_doc)
+        return
+    errors = get_session_pipeline().write_many([session_doc])
+    if errors:
+        raise RuntimeError(f"No se pudo guardar en '{errors[0]['stage']}': {errors[0]['error']}")
+
+
+def close_session_writer() -> None:
+    """
+    Vacía el writer diferido si este proceso llegó a crearlo
+    (hook worker_exit de gunicorn).
+    """
+    if _writer is not None:
+        _writer.close()
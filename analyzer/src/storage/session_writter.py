@@ -1,8 +1,8 @@
-from db.mongo_client import db
+from db.mongo_client import get_db
 
 def save_session(session_data: dict):
     """
-    Inserta una sesión en la colección 'sessions'
+    Guarda (upsert por _id) una sesión en la colección 'sessions'
     """
-    result = db["sessions"].insert_one(session_data)
-    print(f"✅ Sesión guardada con _id: {result.inserted_id}")
+    get_db()["sessions"].replace_one({"_id": session_data["_id"]}, session_data, upsert=True)
+    print(f"✅ Sesión guardada con _id: {session_data['_id']}")
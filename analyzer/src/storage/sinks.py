@@ -0,0 +1,132 @@
+# analyzer/storage/sinks.py
+
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from db.bulk_utils import upsert_many_unordered, upsert_many_unordered_async
+
+# Cada sink devuelve sus errores por índice del lote: {"index", "_id", "error"}
+SinkErrors = List[Dict[str, Any]]
+
+
+class SessionSink:
+    """
+    Destino de los documentos de sesión. `name` es el stage con el que se
+    reportan los errores (p. ej. la colección de Mongo).
+    """
+    name = "sink"
+
+    def write(self, docs: List[Dict[str, Any]]) -> SinkErrors:
+        raise NotImplementedError
+
+    def find_many(self, ids: List[Any]) -> Optional[Dict[Any, Dict[str, Any]]]:
+        """
+        Sesiones ya guardadas por _id; None si el sink no permite consultar.
+        """
+        return None
+
+    async def write_async(self, docs: List[Dict[str, Any]]) -> SinkErrors:
+        """
+        write() sin bloquear el event loop (api/asgi.py); por defecto corre en un hilo.
+        """
+        return await asyncio.to_thread(self.write, docs)
+
+    async def find_many_async(self, ids: List[Any]) -> Optional[Dict[Any, Dict[str, Any]]]:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class MongoCollectionSink(SessionSink):
+    """
+    Guarda el lote en una colección con un único bulk_write de upserts por
+    _id (idempotente ante reenvíos).
+    """
+    def __init__(self, collection_name: str):
+        self.name = collection_name
+
+    def write(self, docs: List[Dict[str, Any]]) -> SinkErrors:
+        from db.mongo_client import get_db
+        _, errors = upsert_many_unordered(get_db()[self.name], docs)
+        return errors
+
+    def find_many(self, ids: List[Any]) -> Optional[Dict[Any, Dict[str, Any]]]:
+        from db.mongo_client import get_db
+        if not ids:
+            return {}
+        return {doc["_id"]: doc for doc in get_db()[self.name].find({"_id": {"$in": list(ids)}})}
+
+    async def write_async(self, docs: List[Dict[str, Any]]) -> SinkErrors:
+        from db.mongo_client import get_async_db
+        _, errors = await upsert_many_unordered_async(get_async_db()[self.name], docs)
+        return errors
+
+    async def find_many_async(self, ids: List[Any]) -> Optional[Dict[Any, Dict[str, Any]]]:
+        from db.mongo_client import get_async_db
+        if not ids:
+            return {}
+        return {doc["_id"]: doc async for doc in get_async_db()[self.name].find({"_id": {"$in": list(ids)}})}
+
+
+class DebugFileSink(SessionSink):
+    """
+    Vuelca la última sesión del lote en un JSON legible (debug local).
+    """
+    name = "debug_file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, docs: List[Dict[str, Any]]) -> SinkErrors:
+        if docs:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(docs[-1], f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, self.path)
+        return []
+
+
+class NdjsonLogSink(SessionSink):
+    """
+    Agrega cada sesión como una línea JSON al final de un archivo.
+    Cada lote se escribe con un solo write en modo append, así que varios
+    workers pueden compartir el archivo sin mezclar líneas.
+    """
+    name = "ndjson_log"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, docs: List[Dict[str, Any]]) -> SinkErrors:
+        if docs:
+            data = "".join(json.dumps(d, ensure_ascii=False, default=str) + "\n" for d in docs)
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+        return []
+
+
+def build_sinks(spec: str, debug_file: str = "", ndjson_log: str = "") -> List[SessionSink]:
+    """
+    Arma los sinks a partir de la configuración:
+      - spec: lista separada por comas, p. ej. "mongo:sessions,mongo:metrics".
+      - debug_file / ndjson_log: rutas opcionales; vacías = desactivado.
+    """
+    sinks: List[SessionSink] = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        kind, _, target = entry.partition(":")
+        if kind == "mongo" and target:
+            sinks.append(MongoCollectionSink(target))
+        else:
+            raise ValueError(f"Sink desconocido en SESSION_SINKS: '{entry}'")
+    if debug_file:
+        sinks.append(DebugFileSink(debug_file))
+    if ndjson_log:
+        sinks.append(NdjsonLogSink(ndjson_log))
+    return sinks
@@ -0,0 +1,67 @@
+# analyzer/tests/test_agent_cache.py
+
+import time
+from db.agent_cache import AgentCache
+
+
+class FakeAgentRepo:
+    def __init__(self, agents):
+        self.agents = agents
+        self.single_calls = 0
+        self.batch_calls = 0
+
+    def __call__(self):
+        return self
+
+    def get_agent_by_user_id(self, user_id):
+        self.single_calls += 1
+        return self.agents.get(user_id)
+
+    def get_agents_by_user_ids(self, user_ids):
+        self.batch_calls += 1
+        return {u: self.agents[u] for u in user_ids if u in self.agents}
+
+
+AGENTS = {f"usr-{i}": {"_id": f"agt-{i}", "userId": f"usr-{i}", "modelName": "gpt-4"} for i in range(5)}
+
+
+def test_get_caches_and_counts_hits():
+    repo = FakeAgentRepo(AGENTS)
+    cache = AgentCache(max_size=10, ttl_seconds=60, repo_factory=repo)
+
+    assert cache.get("usr-1")["_id"] == "agt-1"
+    assert cache.get("usr-1")["_id"] == "agt-1"
+    assert repo.single_calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Un userId sin agente no se cachea
+    assert cache.get("usr-x") is None
+    assert cache.get("usr-x") is None
+    assert repo.single_calls == 3
+
+
+def test_prefetch_uses_single_query_for_missing_ids():
+    repo = FakeAgentRepo(AGENTS)
+    cache = AgentCache(max_size=10, ttl_seconds=60, repo_factory=repo)
+    cache.get("usr-0")
+
+    agents = cache.prefetch(["usr-0", "usr-1", "usr-2", "usr-1", "usr-x", None])
+    assert set(agents) == {"usr-0", "usr-1", "usr-2"}
+    assert repo.batch_calls == 1
+
+    cache.prefetch(["usr-1", "usr-2"])
+    assert repo.batch_calls == 1
+
+
+def test_ttl_expiry_and_lru_eviction():
+    repo = FakeAgentRepo(AGENTS)
+    cache = AgentCache(max_size=2, ttl_seconds=0.05, repo_factory=repo)
+    cache.prefetch(["usr-0", "usr-1"])
+    cache.get("usr-0")          # usr-1 queda como el menos usado
+    cache.prefetch(["usr-2"])
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+    time.sleep(0.06)
+    cache.get("usr-0")
+    assert repo.single_calls == 1
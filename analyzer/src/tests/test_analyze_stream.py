@@ -0,0 +1,78 @@
+# analyzer/tests/test_analyze_stream.py
+
+import json
+
+import pytest
+
+import init_analyzer
+
+
+def _line(conversation_id):
+    return json.dumps({"conversation": {"_id": conversation_id}, "messages": []})
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    # analyze_batch falso: guarda cada ventana, falla en los ítems "bad" y
+    # en toda la ventana si algún ítem es "boom"
+    calls = []
+
+    def fake_analyze_batch(items):
+        calls.append([item["conversation"]["_id"] for item in items])
+        if any(item["conversation"]["_id"] == "boom" for item in items):
+            raise RuntimeError("mongo caído")
+        errors = [{"index": i, "conversationId": item["conversation"]["_id"], "stage": "analysis", "error": "bad"}
+                  for i, item in enumerate(items) if item["conversation"]["_id"] == "bad"]
+        sessions = [{"conversationId": item["conversation"]["_id"], "successful": True, "tags": []}
+                    for item in items if item["conversation"]["_id"] != "bad"]
+        return {"sessions": sessions, "errors": errors}
+
+    monkeypatch.setattr(init_analyzer, "analyze_batch", fake_analyze_batch)
+    return calls
+
+
+def test_lines_are_grouped_in_windows(batches):
+    results = list(init_analyzer.analyze_stream([_line(f"c{i}") for i in range(5)], window_size=2))
+
+    assert batches == [["c0", "c1"], ["c2", "c3"], ["c4"]]
+    assert [(r["index"], r["conversationId"], r["status"]) for r in results] == [
+        (i, f"c{i}", "ok") for i in range(5)
+    ]
+
+
+def test_invalid_json_and_blank_lines(batches):
+    lines = [_line("c0"), "", "{no es json", b"  \n", _line("c1"), _line("bad"), _line("c2")]
+    results = list(init_analyzer.analyze_stream(lines, window_size=3))
+
+    # Las líneas en blanco no cuentan; la inválida ocupa su índice y su lugar en la ventana
+    assert batches == [["c0", "c1"], ["bad", "c2"]]
+    assert [(r["index"], r["status"], r.get("stage")) for r in results] == [
+        (0, "ok", None), (1, "error", "validation"), (2, "ok", None), (3, "error", "analysis"), (4, "ok", None)
+    ]
+    assert results[1]["error"].startswith("Invalid JSON")
+    assert results[3]["conversationId"] == "bad"
+
+
+def test_failed_window_reports_each_item_and_stream_continues(batches):
+    lines = [_line("c0"), _line("c1"), _line("boom"), "{", _line("c4")]
+    results = list(init_analyzer.analyze_stream(lines, window_size=2))
+
+    assert [(r["index"], r["conversationId"], r["status"], r.get("stage")) for r in results] == [
+        (0, "c0", "ok", None), (1, "c1", "ok", None),
+        (2, "boom", "error", "analysis"), (3, None, "error", "validation"),
+        (4, "c4", "ok", None)
+    ]
+    assert results[2]["error"] == "mongo caído"
+
+
+def test_stream_endpoint_returns_one_ndjson_line_per_conversation(batches, monkeypatch):
+    from api.app import app
+    monkeypatch.setattr(init_analyzer.settings, "STREAM_WINDOW_SIZE", 2)
+
+    body = "\n".join([_line("c0"), _line("boom"), _line("c2")]) + "\n"
+    response = app.test_client().post("/analyze/stream", data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(r["index"], r["status"]) for r in results] == [(0, "error"), (1, "error"), (2, "ok")]
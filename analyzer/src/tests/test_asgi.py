@@ -0,0 +1,125 @@
+# analyzer/tests/test_asgi.py
+
+import asyncio
+import json
+
+import pytest
+
+from api import asgi
+from config import settings
+from db import agent_cache
+from services import conversation_handler
+from storage import session_pipeline
+from storage.sinks import SessionSink
+
+AGENT = {"_id": "a1", "userId": "u1", "modelName": "gpt-4o", "name": "Bot"}
+
+
+class FakeAsyncAgentRepo:
+    def __init__(self, on_lookup=None):
+        self.on_lookup = on_lookup
+
+    async def get_agent_by_user_id(self, user_id):
+        if self.on_lookup:
+            await self.on_lookup()
+        return AGENT if user_id == "u1" else None
+
+    async def get_agents_by_user_ids(self, user_ids):
+        return {u: AGENT for u in user_ids if u == "u1"}
+
+
+class FakeSink(SessionSink):
+    name = "fake"
+
+    def __init__(self, on_find=None):
+        self.docs = []
+        self.on_find = on_find
+
+    def write(self, docs):
+        self.docs.extend(docs)
+        return []
+
+    async def find_many_async(self, ids):
+        if self.on_find:
+            await self.on_find()
+        return {}
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    def install(repo=None, sink=None):
+        sink = sink or FakeSink()
+        cache = agent_cache.AgentCache(async_repo_factory=lambda: repo or FakeAsyncAgentRepo())
+        monkeypatch.setattr(agent_cache, "_agent_cache", cache)
+        monkeypatch.setattr(session_pipeline, "_pipeline", session_pipeline.SessionPipeline([sink]))
+        return sink
+
+    monkeypatch.setattr(settings, "ANALYZER_WORKERS", 1)
+    monkeypatch.setattr(settings, "SESSION_DEDUP", True)
+    # El análisis real necesita los encodings de tiktoken; acá alcanza con el documento
+    monkeypatch.setattr(conversation_handler, "build_session_doc",
+                        lambda raw, agent=None, **kwargs: {"_id": raw["conversation"]["_id"], "agentId": agent["_id"]})
+    monkeypatch.setattr("init_analyzer.analyze_items",
+                        lambda items: [("ok", {"_id": raw["conversation"]["_id"]}) for raw, _ in items])
+    return install
+
+
+def _call(method, path, body=None):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode() if body is not None else b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app({"type": "http", "method": method, "path": path, "headers": []}, receive, send))
+    return sent[0]["status"], sent[1]["body"]
+
+
+def _conversation(conversation_id, user_id="u1"):
+    return {"conversation": {"_id": conversation_id, "userId": user_id}, "messages": []}
+
+
+def test_ping_and_unknown_route():
+    assert _call("GET", "/") == (200, b'{"status": "OK"}')
+    assert _call("GET", "/nope")[0] == 404
+    assert _call("GET", "/analyze")[0] == 405
+
+
+def test_analyze_single_writes_session_with_fingerprint(fake_backend):
+    sink = fake_backend()
+
+    status, _ = _call("POST", "/analyze", _conversation("c1"))
+
+    assert status == 200
+    assert sink.docs[0]["_id"] == "c1" and sink.docs[0]["agentId"] == "a1"
+    assert len(sink.docs[0]["fingerprint"]) == 64
+
+
+def test_analyze_batch_reports_per_item_errors(fake_backend):
+    sink = fake_backend()
+
+    status, body = _call("POST", "/analyze", [_conversation("c1"), {"conversation": {}}, _conversation("c3", "nobody")])
+
+    report = json.loads(body)
+    assert status == 207
+    assert report["saved"] == 1 and [e["stage"] for e in report["errors"]] == ["validation", "analysis"]
+    assert [d["_id"] for d in sink.docs] == ["c1"]
+
+
+def test_agent_and_stored_session_lookups_run_concurrently(fake_backend):
+    # Cada búsqueda espera a que arranque la otra: en serie no terminaría nunca
+    started = {}
+
+    def rendezvous(mine, other):
+        async def wait():
+            started.setdefault(mine, asyncio.Event()).set()
+            await asyncio.wait_for(started.setdefault(other, asyncio.Event()).wait(), timeout=2)
+        return wait
+
+    sink = fake_backend(repo=FakeAsyncAgentRepo(on_lookup=rendezvous("agent", "stored")),
+                        sink=FakeSink(on_find=rendezvous("stored", "agent")))
+
+    assert _call("POST", "/analyze", _conversation("c1"))[0] == 200
+    assert len(sink.docs) == 1
@@ -0,0 +1,78 @@
+# analyzer/tests/test_backfill.py
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import init_analyzer
+from db.conversations_repo import _to_payload
+from scripts.backfill import Checkpoint, run_backfill
+
+
+class FakeConversationRepo:
+    def __init__(self, ids, fail_after=None):
+        self.conversations = [{"_id": i, "userId": "u1"} for i in ids]
+        self.fail_after = fail_after
+        self.served = 0
+
+    def iter_conversation_batches(self, after_id, batch_size, status="closed"):
+        pending = [c for c in self.conversations if after_id is None or c["_id"] > after_id]
+        for start in range(0, len(pending), batch_size):
+            if self.fail_after is not None and self.served >= self.fail_after:
+                raise ConnectionError("cursor perdido")
+            self.served += 1
+            yield pending[start:start + batch_size]
+
+    def get_messages_by_conversation(self, ids):
+        return {i: [{"direction": "user", "text": i}] for i in ids}
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    calls = []
+
+    def fake_batch(items, reuse=None):
+        calls.append(([item["conversation"]["_id"] for item in items], reuse))
+        return {"sessions": [{"_id": item["conversation"]["_id"]} for item in items], "errors": []}
+
+    monkeypatch.setattr(init_analyzer, "analyze_batch", fake_batch)
+    return calls
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path, analyzed):
+    path = str(tmp_path / "checkpoint.json")
+    ids = [f"c{i:02d}" for i in range(7)]
+
+    with pytest.raises(ConnectionError):
+        run_backfill(FakeConversationRepo(ids, fail_after=2), Checkpoint(path).load(), batch_size=3)
+    assert json.load(open(path))["lastId"] == "c05"
+
+    totals = run_backfill(FakeConversationRepo(ids), Checkpoint(path).load(), batch_size=3)
+
+    assert [batch for batch, _ in analyzed] == [["c00", "c01", "c02"], ["c03", "c04", "c05"], ["c06"]]
+    assert totals["processed"] == 7 and totals["sessions"] == 7 and totals["lastId"] == "c06"
+
+
+def test_backfill_limit_and_force(tmp_path, analyzed):
+    totals = run_backfill(FakeConversationRepo(["a", "b", "c"]), Checkpoint(str(tmp_path / "cp.json")),
+                          batch_size=2, limit=1, force=True)
+
+    assert analyzed == [(["a"], False)]
+    assert totals["processed"] == 1
+
+
+def test_backfill_rejects_checkpoint_of_other_status(tmp_path, analyzed):
+    checkpoint = Checkpoint(str(tmp_path / "cp.json"))
+    run_backfill(FakeConversationRepo(["a"]), checkpoint, batch_size=2)
+
+    with pytest.raises(ValueError):
+        run_backfill(FakeConversationRepo(["a"]), Checkpoint(checkpoint.path).load(), batch_size=2, status=None)
+
+
+def test_stored_dates_match_backend_payload():
+    doc = _to_payload({"_id": "c1", "createdAt": datetime(2024, 5, 1, 12, 0, 3, 456789)})
+    aware = _to_payload({"createdAt": datetime(2024, 5, 1, 9, 0, 3, 456000, tzinfo=timezone.utc).astimezone()})
+
+    assert doc == {"_id": "c1", "createdAt": "2024-05-01T12:00:03.456Z"}
+    assert aware["createdAt"] == "2024-05-01T09:00:03.456Z"
@@ -0,0 +1,134 @@
+# analyzer/tests/test_batch_executor.py
+
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services import batch_executor
+
+
+class FakeExecutor:
+    """
+    Pool falso: corre cada chunk en el proceso (en orden inverso, como
+    procesos que terminan desordenados) y map devuelve en el orden pedido.
+    Con `break_after` levanta BrokenProcessPool después de ese chunk.
+    """
+    def __init__(self, break_after=None):
+        self.break_after = break_after
+        self.chunks = []
+        self.shutdown_called = False
+
+    def map(self, func, chunks):
+        chunks = list(chunks)
+        self.chunks.extend(chunks)
+        results = [func(chunk) for chunk in reversed(chunks)][::-1]
+        for done, result in enumerate(results):
+            if self.break_after is not None and done >= self.break_after:
+                raise BrokenProcessPool("worker murió")
+            yield result
+
+    def shutdown(self, wait=True):
+        self.shutdown_called = True
+
+
+@pytest.fixture
+def chunk_calls(monkeypatch):
+    calls = []
+
+    def fake_analyze_chunk(items):
+        calls.append([raw["id"] for raw, _ in items])
+        return [("ok", raw["id"]) for raw, _ in items]
+
+    monkeypatch.setattr(batch_executor, "_analyze_chunk", fake_analyze_chunk)
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_CHUNK_SIZE", 2)
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_PARALLEL_MIN_BATCH", 1)
+    return calls
+
+
+def _items(n):
+    return [({"id": i}, {"modelName": "gpt-4o"}) for i in range(n)]
+
+
+def _use_executor(monkeypatch, executor):
+    monkeypatch.setattr(batch_executor, "_executor", executor)
+    monkeypatch.setattr(batch_executor, "_executor_pid", batch_executor.os.getpid())
+    monkeypatch.setattr(batch_executor, "_get_executor", lambda: executor)
+
+
+def test_single_worker_runs_serially_without_pool(monkeypatch, chunk_calls):
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_WORKERS", 1)
+    monkeypatch.setattr(batch_executor, "_get_executor", lambda: pytest.fail("no debería usar el pool"))
+
+    assert batch_executor.analyze_items(_items(5)) == [("ok", i) for i in range(5)]
+    assert chunk_calls == [[0, 1, 2, 3, 4]]
+
+
+def test_small_batch_runs_serially(monkeypatch, chunk_calls):
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_WORKERS", 4)
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_PARALLEL_MIN_BATCH", 10)
+    monkeypatch.setattr(batch_executor, "_get_executor", lambda: pytest.fail("no debería usar el pool"))
+
+    assert batch_executor.analyze_items(_items(3)) == [("ok", i) for i in range(3)]
+
+
+def test_chunks_fan_out_and_results_keep_item_order(monkeypatch, chunk_calls):
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_WORKERS", 4)
+    executor = FakeExecutor()
+    _use_executor(monkeypatch, executor)
+
+    assert batch_executor.analyze_items(_items(5)) == [("ok", i) for i in range(5)]
+    assert [[raw["id"] for raw, _ in chunk] for chunk in executor.chunks] == [[0, 1], [2, 3], [4]]
+    assert chunk_calls == [[4], [2, 3], [0, 1]]
+
+
+def test_broken_pool_falls_back_to_serial(monkeypatch, chunk_calls):
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_WORKERS", 4)
+    executor = FakeExecutor(break_after=1)
+    _use_executor(monkeypatch, executor)
+
+    assert batch_executor.analyze_items(_items(5)) == [("ok", i) for i in range(5)]
+    # El pool roto se descarta y el lote entero se reprocesa en serie
+    assert executor.shutdown_called and batch_executor._executor is None
+    assert chunk_calls[-1] == [0, 1, 2, 3, 4]
+
+
+def test_real_pool_keeps_order_across_processes(monkeypatch):
+    # Sin modelLLM cada conversación falla enseguida con su userId en el mensaje
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_WORKERS", 2)
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_CHUNK_SIZE", 2)
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_PARALLEL_MIN_BATCH", 1)
+    monkeypatch.setattr(batch_executor.settings, "ANALYZER_MP_START_METHOD", "forkserver")
+    items = [({"conversation": {"_id": f"c{i}", "userId": f"u{i}"}, "messages": []}, {"_id": "a"}) for i in range(5)]
+    try:
+        results = batch_executor.analyze_items(items)
+        assert batch_executor._executor._mp_context.get_start_method() == "forkserver"
+    finally:
+        batch_executor.shutdown_executor()
+
+    assert [status for status, _ in results] == ["error"] * 5
+    assert [message.rsplit("=", 1)[1] for _, message in results] == [f"u{i}" for i in range(5)]
+
+
+def test_pool_is_recreated_after_fork(monkeypatch):
+    created = []
+
+    class FakePool:
+        def __init__(self, max_workers, mp_context):
+            created.append(self)
+
+        def shutdown(self, wait=True):
+            pytest.fail("no se cierra el pool de otro proceso")
+
+    monkeypatch.setattr(batch_executor, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(batch_executor, "_executor", None)
+    monkeypatch.setattr(batch_executor.os, "getpid", lambda: 100)
+    parent = batch_executor._get_executor()
+    assert batch_executor._get_executor() is parent
+
+    monkeypatch.setattr(batch_executor.os, "getpid", lambda: 200)  # el hijo después del fork
+    child = batch_executor._get_executor()
+    assert child is not parent and len(created) == 2
+
+    monkeypatch.setattr(batch_executor, "_executor_pid", 100)
+    batch_executor.shutdown_executor()
+    assert batch_executor._executor is None
@@ -0,0 +1,56 @@
+# analyzer/tests/test_batch_metrics.py
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from services.batch_metrics import compute_batch_metrics
+from services.latency_calculator import LatencyCalculator
+from utils.conversation_frame import ConversationFrame
+
+
+def _random_messages(rng):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randint(0, 10**6))
+    messages = []
+    for i in range(rng.randint(0, 15)):
+        message = {"direction": rng.choice(["user", "user", "agent", "agent", "system"]), "text": "hola"}
+        if rng.random() > 0.05:
+            # Saltos de 0 segundos para cubrir timestamps repetidos
+            offset = timedelta(seconds=i * rng.choice([0, 1, 30]), microseconds=rng.randint(0, 999999))
+            message["timestamp"] = (start + offset).isoformat()
+        messages.append(message)
+    return messages
+
+
+def test_matches_per_conversation_path():
+    rng = random.Random(7)
+    frames = [ConversationFrame.from_messages(_random_messages(rng)) for _ in range(500)]
+
+    expected = [
+        {
+            "durationSeconds": f.duration_seconds(),
+            "messageCount": {"user": f.user_count, "agent": f.agent_count, "total": len(f)},
+            "latency": LatencyCalculator(f).calculate_average_latency()
+        }
+        for f in frames
+    ]
+    assert compute_batch_metrics(frames) == expected
+
+
+def test_latency_pairs_first_user_after_previous_agent():
+    frame = ConversationFrame.from_messages([
+        {"direction": "user", "text": "a", "timestamp": "2024-01-01T10:00:00"},
+        {"direction": "user", "text": "b", "timestamp": "2024-01-01T10:00:02"},
+        {"direction": "agent", "text": "c", "timestamp": "2024-01-01T10:00:10"},
+        {"direction": "agent", "text": "d", "timestamp": "2024-01-01T10:00:11"},
+        {"direction": "user", "text": "e", "timestamp": "2024-01-01T10:00:20"},
+    ])
+    empty = ConversationFrame.from_messages([])
+
+    result = compute_batch_metrics([frame, empty])
+    assert result[0]["latency"] == {"averageSeconds": 10.0, "interactionsCount": 1}
+    assert result[0]["durationSeconds"] == 20
+    assert result[1] == {
+        "durationSeconds": 0,
+        "messageCount": {"user": 0, "agent": 0, "total": 0},
+        "latency": {"averageSeconds": None, "interactionsCount": 0}
+    }
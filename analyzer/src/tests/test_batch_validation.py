@@ -0,0 +1,56 @@
+# analyzer/tests/test_batch_validation.py
+
+import pytest
+
+import init_analyzer
+from storage.session_pipeline import SessionPipeline
+from storage.sinks import SessionSink
+
+AGENT = {"_id": "a1", "modelName": "gpt-4o", "name": "Bot", "userId": "u1"}
+
+
+class MemorySink(SessionSink):
+    name = "sessions"
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, docs):
+        self.written.extend(docs)
+        return []
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    # Sin Mongo: agente fijo, análisis trivial y un sink en memoria
+    sink = MemorySink()
+    monkeypatch.setattr(init_analyzer.settings, "SESSION_DEDUP", True)
+    monkeypatch.setattr("storage.session_pipeline.get_session_pipeline", lambda: SessionPipeline([sink]))
+    monkeypatch.setattr(init_analyzer, "get_session_pipeline", lambda: SessionPipeline([sink]))
+    monkeypatch.setattr(init_analyzer, "get_agents_for_conversations",
+                        lambda convs: {"u1": AGENT} if any(c.get("userId") == "u1" for c in convs) else {})
+    monkeypatch.setattr(init_analyzer, "analyze_items",
+                        lambda items: [("ok", {"_id": raw["conversation"]["_id"]}) for raw, _ in items])
+    return sink
+
+
+def _item(conversation_id):
+    return {"conversation": {"_id": conversation_id, "userId": "u1"}, "messages": []}
+
+
+def test_non_object_conversation_is_a_per_item_error(batch):
+    report = init_analyzer.analyze_batch([_item("c1"), {"conversation": "x", "messages": []}])
+
+    assert [s["_id"] for s in report["sessions"]] == ["c1"]
+    assert [(e["index"], e["stage"]) for e in report["errors"]] == [(1, "validation")]
+
+
+@pytest.mark.parametrize("bad_item", [
+    {"conversation": {"userId": "u1"}, "messages": []},
+    {"conversation": {"_id": "c2", "userId": "u1"}, "messages": "hola"}
+])
+def test_items_that_cannot_be_fingerprinted_are_per_item_errors(batch, bad_item):
+    report = init_analyzer.analyze_batch([bad_item, _item("c1")])
+
+    assert [s["_id"] for s in report["sessions"]] == ["c1"]
+    assert [(e["index"], e["stage"]) for e in report["errors"]] == [(0, "validation")]
@@ -0,0 +1,29 @@
+# analyzer/tests/test_benchmarks.py
+
+import json
+
+from benchmarks import run_benchmarks
+
+
+def _failing_stage(workload):
+    raise RuntimeError("sin red")
+
+
+def test_stage_error_fails_the_run(monkeypatch, tmp_path):
+    monkeypatch.setitem(run_benchmarks.STAGES, "broken", _failing_stage)
+    baselines = tmp_path / "baselines.json"
+    argv = ["--stage", "conversation_frame", "--stage", "broken", "--conversations", "5", "--repeats", "1",
+            "--baselines", str(baselines)]
+
+    assert run_benchmarks.main(argv + ["--update-baselines"]) == 1
+    # Lo que sí se midió queda guardado
+    assert list(json.loads(baselines.read_text(encoding="utf-8"))["stages"]) == ["conversation_frame"]
+    assert run_benchmarks.main(argv) == 1
+
+
+def test_tokenize_stage_runs_offline(tmp_path):
+    baselines = tmp_path / "baselines.json"
+    argv = ["--stage", "tokenize_texts", "--conversations", "5", "--repeats", "1", "--baselines", str(baselines)]
+
+    assert run_benchmarks.main(argv + ["--update-baselines"]) == 0
+    assert "tokenize_texts" in json.loads(baselines.read_text(encoding="utf-8"))["stages"]
@@ -0,0 +1,86 @@
+# analyzer/tests/test_bulk_utils.py
+
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+import init_analyzer
+from db import bulk_utils
+from storage.session_pipeline import SessionPipeline
+from storage.sinks import MongoCollectionSink
+
+AGENT = {"_id": "a1", "modelName": "gpt-4o", "name": "Bot", "userId": "u1"}
+
+
+class FakeCollection:
+    """
+    Colección falsa: falla los _id de `duplicated` como un bulk_write
+    unordered real (writeErrors con el índice dentro del lote).
+    """
+    def __init__(self, duplicated=()):
+        self.duplicated = set(duplicated)
+        self.requests = []
+
+    def bulk_write(self, requests, ordered=True):
+        assert ordered is False
+        self.requests.append(requests)
+        write_errors = [
+            {"index": i, "code": 11000, "errmsg": f"E11000 duplicate key: {r._filter['_id']}"}
+            for i, r in enumerate(requests) if r._filter["_id"] in self.duplicated
+        ]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": 0,
+                                  "nUpserted": len(requests) - len(write_errors)})
+
+
+class FakeAsyncCollection(FakeCollection):
+    async def bulk_write(self, requests, ordered=True):
+        return FakeCollection.bulk_write(self, requests, ordered)
+
+
+def _docs(*ids):
+    return [{"_id": _id, "value": _id} for _id in ids]
+
+
+def test_all_saved_without_write_errors():
+    collection = FakeCollection()
+    saved, errors = bulk_utils.upsert_many_unordered(collection, _docs("a", "b"))
+
+    assert saved == ["a", "b"] and errors == []
+    assert [r._upsert for r in collection.requests[0]] == [True, True]
+
+
+def test_write_errors_are_mapped_back_to_their_docs():
+    saved, errors = bulk_utils.upsert_many_unordered(FakeCollection({"b", "d"}), _docs("a", "b", "c", "d"))
+
+    assert saved == ["a", "c"]
+    assert [(e["index"], e["_id"], e["code"]) for e in errors] == [(1, "b", 11000), (3, "d", 11000)]
+    assert "duplicate key" in errors[0]["error"]
+
+
+def test_async_write_errors_are_mapped_back_to_their_docs():
+    saved, errors = asyncio.run(bulk_utils.upsert_many_unordered_async(FakeAsyncCollection({"a"}), _docs("a", "b")))
+
+    assert saved == ["b"]
+    assert [(e["index"], e["_id"]) for e in errors] == [(0, "a")]
+
+
+def test_batch_with_write_errors_responds_207(monkeypatch):
+    from api.app import app
+
+    collection = FakeCollection({"c1"})
+    pipeline = SessionPipeline([MongoCollectionSink("sessions")])
+    monkeypatch.setattr("db.mongo_client.get_db", lambda: {"sessions": collection})
+    monkeypatch.setattr(init_analyzer, "get_session_pipeline", lambda: pipeline)
+    monkeypatch.setattr(init_analyzer, "find_unchanged_sessions", lambda items, version, reuse: ([None] * len(items), {}))
+    monkeypatch.setattr(init_analyzer, "get_agents_for_conversations", lambda convs: {"u1": AGENT})
+    monkeypatch.setattr(init_analyzer, "analyze_items",
+                        lambda items: [("ok", {"_id": raw["conversation"]["_id"]}) for raw, _ in items])
+
+    items = [{"conversation": {"_id": f"c{i}", "userId": "u1"}, "messages": []} for i in range(3)]
+    response = app.test_client().post("/analyze", json=items)
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert (body["status"], body["saved"], body["failed"]) == ("partial", 2, 1)
+    assert [(e["index"], e["conversationId"], e["stage"]) for e in body["errors"]] == [(1, "c1", "sessions")]
@@ -0,0 +1,34 @@
+# analyzer/tests/test_conversation_frame.py
+
+from utils.conversation_frame import AGENT, MISSING_TS, OTHER, USER, ConversationFrame
+from services.latency_calculator import LatencyCalculator
+
+
+def test_frame_sorts_and_splits_by_direction():
+    frame = ConversationFrame.from_messages([
+        {"direction": "agent", "text": "Respuesta", "timestamp": "2024-01-01T10:00:05"},
+        {"direction": "user", "text": "Hola AYUDA", "timestamp": "2024-01-01T10:00:00"},
+        {"direction": "system", "text": "aviso", "timestamp": "2024-01-01T10:00:07"},
+        {"direction": "user", "text": "", "timestamp": "2024-01-01T10:00:09.5"},
+    ])
+
+    assert bytes(frame.directions) == bytes([USER, AGENT, OTHER, USER])
+    assert list(frame.user_idx) == [0, 3] and list(frame.agent_idx) == [1]
+    assert frame.user_count == 2 and frame.agent_count == 1 and len(frame) == 4
+    assert frame.user_texts == ["Hola AYUDA"]
+    assert frame.user_lowered == ["hola ayuda"]
+    assert frame.agent_texts == ["Respuesta"]
+    assert frame.duration_seconds() == 9
+
+
+def test_missing_timestamps_go_first_and_zero_duration():
+    frame = ConversationFrame.from_messages([
+        {"direction": "user", "text": "a", "timestamp": "2024-01-01T10:00:00+00:00"},
+        {"direction": "agent", "text": "b", "timestamp": "no es fecha"},
+        {"direction": "agent", "text": "c", "timestamp": "2024-01-01T10:00:03+00:00"},
+    ])
+
+    assert frame.timestamps[0] == MISSING_TS
+    assert frame.texts == ["b", "a", "c"]
+    assert frame.duration_seconds() == 0
+    assert LatencyCalculator(frame).calculate_average_latency() == {"averageSeconds": 3.0, "interactionsCount": 1}
@@ -0,0 +1,104 @@
+# analyzer/tests/test_evaluator_registry.py
+
+import time
+
+import pytest
+
+from behavior_analysis.evaluator_registry import EvaluatorRegistry
+from behavior_analysis.success_context import SuccessEvaluationContext
+from behavior_analysis.success_engine import SuccessEvaluatorEngine
+
+
+class AddScore:
+    def __init__(self, delta=0):
+        self.delta = delta
+
+    def run(self, context):
+        context.score += self.delta
+        return context
+
+
+class Penalize(AddScore):
+    def __init__(self):
+        super().__init__(-1)
+
+
+class Reward(AddScore):
+    def __init__(self):
+        super().__init__(1)
+
+
+class SlowPenalize(Penalize):
+    def run(self, context):
+        time.sleep(0.005)
+        return super().run(context)
+
+
+def _registry(tmp_path, body, short_circuit=False):
+    path = tmp_path / "evaluators.yaml"
+    path.write_text(body, encoding="utf-8")
+    return EvaluatorRegistry(filepath=str(path), short_circuit=short_circuit)
+
+
+def _context():
+    return SuccessEvaluationContext({}, [], {"user_count": 0, "agent_count": 0, "total_count": 0})
+
+
+def test_default_file_runs_keywords_before_behavior_extras():
+    registry = EvaluatorRegistry(short_circuit=False)
+    assert [spec.name for spec in registry.evaluators] == ["keyword_detector", "behavior_extras"]
+
+
+def test_orders_by_cost_but_respects_after(tmp_path):
+    registry = _registry(tmp_path, f"""
+evaluators:
+  - {{name: slow, class: {__name__}.Penalize, cost: expensive}}
+  - {{name: needs_slow, class: {__name__}.Reward, cost: cheap, after: [slow]}}
+  - {{name: fast, class: {__name__}.Reward, cost: cheap}}
+""")
+    assert [spec.name for spec in registry.evaluators] == ["fast", "slow", "needs_slow"]
+
+
+def test_rejects_unknown_dependency(tmp_path):
+    with pytest.raises(ValueError):
+        _registry(tmp_path, f"evaluators:\n  - {{name: a, class: {__name__}.Reward, after: [b]}}\n")
+
+
+def test_short_circuit_skips_evaluators_that_cannot_change_outcome(tmp_path):
+    body = f"""
+evaluators:
+  - {{name: penalize, class: {__name__}.Penalize, cost: cheap, score_delta: [-1, 1]}}
+  - {{name: only_lowers, class: {__name__}.Penalize, cost: expensive, score_delta: [-3, 0], expected_ms: 1000}}
+"""
+    engine = SuccessEvaluatorEngine(_context(), _registry(tmp_path, body, short_circuit=True))
+
+    # Después del primero el score es -1 y el segundo sólo puede bajarlo
+    assert engine.run() is False
+    assert engine.get_score() == -1
+    ran, skipped = engine.get_trace()
+    assert ran["name"] == "penalize" and ran["ran"] is True and ran["ms"] >= 0
+    assert skipped == {"name": "only_lowers", "cost": "expensive", "ran": False, "skipped": "outcome_decided"}
+
+    # Sin short-circuit corren todos y el resultado es el mismo
+    engine = SuccessEvaluatorEngine(_context(), _registry(tmp_path, body))
+    assert engine.run() is False
+    assert [step["ran"] for step in engine.get_trace()] == [True, True]
+    assert engine.get_score() == -2
+
+
+def test_expected_ms_is_only_observed(tmp_path):
+    body = f"""
+evaluators:
+  - {{name: slow, class: {__name__}.SlowPenalize, expected_ms: 1}}
+  - {{name: after_slow, class: {__name__}.Penalize, budget_ms: 1}}
+"""
+    registry = _registry(tmp_path, body)
+    # budget_ms (nombre viejo) se lee como expected_ms
+    assert [spec.expected_ms for spec in registry.evaluators] == [1, 1]
+
+    engine = SuccessEvaluatorEngine(_context(), registry)
+    engine.run()
+    slow, after_slow = engine.get_trace()
+    # Pasarse no saltea nada: los dos corren y restan
+    assert slow["overExpected"] is True and after_slow["ran"] is True
+    assert engine.get_score() == -2
@@ -0,0 +1,155 @@
+# analyzer/tests/test_fingerprint.py
+
+import copy
+
+import init_analyzer
+import services.fingerprint as fingerprint
+from services.fingerprint import conversation_fingerprint, find_unchanged_sessions
+from storage.session_pipeline import SessionPipeline
+from storage.sinks import SessionSink
+
+AGENT = {"_id": "a1", "modelName": "gpt-4o", "name": "Bot", "userId": "u1", "updatedAt": "2024-01-01"}
+RAW = {
+    "conversation": {"_id": "c1", "userId": "u1", "from": "+100", "createdAt": "2024-01-01T10:00:00Z"},
+    "messages": [
+        {"direction": "user", "text": "hola", "timestamp": "2024-01-01T10:00:00Z", "_id": "m1"},
+        {"direction": "agent", "text": "buenas", "timestamp": "2024-01-01T10:00:05Z", "_id": "m2"}
+    ]
+}
+
+
+class StoredSink(SessionSink):
+    name = "sessions"
+
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.written = []
+
+    def write(self, docs):
+        self.written.extend(docs)
+        return []
+
+    def find_many(self, ids):
+        return {i: self.docs[i] for i in ids if i in self.docs}
+
+
+def test_fingerprint_ignores_unused_fields():
+    other = copy.deepcopy(RAW)
+    other["messages"][0]["_id"] = "otro"
+    agent = dict(AGENT, updatedAt="2025-01-01")
+
+    assert conversation_fingerprint(RAW, AGENT, "v1") == conversation_fingerprint(other, agent, "v1")
+
+
+def test_fingerprint_changes_with_messages_and_versions():
+    base = conversation_fingerprint(RAW, AGENT, "v1")
+    edited = copy.deepcopy(RAW)
+    edited["messages"][1]["text"] = "chau"
+
+    assert conversation_fingerprint(edited, AGENT, "v1") != base
+    assert conversation_fingerprint(RAW, AGENT, "v2") != base
+    assert conversation_fingerprint(RAW, dict(AGENT, modelName="gpt-4"), "v1") != base
+
+
+def test_find_unchanged_sessions(monkeypatch):
+    stored = {"_id": "c1", "fingerprint": conversation_fingerprint(RAW, AGENT, "v1")}
+    monkeypatch.setattr(fingerprint.settings, "SESSION_DEDUP", True)
+    monkeypatch.setattr("storage.session_pipeline.get_session_pipeline", lambda: SessionPipeline([StoredSink([stored])]))
+
+    edited = copy.deepcopy(RAW)
+    edited["conversation"]["_id"] = "c2"
+    fingerprints, unchanged = find_unchanged_sessions([(RAW, AGENT), (edited, AGENT)], "v1")
+    assert len(fingerprints) == 2
+    assert unchanged == {0: stored}
+
+    _, unchanged = find_unchanged_sessions([(RAW, AGENT)], "v2")
+    assert unchanged == {}
+
+    monkeypatch.setattr(fingerprint.settings, "SESSION_DEDUP", False)
+    assert find_unchanged_sessions([(RAW, AGENT)], "v1")[1] == {}
+
+
+def test_session_saved_without_cost_is_analyzed_again(monkeypatch):
+    stored = {"_id": "c1", "fingerprint": conversation_fingerprint(RAW, AGENT, "v1"),
+              "tokenUsage": {"cost": None, "costPending": True}}
+    monkeypatch.setattr(fingerprint.settings, "SESSION_DEDUP", True)
+    monkeypatch.setattr("storage.session_pipeline.get_session_pipeline", lambda: SessionPipeline([StoredSink([stored])]))
+
+    assert find_unchanged_sessions([(RAW, AGENT)], "v1")[1] == {}
+
+
+def test_batch_skips_unchanged_conversations(monkeypatch):
+    version = init_analyzer.get_keyword_registry().version
+    stored = {"_id": "c1", "fingerprint": conversation_fingerprint(RAW, AGENT, version)}
+    changed = copy.deepcopy(RAW)
+    changed["conversation"]["_id"] = "c2"
+    sink = StoredSink([stored])
+    analyzed = []
+
+    def fake_analyze(items):
+        analyzed.extend(raw["conversation"]["_id"] for raw, _ in items)
+        return [("ok", {"_id": raw["conversation"]["_id"]}) for raw, _ in items]
+
+    monkeypatch.setattr(fingerprint.settings, "SESSION_DEDUP", True)
+    monkeypatch.setattr("storage.session_pipeline.get_session_pipeline", lambda: SessionPipeline([sink]))
+    monkeypatch.setattr(init_analyzer, "get_session_pipeline", lambda: SessionPipeline([sink]))
+    monkeypatch.setattr(init_analyzer, "get_agents_for_conversations", lambda convs: {"u1": AGENT})
+    monkeypatch.setattr(init_analyzer, "analyze_items", fake_analyze)
+
+    report = init_analyzer.analyze_batch([changed, RAW])
+
+    assert analyzed == ["c2"]
+    assert [s["_id"] for s in report["sessions"]] == ["c2", "c1"]
+    assert [d["_id"] for d in sink.written] == ["c2"]
+    assert sink.written[0]["fingerprint"] == conversation_fingerprint(changed, AGENT, version)
+    assert report["errors"] == []
+
+
+class MemoryMongoSink(SessionSink):
+    """
+    Sink consultable que guarda lo escrito; con `fail` reporta error en cada ítem.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.docs = {}
+        self.fail = False
+
+    def write(self, docs):
+        if self.fail:
+            return [{"index": i, "_id": d["_id"], "error": "timeout"} for i, d in enumerate(docs)]
+        self.docs.update({d["_id"]: copy.deepcopy(d) for d in docs})
+        return []
+
+    def find_many(self, ids):
+        return {i: self.docs[i] for i in ids if i in self.docs}
+
+
+def test_resent_conversation_is_rewritten_to_the_sink_that_missed_it(monkeypatch):
+    sessions, metrics = MemoryMongoSink("sessions"), MemoryMongoSink("metrics")
+    pipeline = SessionPipeline([sessions, metrics])
+    analyzed = []
+
+    def fake_analyze(items):
+        analyzed.extend(raw["conversation"]["_id"] for raw, _ in items)
+        return [("ok", {"_id": raw["conversation"]["_id"]}) for raw, _ in items]
+
+    monkeypatch.setattr(fingerprint.settings, "SESSION_DEDUP", True)
+    monkeypatch.setattr("storage.session_pipeline.get_session_pipeline", lambda: pipeline)
+    monkeypatch.setattr(init_analyzer, "get_session_pipeline", lambda: pipeline)
+    monkeypatch.setattr(init_analyzer, "get_agents_for_conversations", lambda convs: {"u1": AGENT})
+    monkeypatch.setattr(init_analyzer, "analyze_items", fake_analyze)
+
+    metrics.fail = True
+    report = init_analyzer.analyze_batch([RAW])
+    assert [e["stage"] for e in report["errors"]] == ["metrics"]
+    assert "c1" in sessions.docs and "c1" not in metrics.docs
+
+    # El backend reintenta: sessions ya la tiene, pero metrics no, así que no cuenta como guardada
+    metrics.fail = False
+    report = init_analyzer.analyze_batch([RAW])
+    assert report["errors"] == [] and analyzed == ["c1", "c1"]
+    assert metrics.docs["c1"]["fingerprint"] == sessions.docs["c1"]["fingerprint"]
+
+    # Con los dos sinks al día ya no se vuelve a analizar
+    init_analyzer.analyze_batch([RAW])
+    assert analyzed == ["c1", "c1"]
@@ -0,0 +1,143 @@
+# analyzer/tests/test_incremental_analyzer.py
+
+import copy
+import json
+import os
+
+import pytest
+
+import services.conversation_handler as conversation_handler
+import services.incremental_analyzer as incremental_analyzer
+from behavior_analysis.near_duplicates import MinHashLSH
+from services.incremental_analyzer import ConversationAccumulator, IncrementalAnalyzer, MissingStateError
+
+AGENT = {"_id": "agent-1", "modelName": "gpt-4", "name": "Agente", "userId": "user-1"}
+
+
+class MemoryStateRepo:
+    def __init__(self):
+        self.states = {}
+
+    def get_state(self, conversation_id):
+        state = self.states.get(conversation_id)
+        return copy.deepcopy(state) if state else None
+
+    def save_state(self, state):
+        current = self.states.get(state["_id"])
+        if (current or {}).get("rev") != state.get("rev"):
+            return False
+        state["rev"] = (state.get("rev") or 0) + 1
+        self.states[state["_id"]] = copy.deepcopy(state)
+        return True
+
+    def delete_state(self, conversation_id, rev=None):
+        current = self.states.get(conversation_id)
+        if current is None or (rev is not None and current["rev"] != rev):
+            return False
+        del self.states[conversation_id]
+        return True
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    # Sin Mongo ni BPE de tiktoken: agente fijo y un token por palabra
+    def fake_tokens(texts, model_name):
+        words = sum(len(t.split()) for t in texts)
+        return {"promptTokens": words, "completionTokens": 0, "totalTokens": words}
+
+    monkeypatch.setattr(conversation_handler, "tokenize_texts", fake_tokens)
+    monkeypatch.setattr(incremental_analyzer, "tokenize_texts", fake_tokens)
+    monkeypatch.setattr(conversation_handler, "get_agent_for_conversation", lambda conversation: AGENT)
+    monkeypatch.setattr(incremental_analyzer, "get_agent_for_conversation", lambda conversation: AGENT)
+    monkeypatch.setattr(incremental_analyzer, "persist_session", lambda doc: None)
+    return IncrementalAnalyzer(repo=MemoryStateRepo())
+
+
+def _sample():
+    with open(os.path.join(os.path.dirname(__file__), "test.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _without_timings(doc):
+    # Lo que tarda cada evaluador cambia de una corrida a otra
+    return {**doc, "evaluators": [{k: v for k, v in e.items() if k not in ("ms", "overExpected")} for e in doc["evaluators"]]}
+
+
+def test_finalize_matches_full_analysis(analyzer):
+    raw = _sample()
+    conversation, messages = raw["conversation"], raw["messages"]
+    expected = conversation_handler.build_session_doc(raw, agent=AGENT)
+
+    for i in range(0, len(messages), 3):
+        analyzer.add_messages({"conversation": conversation, "messages": messages[i:i + 3]})
+    session_doc, mode = analyzer.finalize({"conversation": conversation})
+
+    assert mode == "incremental"
+    assert _without_timings(session_doc) == _without_timings(expected)
+    assert analyzer.repo.get_state(conversation["_id"]) is None
+
+
+def test_out_of_order_falls_back_to_full_analysis(analyzer):
+    raw = _sample()
+    conversation, messages = raw["conversation"], raw["messages"]
+    analyzer.add_messages({"conversation": conversation, "messages": messages[3:]})
+    summary = analyzer.add_messages({"conversation": conversation, "messages": messages[:3]})
+
+    assert summary["exact"] is False
+    _, mode = analyzer.finalize(raw)
+    assert mode == "full"
+
+
+def test_finalize_without_state_or_messages(analyzer):
+    with pytest.raises(MissingStateError):
+        analyzer.finalize({"conversation": {"_id": "desconocida"}})
+
+
+def test_messages_added_during_finalize_are_not_dropped(analyzer):
+    raw = _sample()
+    conversation, messages = raw["conversation"], raw["messages"]
+    analyzer.add_messages({"conversation": conversation, "messages": messages[:-1]})
+
+    repo = analyzer.repo
+    get_state = repo.get_state
+
+    def racing_get_state(conversation_id):
+        # Llega el último mensaje entre la lectura del estado y el borrado
+        state = get_state(conversation_id)
+        repo.get_state = get_state
+        analyzer.add_messages({"conversation": conversation, "messages": messages[-1:]})
+        return state
+
+    repo.get_state = racing_get_state
+    session_doc, mode = analyzer.finalize({"conversation": conversation})
+
+    expected = conversation_handler.build_session_doc(raw, agent=AGENT)
+    assert mode == "incremental"
+    assert _without_timings(session_doc) == _without_timings(expected)
+    assert repo.get_state(conversation["_id"]) is None
+
+
+def test_state_is_kept_when_the_session_cannot_be_saved(analyzer, monkeypatch):
+    raw = _sample()
+    conversation = raw["conversation"]
+    analyzer.add_messages(raw)
+
+    def failing_persist(doc):
+        raise RuntimeError("Mongo caído")
+
+    monkeypatch.setattr(incremental_analyzer, "persist_session", failing_persist)
+    with pytest.raises(RuntimeError):
+        analyzer.finalize({"conversation": conversation})
+    assert analyzer.repo.get_state(conversation["_id"])["counts"]["total"] == len(raw["messages"])
+
+
+def test_repetition_bands_from_another_scheme_are_rebuilt():
+    texts = [" ".join(f"palabra{i}x{j}" for j in range(20)) for i in range(13)]
+    accumulator = ConversationAccumulator.new("conv-1", {}, "v1")
+    # Estado de una versión anterior: bandas que ya no se pueden comparar
+    accumulator.state["repetition"] = {"found": False, "texts": texts, "bands": [[0] * 40] * len(texts)}
+    lsh = MinHashLSH()
+
+    accumulator._add_repetition(texts[4] + " fin", lsh)
+
+    assert accumulator.state["repetition"]["found"]
@@ -0,0 +1,61 @@
+# analyzer/tests/test_instrumentation.py
+
+import os
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY
+
+from services.instrumentation import timed
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _sample(name, stage):
+    return REGISTRY.get_sample_value(name, {"stage": stage}) or 0
+
+
+def test_timed_observes_duration_and_errors():
+    before = _sample("analyzer_stage_duration_seconds_count", "test.stage")
+    with timed("test.stage"):
+        pass
+    with pytest.raises(ValueError):
+        with timed("test.stage"):
+            raise ValueError("boom")
+
+    assert _sample("analyzer_stage_duration_seconds_count", "test.stage") == before + 2
+    assert _sample("analyzer_stage_errors_total", "test.stage") >= 1
+
+
+def test_metrics_are_summed_across_processes(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = "from services.instrumentation import timed\nfor _ in range({n}):\n    with timed('test.multi'):\n        pass"
+    for n in (3, 4):
+        subprocess.run([sys.executable, "-c", worker.format(n=n)], cwd=SRC_DIR, env=env, check=True)
+
+    render = "from services.instrumentation import render_metrics\nprint(render_metrics()[0].decode())"
+    output = subprocess.run([sys.executable, "-c", render], cwd=SRC_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+
+    assert 'analyzer_stage_duration_seconds_count{stage="test.multi"} 7.0' in output
+
+
+def test_preloading_app_with_gunicorn_config_creates_metrics_dir(tmp_path):
+    # Como el master de gunicorn: config, app precargada y después on_starting
+    metrics_dir = tmp_path / "metrics"
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(metrics_dir), WARMUP_ON_START="false")
+    master = (
+        "import os, runpy\n"
+        "config = runpy.run_path('gunicorn.conf.py')\n"
+        "open(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], 'counter_1.db'), 'w').close()\n"
+        "import api.app\n"
+        "config['on_starting'](None)\n"
+        "print(sorted(os.listdir(os.environ['PROMETHEUS_MULTIPROC_DIR'])), os.getpid())"
+    )
+    output = subprocess.run([sys.executable, "-c", master], cwd=SRC_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+
+    files, pid = output.rsplit(" ", 1)
+    assert "counter_1.db" not in files
+    assert f"gauge_livesum_{pid.strip()}.db" in files
@@ -0,0 +1,141 @@
+# analyzer/tests/test_job_queue.py
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import pytest
+from services import job_queue
+from services.job_queue import JobQueue, JobStore, QueueFullError
+
+
+def _wait_finished(store, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("El job no terminó a tiempo")
+
+
+def test_job_reports_status_per_conversation(tmp_path):
+    def runner(items):
+        return {
+            "sessions": [items[0]],
+            "errors": [{"index": 1, "conversationId": "b", "stage": "analysis", "error": "sin agente"}]
+        }
+
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(runner, store=store, workers=1, max_pending=10)
+    payload = [{"conversation": {"_id": "a"}, "messages": []}, {"conversation": {"_id": "b"}, "messages": []}]
+
+    job = queue.submit(payload)
+    assert job["total"] == 2
+    assert [c["conversationId"] for c in job["conversations"]] == ["a", "b"]
+
+    finished = _wait_finished(store, job["id"])
+    assert finished["status"] == "done"
+    assert finished["conversations"][0]["status"] == "ok"
+    assert finished["conversations"][1] == {
+        "index": 1, "conversationId": "b", "status": "error", "stage": "analysis", "error": "sin agente"
+    }
+
+
+def test_failed_runner_marks_job_failed(tmp_path):
+    def runner(items):
+        raise RuntimeError("Mongo caído")
+
+    store = JobStore(str(tmp_path))
+    job = JobQueue(runner, store=store, workers=1).submit({"conversation": {"_id": "a"}, "messages": []})
+    finished = _wait_finished(store, job["id"])
+    assert finished["status"] == "failed"
+    assert finished["error"] == "Mongo caído"
+
+
+def test_queue_rejects_when_full(tmp_path):
+    def runner(items):
+        time.sleep(0.2)
+        return {"sessions": [], "errors": []}
+
+    queue = JobQueue(runner, store=JobStore(str(tmp_path)), workers=1, max_pending=1)
+    queue.submit([])
+    with pytest.raises(QueueFullError):
+        queue.submit([])
+
+
+def test_failed_submit_releases_its_slot(tmp_path):
+    class FailingStore(JobStore):
+        fail = True
+
+        def save(self, job):
+            if self.fail:
+                raise OSError("disco lleno")
+            super().save(job)
+
+    store = FailingStore(str(tmp_path))
+    queue = JobQueue(lambda items: {"sessions": [], "errors": []}, store=store, workers=1, max_pending=1)
+    with pytest.raises(OSError):
+        queue.submit([])
+
+    store.fail = False
+    job = queue.submit([])
+    assert _wait_finished(store, job["id"])["status"] == "done"
+
+
+def test_failed_pool_submit_marks_job_failed(tmp_path, monkeypatch):
+    class BrokenExecutor:
+        def submit(self, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(lambda items: {"sessions": [], "errors": []}, store=store, workers=1, max_pending=1)
+    monkeypatch.setattr(queue, "_get_executor", lambda: BrokenExecutor())
+    with pytest.raises(RuntimeError):
+        queue.submit([])
+
+    jobs = [f.stem for f in tmp_path.glob("*.json")]
+    assert [store.get(job_id)["status"] for job_id in jobs] == ["failed"]
+    assert queue._pending == 0
+
+
+def test_job_of_a_dead_worker_is_reported_failed(tmp_path):
+    store = JobStore(str(tmp_path))
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+
+    queued = {"id": "abc123", "status": "queued", "total": 0, "conversations": [],
+              "workerHost": socket.gethostname(), "workerPid": dead.pid}
+    store.save(queued)
+    assert store.get("abc123")["status"] == "failed"
+
+    store.save({**queued, "id": "abc124", "workerPid": os.getpid()})
+    assert store.get("abc124")["status"] == "queued"
+
+
+def test_unknown_job_id(tmp_path):
+    store = JobStore(str(tmp_path))
+    assert store.get("noexiste") is None
+    assert store.get("../etc") is None
+
+
+def test_finished_jobs_purge_at_most_once_per_interval(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path), ttl_seconds=100)
+    purges = []
+    monkeypatch.setattr(store, "purge_expired", lambda: purges.append(1) or 0)
+    now = [1000.0]
+    monkeypatch.setattr(job_queue.time, "monotonic", lambda: now[0])
+
+    for _ in range(3):
+        store.purge_if_due()
+    assert len(purges) == 1
+
+    now[0] += 9
+    store.purge_if_due()
+    assert len(purges) == 1
+
+    # Pasado ttl/10 vuelve a barrer
+    now[0] += 1
+    store.purge_if_due()
+    assert len(purges) == 2
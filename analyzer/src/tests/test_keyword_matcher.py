@@ -0,0 +1,48 @@
+# analyzer/tests/test_keyword_matcher.py
+
+import os
+import json
+from behavior_analysis.keyword_loader import load_keywords
+from behavior_analysis.keyword_matcher import KeywordMatcher
+from behavior_analysis.keyword_detector import NEGATIVE_CATEGORIES, POSITIVE_CATEGORY
+
+
+def _naive_hits(keywords, texts):
+    return {
+        category: sum(1 for kw in kws if any(kw in t.lower() for t in texts))
+        for category, kws in keywords.items()
+    }
+
+
+def test_matcher_matches_naive_substring_search():
+    keywords = load_keywords()
+    categories = {c: keywords[c] for c in NEGATIVE_CATEGORIES + [POSITIVE_CATEGORY]}
+
+    json_path = os.path.join(os.path.dirname(__file__), "test.json")
+    with open(json_path, "r", encoding="utf-8") as f:
+        messages = json.load(f)["messages"]
+    texts = [m["text"] for m in messages if m.get("text")]
+    texts += ["NO ENTIENDO nada, quiero hablar con un humano", "genial todo, muchas gracias"]
+
+    hits = KeywordMatcher(categories).count_hits(texts)
+    expected = _naive_hits(categories, texts)
+    for category in categories:
+        assert hits.get(category, 0) == expected[category], category
+
+
+def test_matcher_reports_overlapping_keywords():
+    matcher = KeywordMatcher({"positive": ["genial", "genial todo", "todo"]})
+    assert matcher.find("Genial todo!") == {"positive": {"genial", "genial todo", "todo"}}
+
+
+def test_matcher_word_boundary():
+    keywords = {"frustration": ["mal"]}
+    assert KeywordMatcher(keywords).count_hits(["todo normal"]) == {"frustration": 1}
+    assert KeywordMatcher(keywords, word_boundary=True).count_hits(["todo normal"]) == {}
+    assert KeywordMatcher(keywords, word_boundary=True).count_hits(["anda mal."]) == {"frustration": 1}
+
+
+def test_matcher_accent_insensitive():
+    keywords = {"frustration": ["no me resolvió nada"]}
+    assert KeywordMatcher(keywords).count_hits(["no me resolvio nada"]) == {}
+    assert KeywordMatcher(keywords, accent_insensitive=True).count_hits(["No me resolvio NADA"]) == {"frustration": 1}
@@ -0,0 +1,54 @@
+# analyzer/tests/test_keyword_registry.py
+
+import os
+from behavior_analysis.keyword_registry import KeywordRegistry
+
+BASE_YAML = """
+frustration:
+  - no funciona
+positive_closing:
+  - gracias
+languages:
+  en:
+    frustration:
+      - not working
+"""
+
+
+def _write(path, content, mtime):
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_registry_loads_once_and_selects_language_pack(tmp_path):
+    path = tmp_path / "keywords.yaml"
+    _write(path, BASE_YAML, 1_000)
+    registry = KeywordRegistry(str(path), check_interval=3600)
+
+    snapshot = registry.get()
+    assert registry.get() is snapshot
+
+    assert snapshot.matcher_for("es").count_hits(["no funciona"]) == {"frustration": 1}
+    assert snapshot.matcher_for("en").count_hits(["no funciona"]) == {}
+    assert snapshot.matcher_for("en").count_hits(["it is not working"]) == {"frustration": 1}
+    assert snapshot.matcher_for(None) is snapshot.default
+
+
+def test_registry_hot_reloads_changed_file(tmp_path):
+    path = tmp_path / "keywords.yaml"
+    _write(path, BASE_YAML, 1_000)
+    registry = KeywordRegistry(str(path), check_interval=0)
+    first = registry.get()
+
+    # Mismo contenido con otro mtime: no cambia la versión
+    _write(path, BASE_YAML, 2_000)
+    assert registry.get() is first
+
+    _write(path, BASE_YAML.replace("no funciona", "no anda"), 3_000)
+    second = registry.get()
+    assert second.version != first.version
+    assert second.matcher_for("es").count_hits(["no anda"]) == {"frustration": 1}
+
+    # Un YAML roto no reemplaza la versión vigente
+    _write(path, "frustration: [no anda", 4_000)
+    assert registry.get() is second
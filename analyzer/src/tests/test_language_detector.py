@@ -28,3 +28,34 @@ def test_conversation_language_detector():
     assert len(langs) == 3
     assert all(lang in ['es', 'en', 'pt', 'unknown'] for lang in langs)
     assert predominant in ['es', 'en', 'pt', None]
+
+
+def test_early_stop_skips_trivial_texts_and_stops_on_clear_lead(monkeypatch):
+    import services.language_detector as module
+
+    calls = []
+
+    def fake_detect(text):
+        calls.append(text)
+        return "es"
+
+    monkeypatch.setattr(module, "detect", fake_detect)
+    monkeypatch.setattr(module, "_cache", module.OrderedDict())
+
+    messages = [{"text": "ok", "direction": "user"}, {"text": "👍 123", "direction": "user"}]
+    messages += [
+        {"text": f"Necesito ayuda con el pedido número {i}, todavía no llegó a mi casa", "direction": "user"}
+        for i in range(200)
+    ]
+
+    detector = ConversationLanguageDetector(messages, early_stop=True)
+    assert detector.get_predominant_language() == "es"
+    assert len(calls) < 10
+    assert "ok" not in calls
+
+
+def test_detection_is_cached_and_deterministic():
+    text = "Hola, quería consultar por un pedido que hice la semana pasada"
+    first = ConversationLanguageDetector([{"text": text, "direction": "user"}]).detect_languages()
+    second = ConversationLanguageDetector([{"text": text, "direction": "user"}]).detect_languages()
+    assert first == second == ["es"]
@@ -0,0 +1,122 @@
+# analyzer/tests/test_mongo_pool.py
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from config import settings
+from db import mongo_client
+from db.agent_repo import get_agent_repo
+
+
+def test_client_is_created_lazily_once_per_process(monkeypatch):
+    monkeypatch.setattr(mongo_client, "_client", None)
+    monkeypatch.setattr(mongo_client, "_client_pid", None)
+    assert mongo_client.pool_stats() == {}
+
+    client = mongo_client.get_client()
+    assert mongo_client.get_client() is client
+
+    # Otro pid (p. ej. un worker recién forkeado) tiene su propio cliente
+    monkeypatch.setattr(mongo_client, "_client_pid", -1)
+    assert mongo_client.get_client() is not client
+    mongo_client.close_client()
+    client.close()
+
+
+def test_client_options_follow_settings(monkeypatch):
+    monkeypatch.setattr(settings, "MONGO_MAX_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 250)
+    monkeypatch.setattr(settings, "MONGO_WRITE_CONCERN_W", "majority")
+    monkeypatch.setattr(settings, "MONGO_WRITE_CONCERN_J", "true")
+
+    options = mongo_client.client_options()
+
+    assert options["maxPoolSize"] == 7 and options["waitQueueTimeoutMS"] == 250
+    assert options["w"] == "majority" and options["journal"] is True
+    assert "socketTimeoutMS" not in options
+
+
+def test_pool_monitor_tracks_utilization(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    monitor = mongo_client.PoolMonitor(max_pool_size=4)
+    event = SimpleNamespace(duration=0.002)
+
+    for _ in range(3):
+        monitor.connection_created(event)
+        monitor.connection_check_out_started(event)
+        monitor.connection_checked_out(event)
+    monitor.connection_checked_in(event)
+    monitor.connection_check_out_started(event)
+
+    stats = monitor.stats()
+    assert stats["open"] == 3 and stats["checkedOut"] == 2 and stats["waiting"] == 1
+    assert stats["peakCheckedOut"] == 3 and stats["utilization"] == 0.5
+    assert abs(stats["avgWaitMs"] - 2.0) < 1e-9
+
+
+def test_repositories_are_shared_and_module_attributes_still_work(monkeypatch):
+    monkeypatch.setattr(settings, "MONGO_DB", "analyzer_test")
+    monkeypatch.setattr(mongo_client, "MONGO_DB", "analyzer_test")
+
+    assert get_agent_repo() is get_agent_repo()
+    assert mongo_client.db.name == "analyzer_test"
+    assert get_agent_repo().agents_col.full_name == "analyzer_test.agents"
+
+
+class FakeAsyncClient:
+    def __init__(self, uri, **options):
+        self.closed_on = None
+
+    async def close(self):
+        self.closed_on = asyncio.get_running_loop()
+
+
+def _use_fake_async_client(monkeypatch):
+    monkeypatch.setattr(mongo_client, "AsyncMongoClient", FakeAsyncClient)
+    monkeypatch.setattr(mongo_client, "_async_client", None)
+    monkeypatch.setattr(mongo_client, "_async_client_key", None)
+
+
+async def _client_and_yield():
+    client = mongo_client.get_async_client()
+    # Deja correr los cierres agendados
+    await asyncio.sleep(0)
+    return client
+
+
+def test_async_client_from_a_finished_loop_is_closed_when_replaced(monkeypatch):
+    _use_fake_async_client(monkeypatch)
+
+    first = asyncio.run(_client_and_yield())
+    assert first.closed_on is None
+    second = asyncio.run(_client_and_yield())
+
+    assert second is not first
+    assert first.closed_on is not None and second.closed_on is None
+
+
+def test_async_client_of_a_running_loop_is_closed_on_that_loop(monkeypatch):
+    _use_fake_async_client(monkeypatch)
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(_client_and_yield(), other_loop).result(timeout=5)
+        asyncio.run(_client_and_yield())
+        # El cierre corre en el loop del cliente viejo, no en el nuevo
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(timeout=5)
+        assert first.closed_on is other_loop
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(timeout=5)
+        other_loop.close()
+
+
+def test_async_client_inherited_from_another_pid_is_not_closed(monkeypatch):
+    _use_fake_async_client(monkeypatch)
+    first = asyncio.run(_client_and_yield())
+    monkeypatch.setattr(mongo_client, "_async_client_key", (-1, mongo_client._async_client_key[1]))
+
+    asyncio.run(_client_and_yield())
+    assert first.closed_on is None
@@ -0,0 +1,88 @@
+# analyzer/tests/test_near_duplicates.py
+
+import itertools
+import random
+from behavior_analysis.near_duplicates import MinHashLSH
+from behavior_analysis.behavior_extras_evaluator import BehaviorExtrasEvaluator, is_similar_message
+from scripts.synthetic_conversations import ConversationGenerator
+
+WORDS = (
+    "pedido envío factura cobro reclamo demora paquete dirección sucursal tarjeta "
+    "devolución producto cuenta número semana ayer mañana precio cambio garantía "
+    "quiero necesito saber cuándo llega todavía nadie responde hace días espero "
+    "por favor urgente ayuda consulta estado compra online correo teléfono"
+).split()
+
+
+def _long_message(rng, n=22):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _paraphrase(text, rng):
+    words = text.split()
+    words[rng.randrange(len(words))] = rng.choice(WORDS)
+    del words[rng.randrange(len(words))]
+    return " ".join(words)
+
+
+def test_lsh_finds_near_duplicate_pair_first():
+    rng = random.Random(4)
+    texts = [_long_message(rng) for _ in range(40)]
+    texts.append(_paraphrase(texts[7], rng))
+
+    candidates = MinHashLSH().candidate_pairs(texts)
+    assert candidates[0][:2] == (7, 40)
+
+
+def test_long_conversation_repetition_matches_exact_pairwise():
+    rng = random.Random(11)
+    evaluator = BehaviorExtrasEvaluator()
+    for with_repetition in (False, True):
+        texts = [_long_message(rng) for _ in range(30)]
+        if with_repetition:
+            texts.append(_paraphrase(texts[15], rng))
+        lowered = [t.lower() for t in texts]
+
+        exact = any(
+            evaluator._is_similar(lowered[i], lowered[j])
+            for i in range(len(lowered)) for j in range(i + 1, len(lowered))
+        )
+        assert evaluator._detect_repeated_messages(lowered) == exact
+        if with_repetition:
+            assert exact
+
+
+def _typos(text, rng, every=8):
+    chars = list(text)
+    for _ in range(len(chars) // every):
+        chars[rng.randrange(len(chars))] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(chars)
+
+
+def test_pair_with_few_shared_words_is_still_a_candidate():
+    # Con typos casi ninguna palabra queda igual, pero difflib sigue viéndolos parecidos
+    rng = random.Random(2)
+    texts = [_long_message(rng) for _ in range(20)]
+    texts.append(_typos(texts[3], rng))
+    words = [set(texts[3].split()), set(texts[-1].split())]
+    assert len(words[0] & words[1]) / len(words[0] | words[1]) < 0.5
+    assert is_similar_message(texts[3], texts[-1])
+
+    assert (3, 20) in [(i, j) for i, j, _ in MinHashLSH().candidate_pairs(texts)]
+
+
+def test_lsh_recall_matches_exact_pairs_on_generated_conversations():
+    lsh = MinHashLSH()
+    rng = random.Random(7)
+    exact_pairs = 0
+    for conversation in ConversationGenerator(seed=5, messages=(80, 160), repetition_rate=0.1).generate(30):
+        texts = [m["text"].lower() for m in conversation["messages"]
+                 if m["direction"] == "user" and len(m["text"].split()) >= 20]
+        # Además de las repeticiones del generador, copias con typos
+        texts += [_typos(t, rng, every=10) for t in texts[:3]]
+        exact = {(i, j) for i, j in itertools.combinations(range(len(texts)), 2)
+                 if is_similar_message(texts[i], texts[j])}
+        candidates = {(i, j) for i, j, _ in lsh.candidate_pairs(texts)}
+        assert exact <= candidates
+        exact_pairs += len(exact)
+    assert exact_pairs > 50
@@ -0,0 +1,89 @@
+# analyzer/tests/test_pricing_catalog.py
+
+import json
+import pytest
+from services.pricing_catalog import PricingCatalog
+
+
+@pytest.fixture
+def bundled(tmp_path):
+    path = tmp_path / "pricing_snapshot.json"
+    path.write_text(json.dumps({"models": {
+        "gpt-4": {"input_cost_per_token": 3e-05, "output_cost_per_token": 6e-05},
+        "gpt-4o": {"input_cost_per_token": 2.5e-06, "output_cost_per_token": 1e-05},
+        "gpt-4o-mini": {"input_cost_per_token": 1.5e-07, "output_cost_per_token": 6e-07},
+    }}), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    # Snapshot de runtime: todavía no existe
+    return tmp_path / "runtime" / "pricing.json"
+
+
+def _catalog(snapshot, bundled, fetcher=lambda models: {}):
+    return PricingCatalog(str(snapshot), refresh_interval=0, fetcher=fetcher, bundled_path=str(bundled))
+
+
+def test_cost_is_computed_from_local_table(snapshot, bundled):
+    catalog = _catalog(snapshot, bundled)
+    assert catalog.cost("gpt-4", 30, 0) == pytest.approx(0.0009)
+    assert catalog.cost("GPT-4", 100, 50) == pytest.approx(100 * 3e-05 + 50 * 6e-05)
+    assert catalog.cost("openai:gpt-4o", 1000, 0) == pytest.approx(0.0025)
+
+
+def test_dated_model_names_fall_back_to_longest_prefix(snapshot, bundled):
+    catalog = _catalog(snapshot, bundled)
+    assert catalog.price("gpt-4o-mini-2024-07-18") == (1.5e-07, 6e-07)
+    assert catalog.price("gpt-4o-2024-08-06") == (2.5e-06, 1e-05)
+    assert catalog.price("claude-3-haiku") is None
+
+
+def test_unknown_model_has_no_cost_until_the_refresh_finds_it(snapshot, bundled):
+    requested = []
+    known = {}
+
+    def fetcher(models):
+        requested.append(list(models))
+        return {m: known[m] for m in models if m in known}
+
+    catalog = _catalog(snapshot, bundled, fetcher)
+    for _ in range(2):
+        assert catalog.cost("my-model", 10, 10) is None
+    # El request no busca precios: queda pedido para el refresco
+    assert requested == [] and catalog._wake.is_set()
+
+    assert catalog.refresh() == 0
+    assert "my-model" in requested[-1]
+
+    known["my-model"] = (1e-06, 2e-06)
+    assert catalog.refresh() == 1
+    assert catalog.cost("my-model", 10, 10) == pytest.approx(3e-05)
+    assert _catalog(snapshot, bundled).price("my-model") == (1e-06, 2e-06)
+
+
+def test_token_usage_flags_a_pending_cost(monkeypatch, snapshot, bundled):
+    from services import conversation_handler, token_utils
+
+    monkeypatch.setattr(token_utils, "get_pricing_catalog", lambda: _catalog(snapshot, bundled))
+    counts = {"promptTokens": 10, "completionTokens": 10, "totalTokens": 20}
+    conversation = {"userId": "u1"}
+
+    usage = conversation_handler.calc_token_usage(None, conversation, {"modelLLM": "my-model"}, counts)
+    assert (usage["cost"], usage["costPending"]) == (None, True)
+    usage = conversation_handler.calc_token_usage(None, conversation, {"modelLLM": "gpt-4"}, counts)
+    assert (usage["cost"], usage["costPending"]) == (0.0009, False)
+
+
+def test_refreshed_prices_go_to_the_runtime_snapshot_only(snapshot, bundled):
+    original = bundled.read_text(encoding="utf-8")
+    catalog = _catalog(snapshot, bundled, lambda models: {"gpt-4": (1e-05, 2e-05)})
+    assert catalog.refresh() == 1
+
+    assert bundled.read_text(encoding="utf-8") == original
+    assert json.loads(snapshot.read_text(encoding="utf-8"))["models"]["gpt-4"]["input_cost_per_token"] == 1e-05
+    # Al recargar, lo refrescado pisa a lo incluido
+    reloaded = _catalog(snapshot, bundled)
+    assert reloaded.price("gpt-4") == (1e-05, 2e-05)
+    assert reloaded.price("gpt-4o") == (2.5e-06, 1e-05)
@@ -0,0 +1,54 @@
+# analyzer/tests/test_request_profiler.py
+
+import cProfile
+import pstats
+
+import pytest
+
+from config import settings
+from services.request_profiler import RequestProfiler
+
+
+def _slow(n):
+    return sum(i * i for i in range(n))
+
+
+def test_run_stores_loadable_profile(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), keep=3)
+    result, profile_id = profiler.run(_slow, 10_000)
+
+    assert result == _slow(10_000)
+    stats = pstats.Stats(profiler.path_for(profile_id))
+    assert any(func[2] == "_slow" for func in stats.stats)
+
+
+def test_ring_keeps_only_slowest(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), keep=2)
+    ids = [profiler._store(cProfile.Profile(), seconds) for seconds in (0.5, 0.1, 2.0, 0.3)]
+
+    assert ids[1] is not None and ids[3] is None  # 0.3 ya no entra: hay dos más lentos
+    assert [p["durationSeconds"] for p in profiler.list()] == [2.0, 0.5]
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_profiled_failure_is_stored_and_reraised(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), keep=1)
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        profiler.run(boom)
+    assert len(profiler.list()) == 1
+
+
+def test_trigger_and_path_checks(tmp_path, monkeypatch):
+    profiler = RequestProfiler(directory=str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_ENABLED", False)
+    assert not profiler.should_profile({settings.PROFILE_HEADER: "1"})
+
+    monkeypatch.setattr(settings, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+    assert profiler.should_profile({settings.PROFILE_HEADER: "1"})
+    assert not profiler.should_profile({})
+    assert profiler.path_for("../../etc/passwd") is None
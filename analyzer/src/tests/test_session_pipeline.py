@@ -0,0 +1,112 @@
+# analyzer/tests/test_session_pipeline.py
+
+import json
+import time
+
+import pytest
+
+from storage.session_pipeline import BufferedSessionWriter, BufferFullError, SessionPipeline
+from storage.sinks import NdjsonLogSink, SessionSink, build_sinks
+
+
+class ListSink(SessionSink):
+    def __init__(self, name="memory", fail_ids=()):
+        self.name = name
+        self.batches = []
+        self.fail_ids = set(fail_ids)
+
+    def write(self, docs):
+        self.batches.append(list(docs))
+        return [
+            {"index": i, "_id": d["_id"], "error": "duplicate"}
+            for i, d in enumerate(docs) if d["_id"] in self.fail_ids
+        ]
+
+
+def test_pipeline_reports_errors_per_sink():
+    ok, failing = ListSink("sessions"), ListSink("metrics", fail_ids={"b"})
+    errors = SessionPipeline([ok, failing]).write_many([{"_id": "a"}, {"_id": "b"}])
+
+    assert ok.batches == [[{"_id": "a"}, {"_id": "b"}]]
+    assert errors == [{"index": 1, "_id": "b", "error": "duplicate", "stage": "metrics"}]
+
+
+def test_buffered_writer_batches_by_size():
+    sink = ListSink()
+    writer = BufferedSessionWriter(SessionPipeline([sink]), max_docs=3, max_delay=5, capacity=10, block_seconds=0)
+    for i in range(6):
+        writer.submit({"_id": i})
+
+    deadline = time.monotonic() + 2
+    while sum(len(b) for b in sink.batches) < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert [len(b) for b in sink.batches] == [3, 3]
+    assert writer.written == 6
+
+
+def test_buffered_writer_backpressure_and_close():
+    sink = ListSink()
+    writer = BufferedSessionWriter(SessionPipeline([sink]), max_docs=100, max_delay=60, capacity=2, block_seconds=0.01)
+    writer._ensure_flusher = lambda: None  # sin hilo: nada se vacía solo
+    writer.submit({"_id": 1})
+    writer.submit({"_id": 2})
+    with pytest.raises(BufferFullError):
+        writer.submit({"_id": 3})
+
+    writer.close()
+    assert sink.batches == [[{"_id": 1}, {"_id": 2}]]
+    assert writer.pending() == 0
+
+
+def test_close_writes_batch_in_progress():
+    sink = ListSink()
+    writer = BufferedSessionWriter(SessionPipeline([sink]), max_docs=100, max_delay=60, capacity=10, block_seconds=0)
+    writer.submit({"_id": 1})
+    time.sleep(0.05)  # el hilo ya tomó el documento y espera completar el lote
+
+    writer.close()
+    assert sink.batches == [[{"_id": 1}]]
+
+
+def test_buffered_writer_retries_only_the_failed_sink():
+    ok, flaky = ListSink("sessions"), ListSink("metrics", fail_ids={"b"})
+    writer = BufferedSessionWriter(SessionPipeline([ok, flaky]), capacity=10, block_seconds=0, retries=2, retry_delay=0)
+    writes = []
+
+    def write(docs):
+        writes.append([d["_id"] for d in docs])
+        if len(writes) == 2:
+            flaky.fail_ids.clear()  # el segundo intento anda
+        return ListSink.write(flaky, docs)
+
+    flaky.write = write
+    writer._write([{"_id": "a"}, {"_id": "b"}])
+
+    assert ok.batches == [[{"_id": "a"}, {"_id": "b"}]]
+    assert writes == [["a", "b"], ["b"]]
+    assert (writer.written, writer.failed) == (2, 0)
+
+
+def test_buffered_writer_drops_after_retries_and_counts_it(monkeypatch):
+    dropped = []
+    monkeypatch.setattr("storage.session_pipeline.count_dropped", lambda sink, n: dropped.append((sink, n)))
+    ok, failing = ListSink("sessions"), ListSink("metrics", fail_ids={"b"})
+    writer = BufferedSessionWriter(SessionPipeline([ok, failing]), capacity=10, block_seconds=0, retries=2, retry_delay=0)
+    writer._write([{"_id": "a"}, {"_id": "b"}])
+
+    assert len(failing.batches) == 3
+    assert (writer.written, writer.failed) == (1, 1)
+    assert dropped == [("sessions", 0), ("metrics", 1)]
+
+
+def test_build_sinks_and_ndjson_log(tmp_path):
+    log_path = tmp_path / "sessions.ndjson"
+    sinks = build_sinks("mongo:sessions, mongo:metrics", ndjson_log=str(log_path))
+    assert [s.name for s in sinks] == ["sessions", "metrics", "ndjson_log"]
+    with pytest.raises(ValueError):
+        build_sinks("redis:sessions")
+
+    NdjsonLogSink(str(log_path)).write([{"_id": "a"}, {"_id": "b"}])
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["_id"] for line in lines] == ["a", "b"]
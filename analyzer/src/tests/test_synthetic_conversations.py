@@ -0,0 +1,32 @@
+# analyzer/tests/test_synthetic_conversations.py
+
+import pytest
+
+from scripts.synthetic_conversations import ConversationGenerator
+from utils.conversation_frame import ConversationFrame
+
+KEYWORDS = {"frustration": ["no funciona"], "languages": {"en": {"frustration": ["not working"]}}}
+
+
+def test_generator_is_reproducible_and_respects_sizes():
+    first = list(ConversationGenerator(seed=3, messages=(4, 8), keywords=KEYWORDS).generate(20))
+    second = list(ConversationGenerator(seed=3, messages=(4, 8), keywords=KEYWORDS).generate(20))
+
+    assert first == second
+    assert all(4 <= len(raw["messages"]) <= 8 for raw in first)
+    frame = ConversationFrame.from_messages(first[0]["messages"])
+    assert frame.duration_seconds() > 0 and frame.user_count and frame.agent_count
+
+
+def test_generator_controls_keywords_and_language():
+    dense = ConversationGenerator(seed=1, messages=(20, 20), languages={"en": 1}, keyword_density=1.0,
+                                  repetition_rate=0, keywords=KEYWORDS)
+    texts = [m["text"].lower() for raw in dense.generate(5) for m in raw["messages"] if m["direction"] == "user"]
+    assert all("not working" in text for text in texts)
+
+    sparse = ConversationGenerator(seed=1, messages=(20, 20), keyword_density=0, keywords=KEYWORDS)
+    texts = [m["text"].lower() for raw in sparse.generate(5) for m in raw["messages"]]
+    assert not any("no funciona" in text for text in texts)
+
+    with pytest.raises(ValueError):
+        ConversationGenerator(languages={"xx": 1}, keywords=KEYWORDS)
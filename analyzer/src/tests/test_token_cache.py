@@ -0,0 +1,50 @@
+# analyzer/tests/test_token_cache.py
+
+from services import token_utils
+from services.token_cache import TokenCountCache, ENTRY_BYTES
+
+
+class CountingEncoding:
+    def __init__(self):
+        self.encoded = []
+
+    def encode_batch(self, texts, num_threads=1):
+        self.encoded.extend(texts)
+        return [t.split() for t in texts]
+
+
+def test_cache_lru_eviction_and_stats():
+    cache = TokenCountCache(max_bytes=2 * ENTRY_BYTES)
+    a, b, c = (cache.key("cl100k_base", t) for t in ("a", "b", "c"))
+    cache.put(a, 1)
+    cache.put(b, 2)
+    assert cache.get(a) == 1
+    cache.put(c, 3)  # b es el menos usado
+
+    assert cache.get(b) is None
+    assert cache.get(c) == 3
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_keys_depend_on_encoding():
+    cache = TokenCountCache(max_bytes=10 * ENTRY_BYTES)
+    assert cache.key("cl100k_base", "hola") != cache.key("o200k_base", "hola")
+
+
+def test_repeated_texts_are_encoded_once(monkeypatch):
+    encoding = CountingEncoding()
+    cache = TokenCountCache(max_bytes=100 * ENTRY_BYTES)
+    monkeypatch.setattr(token_utils, "get_encoding", lambda name: encoding)
+    monkeypatch.setattr(token_utils, "get_token_cache", lambda: cache)
+
+    greeting = "Hola, soy tu asistente virtual"
+    first = token_utils.tokenize_conversations([[greeting, "uno dos"], [greeting]], "gpt-4")
+    second = token_utils.tokenize_texts([greeting, "uno dos"], "gpt-4")
+
+    assert [r["promptTokens"] for r in first] == [7, 5]
+    assert second["promptTokens"] == 7
+    assert encoding.encoded == [greeting, "uno dos"]
+    assert cache.stats()["hits"] == 2
@@ -4,7 +4,7 @@ import os
 import json
 import pytest
 
-from src.services.token_utils import tokenize_texts, calculate_cost_with_tokonomics
+from src.services.token_utils import tokenize_texts, tokenize_conversations, encoding_name_for_model, calculate_cost_with_tokonomics
 
 @pytest.fixture(scope="module")
 def agent_texts():
@@ -66,6 +66,26 @@ def test_token_counts_consistency(agent_texts):
     assert first["completionTokens"] == second["completionTokens"]
 
 
+def test_tokenize_conversations_matches_per_conversation_counts(agent_texts):
+    """
+    Contar varias conversaciones en lote debe dar lo mismo que contarlas de a una.
+    """
+    conversations = [agent_texts, agent_texts[:1], [], ["", None, "hola"]]
+    batch = tokenize_conversations(conversations, model_name="gpt-4o")
+
+    assert batch == [tokenize_texts(texts, model_name="gpt-4o") for texts in conversations]
+    assert batch[2]["totalTokens"] == 0
+
+
+def test_encoding_name_for_model():
+    assert encoding_name_for_model("gpt-4") == "cl100k_base"
+    assert encoding_name_for_model("GPT-4o") == "o200k_base"
+    assert encoding_name_for_model("gpt-4o-mini-2024-07-18") == "o200k_base"
+    assert encoding_name_for_model("gpt-4-0613") == "cl100k_base"
+    assert encoding_name_for_model("o3-mini") == "o200k_base"
+    assert encoding_name_for_model("modelo-desconocido") == "cl100k_base"
+
+
 def test_calculate_cost_with_tokonomics():
     """
     Verifica que calculate_cost_with_tokonomics devuelva un float >= 0
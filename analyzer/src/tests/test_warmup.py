@@ -0,0 +1,30 @@
+# analyzer/tests/test_warmup.py
+
+import os
+import subprocess
+import sys
+
+from services import warmup as warmup_module
+
+_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_importing_app_does_not_load_analysis():
+    code = (
+        "import sys; import api.app; "
+        "print(','.join(m for m in ('tiktoken', 'langdetect', 'numpy', 'db.mongo_client', 'init_analyzer') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=_SRC, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_warmup_reports_steps_and_failures(monkeypatch):
+    monkeypatch.setattr(warmup_module, "_HEAVY_IMPORTS", ("json", "no_such_module_xyz"))
+    monkeypatch.setattr(warmup_module, "_load_encoding", lambda name: None)
+
+    report = warmup_module.warmup(encodings=["cl100k_base"])
+
+    assert isinstance(report["steps"]["import.json"], float)
+    assert report["steps"]["import.no_such_module_xyz"].startswith("error: ModuleNotFoundError")
+    assert "tiktoken.cl100k_base" in report["steps"]
+    assert warmup_module.get_warmup_report() == report
@@ -0,0 +1,85 @@
+# analyzer/utils/conversation_frame.py
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# Códigos de dirección en `directions`
+USER, AGENT, OTHER = 0, 1, 2
+_DIRECTION_CODES = {"user": USER, "agent": AGENT}
+
+# Timestamp ausente o inválido; ordena antes que cualquier fecha real
+MISSING_TS = -(1 << 63)
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_ONE_MICRO = timedelta(microseconds=1)
+
+
+class ConversationFrame:
+    """
+    Representación compacta de los mensajes de una conversación, armada una
+    sola vez y compartida por todas las etapas del análisis (duración,
+    latencia, tokens, idioma y evaluadores).
+
+    Los mensajes quedan ordenados por timestamp (los que no tienen timestamp
+    válido primero, en su orden original) y se guardan en columnas:
+      - timestamps: epoch en microsegundos (array 'q'), MISSING_TS si falta.
+      - directions: código por mensaje (USER, AGENT, OTHER).
+      - texts: texto de cada mensaje ("" si no tiene).
+      - user_idx / agent_idx: posiciones de los mensajes de cada dirección.
+      - user_texts / user_lowered / agent_texts: textos no vacíos por dirección.
+    """
+    __slots__ = ("timestamps", "directions", "texts", "user_idx", "agent_idx",
+                 "user_texts", "user_lowered", "agent_texts")
+
+    def __init__(self, timestamps: array, directions: bytes, texts: List[str]):
+        self.timestamps = timestamps
+        self.directions = directions
+        self.texts = texts
+        self.user_idx = array("I", (i for i, d in enumerate(directions) if d == USER))
+        self.agent_idx = array("I", (i for i, d in enumerate(directions) if d == AGENT))
+        self.user_texts = [texts[i] for i in self.user_idx if texts[i]]
+        self.user_lowered = [t.lower() for t in self.user_texts]
+        self.agent_texts = [texts[i] for i in self.agent_idx if texts[i]]
+
+    @classmethod
+    def from_messages(cls, messages: List[Dict[str, Any]]) -> "ConversationFrame":
+        stamps = [_parse_micros(m.get("timestamp")) for m in messages]
+        order = sorted(range(len(messages)), key=stamps.__getitem__)
+        return cls(
+            array("q", (stamps[i] for i in order)),
+            bytes(_DIRECTION_CODES.get(messages[i].get("direction"), OTHER) for i in order),
+            [messages[i].get("text") or "" for i in order]
+        )
+
+    def __len__(self) -> int:
+        return len(self.directions)
+
+    @property
+    def user_count(self) -> int:
+        return len(self.user_idx)
+
+    @property
+    def agent_count(self) -> int:
+        return len(self.agent_idx)
+
+    def duration_seconds(self) -> int:
+        """
+        Segundos entre el primer y el último mensaje; 0 si algún mensaje
+        no tiene timestamp.
+        """
+        if not self.timestamps or self.timestamps[0] == MISSING_TS:
+            return 0
+        return int((self.timestamps[-1] - self.timestamps[0]) / 1e6)
+
+
+def _parse_micros(value: Optional[str]) -> int:
+    try:
+        dt = datetime.fromisoformat(value)
+    except Exception:
+        return MISSING_TS
+    # Los timestamps sin zona se toman como UTC
+    epoch = _EPOCH if dt.tzinfo is None else _EPOCH_UTC
+    return (dt - epoch) // _ONE_MICRO
+
@@ -7,10 +7,13 @@ if (!analyzerUrl) {
 
 /**
  * Envía el payload de conversaciones directamente al analyzer vía HTTP POST.
+ * El analyzer responde por ítem: con 207 (o 200) el body trae `errors` con el
+ * índice de cada conversación que no pudo guardar.
  *
  * @param {Array<Object>} payload - Conversaciones y mensajes para analizar
- * @returns {Promise<void>} Resolves when analysis is successfully dispatched
- * @throws {Error} When there is no payload, or analyzer returns error
+ * @returns {Promise<Array<string>>} IDs de las conversaciones que el analyzer guardó;
+ *   vacío si la request falló entera
+ * @throws {Error} When there is no payload
  */
 export const dispatchToAnalyzer = async (payload) => {
   if (!payload) {
@@ -18,11 +21,24 @@ export const dispatchToAnalyzer = async (payload) => {
   }
 
   try {
-    await axios.post(`${analyzerUrl}/analyze`, payload, { timeout: 120000 });
+    const { data } = await axios.post(`${analyzerUrl}/analyze`, payload, {
+      timeout: 120000,
+    });
+    const failed = new Set((data?.errors || []).map((e) => e.index));
+    for (const error of data?.errors || []) {
+      console.error(
+        `dispatchToAnalyzer: conversation ${error.conversationId} failed at ${error.stage}:`,
+        error.error
+      );
+    }
+    return payload
+      .filter((_, index) => !failed.has(index))
+      .map((p) => p.conversation._id);
   } catch (error) {
     console.error(
       "dispatchToAnalyzer error:",
       error.response?.data || error.message
     );
+    return [];
   }
 };
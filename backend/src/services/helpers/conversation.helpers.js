@@ -185,17 +185,26 @@ export const closeConversationsById = async (convIds) => {
 };
 
 /**
- * Exports conversation(s) to the analyzer and closes them if export is successful.
- * Accepts a single conversation or an array of conversations.
+ * Exports conversation(s) to the analyzer and closes the ones it saved.
+ * Accepts a single conversation or an array of conversations. Conversations
+ * the analyzer could not save stay open, so the cleanup job sends them again.
  *
  * @param {Object|Array<Object>} conversations - Conversation object or array of conversation objects
- * @returns {Promise<void>} Resolves when export and close are successful
+ * @returns {Promise<string[]>} IDs of the conversations that were closed
  */
 export const exportAndCloseConversations = async (conversations) => {
   const convArray = Array.isArray(conversations)
     ? conversations
     : [conversations];
   const payloads = await buildExportPayloads(convArray);
-  await dispatchToAnalyzer(payloads);
-  await closeConversationsById(convArray.map((c) => c._id));
+  const savedIds = await dispatchToAnalyzer(payloads);
+  if (savedIds.length < convArray.length) {
+    console.warn(
+      `${convArray.length - savedIds.length} conversation/s not saved by the analyzer; they stay open to be re-sent.`
+    );
+  }
+  if (savedIds.length > 0) {
+    await closeConversationsById(savedIds);
+  }
+  return savedIds;
 };
@@ -0,0 +1,76 @@
+import http from "http";
+import Conversation from "../../models/Conversation.js";
+import { conversationConfig } from "../../config/config.js";
+
+describe("exportAndCloseConversations", () => {
+  let server;
+  let analyzerResponse;
+  let exportAndCloseConversations;
+
+  beforeAll(async () => {
+    // Analyzer falso: responde lo que indique cada test
+    server = http.createServer((req, res) => {
+      req.resume();
+      req.on("end", () => {
+        res.writeHead(analyzerResponse.status, {
+          "Content-Type": "application/json",
+        });
+        res.end(JSON.stringify(analyzerResponse.body));
+      });
+    });
+    await new Promise((resolve) => server.listen(0, resolve));
+    process.env.ANALYZER_URL = `http://127.0.0.1:${server.address().port}`;
+    ({ exportAndCloseConversations } = await import(
+      "../../services/helpers/conversation.helpers.js"
+    ));
+  });
+
+  afterAll(async () => {
+    await new Promise((resolve) => server.close(resolve));
+  });
+
+  const createConversations = async (ids) => {
+    await Conversation.insertMany(
+      ids.map((_id) => ({
+        _id,
+        userId: "user-export",
+        agentPhoneNumberId: "agent-export",
+        createdAt: new Date(),
+        updatedAt: new Date(),
+      }))
+    );
+    return Conversation.find({ _id: { $in: ids } }).sort({ _id: 1 }).lean();
+  };
+
+  const statusOf = async (id) => (await Conversation.findById(id).lean()).status;
+
+  it("closes only the conversations the analyzer saved (207)", async () => {
+    const conversations = await createConversations(["exp-a", "exp-b", "exp-c"]);
+    analyzerResponse = {
+      status: 207,
+      body: {
+        status: "partial",
+        saved: 2,
+        failed: 1,
+        errors: [
+          { index: 1, conversationId: "exp-b", stage: "metrics", error: "timeout" },
+        ],
+      },
+    };
+
+    const closed = await exportAndCloseConversations(conversations);
+
+    expect(closed).toEqual(["exp-a", "exp-c"]);
+    expect(await statusOf("exp-a")).toBe(conversationConfig.closingConversationStatus);
+    expect(await statusOf("exp-b")).toBe(conversationConfig.defaultConversationStatus);
+    expect(await statusOf("exp-c")).toBe(conversationConfig.closingConversationStatus);
+  });
+
+  it("keeps every conversation open when the analyzer fails", async () => {
+    const conversations = await createConversations(["exp-d"]);
+    analyzerResponse = { status: 500, body: { error: "boom" } };
+
+    expect(await exportAndCloseConversations(conversations)).toEqual([]);
+    expect(await statusOf("exp-d")).toBe(conversationConfig.defaultConversationStatus);
+  });
+});